@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Curriculum Planning Benchmark
+Time the schedule solvers of curriculum_planning.py on seeded synthetic catalogs
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import curriculum_planning as cp
+
+
+def generate_catalog(num_courses, lectures_per_course=2, tutorials_per_course=3, conflict_rate=0.3,
+                     optional_fraction=0.5, seed=0, grid=None):
+    """
+    Generate a synthetic course catalog.
+
+    Sessions are placed one by one on the grid. With probability conflict_rate
+    a session goes to a slot some earlier course already uses (so courses may
+    clash); otherwise it goes to a slot nobody uses yet, while there is one.
+    The same seed always gives the same catalog.
+
+    Args:
+        num_courses (int): Number of courses
+        lectures_per_course (int): Lectures of each course (lecture density)
+        tutorials_per_course (int): Tutorial options of each course (tutorial fan-out)
+        conflict_rate (float): 0-1, chance of placing a session on an already used slot
+        optional_fraction (float): 0-1, share of the courses that are optional
+        seed (int): Random seed
+        grid (TimeGrid, optional): Grid of the courses; DEFAULT_GRID by default
+
+    Returns:
+        tuple: (required_courses, optional_courses)
+    """
+    if grid is None:
+        grid = cp.DEFAULT_GRID
+    rng = random.Random(seed)
+    all_slots = [(day_idx, slot_idx) for day_idx in range(grid.num_days) for slot_idx in range(grid.num_slots)]
+    used = []
+    free = all_slots.copy()
+    rng.shuffle(free)
+
+    def place(exclude):
+        # A used slot with probability conflict_rate (or when no free slot is left)
+        if used and (not free or rng.random() < conflict_rate):
+            candidates = [slot for slot in used if slot not in exclude]
+            if candidates:
+                return rng.choice(candidates)
+        if free:
+            return free.pop()
+        return rng.choice([slot for slot in all_slots if slot not in exclude] or all_slots)
+
+    courses = []
+    for course_idx in range(num_courses):
+        lectures = []
+        for _ in range(lectures_per_course):
+            lectures.append(place(lectures))
+        tutorials = []
+        for _ in range(tutorials_per_course):
+            tutorials.append(place(lectures + tutorials))
+        used.extend(slot for slot in lectures + tutorials if slot not in used)
+        courses.append(cp.Course(f"SYN{course_idx:04d}", f"Synthetic {course_idx}", lectures, tutorials, grid=grid))
+
+    num_optional = round(num_courses * optional_fraction)
+    rng.shuffle(courses)
+    return courses[num_optional:], courses[:num_optional]
+
+
+def measure(solve, repeat=3):
+    """
+    Time a solver and measure its peak memory.
+
+    The wall time is the best of repeat runs. Peak memory is traced in one
+    extra run, since tracing slows the solver down.
+
+    Args:
+        solve (callable): Function without arguments that returns the schedules
+        repeat (int): Number of timed runs
+
+    Returns:
+        dict: schedules, wall_time (s), peak_bytes and schedules_per_second
+    """
+    wall_time = float("inf")
+    for _ in range(max(repeat, 1)):
+        cp.clear_caches()
+        start = time.perf_counter()
+        schedules = solve()
+        wall_time = min(wall_time, time.perf_counter() - start)
+        num_schedules = len(schedules)
+        del schedules
+
+    cp.clear_caches()
+    tracemalloc.start()
+    try:
+        schedules = solve()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del schedules
+
+    return {
+        "schedules": num_schedules,
+        "wall_time": wall_time,
+        "peak_bytes": peak_bytes,
+        "schedules_per_second": num_schedules / wall_time if wall_time > 0 else None,
+    }
+
+
+def run_benchmark(sizes, lectures_per_course=2, tutorials_per_course=3, conflict_rate=0.3,
+                  optional_fraction=0.5, seed=0, repeat=3):
+    """
+    Benchmark both solvers on synthetic catalogs of several sizes.
+
+    find_all_valid_schedules gets every course of a catalog (all optional,
+    maximal schedules only), and find_all_valid_schedules_with_optional gets
+    them split into required and optional courses.
+
+    Args:
+        sizes (list): Course counts to benchmark
+        lectures_per_course (int): See generate_catalog
+        tutorials_per_course (int): See generate_catalog
+        conflict_rate (float): See generate_catalog
+        optional_fraction (float): See generate_catalog
+        seed (int): See generate_catalog
+        repeat (int): Timed runs per measurement (the best one is kept)
+
+    Returns:
+        dict: JSON-serialisable report with the environment, parameters and results
+    """
+    params = {
+        "sizes": list(sizes),
+        "lectures_per_course": lectures_per_course,
+        "tutorials_per_course": tutorials_per_course,
+        "conflict_rate": conflict_rate,
+        "optional_fraction": optional_fraction,
+        "seed": seed,
+        "repeat": repeat,
+    }
+    results = []
+    for num_courses in sizes:
+        required, optional = generate_catalog(
+            num_courses, lectures_per_course, tutorials_per_course, conflict_rate, optional_fraction, seed
+        )
+        solvers = [
+            ("find_all_valid_schedules", lambda: cp.find_all_valid_schedules(required + optional)),
+            ("find_all_valid_schedules_with_optional",
+             lambda: cp.find_all_valid_schedules_with_optional(required, optional)),
+        ]
+        for name, solve in solvers:
+            result = {"function": name, "num_courses": num_courses, **measure(solve, repeat)}
+            results.append(result)
+            print(
+                f"{name}({num_courses} courses): {result['schedules']} schedule(s) "
+                f"in {result['wall_time']:.4f}s, peak {result['peak_bytes'] / 1024:.1f} KiB",
+                file=sys.stderr,
+            )
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": params,
+        "results": results,
+    }
+
+
+def find_regressions(baseline, report, tolerance=0.2):
+    """
+    Compare a benchmark report with a baseline report.
+
+    Args:
+        baseline (dict): Earlier report of run_benchmark
+        report (dict): New report of run_benchmark
+        tolerance (float): Allowed relative slowdown or memory growth
+
+    Returns:
+        list: Descriptions of the measurements that got worse by more than tolerance,
+              or whose number of schedules changed
+    """
+    previous = {(result["function"], result["num_courses"]): result for result in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        key = (result["function"], result["num_courses"])
+        if key not in previous:
+            continue
+        old = previous[key]
+        label = f"{key[0]}({key[1]} courses)"
+        if result["schedules"] != old["schedules"]:
+            regressions.append(f"{label}: {old['schedules']} -> {result['schedules']} schedules")
+        for field, unit in (("wall_time", "s"), ("peak_bytes", " bytes")):
+            if old[field] and result[field] > old[field] * (1 + tolerance):
+                regressions.append(f"{label}: {field} {old[field]:.4g}{unit} -> {result[field]:.4g}{unit}")
+    return regressions
+
+
+def parse_args(argv=None):
+    """Parse the command-line arguments of the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the curriculum planner on synthetic catalogs.")
+    parser.add_argument("--sizes", default="4,8,12,16", help="comma-separated course counts (default: 4,8,12,16)")
+    parser.add_argument("--lectures", type=int, default=2, help="lectures per course (default: 2)")
+    parser.add_argument("--tutorials", type=int, default=3, help="tutorial options per course (default: 3)")
+    parser.add_argument("--conflict-rate", type=float, default=0.3,
+                        help="chance of placing a session on an already used slot (default: 0.3)")
+    parser.add_argument("--optional-fraction", type=float, default=0.5,
+                        help="share of optional courses (default: 0.5)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement (default: 3)")
+    parser.add_argument("--output", "-o", help="JSON report file (default: stdout)")
+    parser.add_argument("--baseline", help="earlier JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative slowdown against the baseline (default: 0.2)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    report = run_benchmark(
+        sizes, args.lectures, args.tutorials, args.conflict_rate, args.optional_fraction, args.seed, args.repeat
+    )
+
+    text = json.dumps(report, indent=2)
+    if args.output in (None, "-"):
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = find_regressions(json.load(f), report, args.tolerance)
+        for regression in regressions:
+            print(f"[REGRESSION] {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
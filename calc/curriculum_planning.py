@@ -4,7 +4,335 @@ Curriculum Planning Calendar
 Print an ASCII calendar with time slots for Days 1-5
 """
 
-from ssl import get_default_verify_paths
+import argparse
+import csv
+import hashlib
+import heapq
+import html
+import json
+import multiprocessing
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from itertools import chain, count, islice, product
+from math import prod
+
+
+# Number of days of the weekly grid (DAY 1-5)
+NUM_DAYS = 5
+
+# Number of schedules listed per page in the interactive planner
+SCHEDULE_PAGE_SIZE = 20
+
+
+def parse_minutes(text):
+    """
+    Parse a time of day such as "8:30" or "08:30" into minutes after midnight.
+    
+    Raises:
+        ValueError: If the text is not a valid H:MM time
+    """
+    hours, sep, minutes = text.strip().partition(":")
+    if not sep or not hours.isdigit() or not minutes.isdigit() or len(minutes) != 2:
+        raise ValueError(f"invalid time {text!r}, expected H:MM")
+    if int(hours) > 24 or int(minutes) > 59:
+        raise ValueError(f"invalid time {text!r}")
+    return int(hours) * 60 + int(minutes)
+
+
+def format_minutes(minutes):
+    """Format minutes after midnight as H:MM (e.g. 510 -> "8:30")."""
+    return f"{minutes // 60}:{minutes % 60:02d}"
+
+
+class TimeGrid:
+    """
+    A weekly timetable grid: named days, each with the same named time slots.
+    
+    Slots are minute intervals and may have any length; they may also overlap
+    each other. Courses give their times either as (day_index, slot_index) on
+    the grid or as (day_index, start_minute, end_minute) intervals.
+    
+    For conflict checks every time is turned into a bitmask. The slot
+    boundaries of a day cut it into elementary segments (coordinate
+    compression), each of which is one bit, numbered row-major by day. A time
+    sets the bits of every segment it overlaps, so two times conflict exactly
+    when their masks share a bit, whether or not they are equal. Finding the
+    segments of an interval is a binary search over the sorted boundaries,
+    O(log n) in the number of slots. Minutes between slots (breaks) belong to
+    no segment.
+    
+    Conflicts are exact for times whose ends fall on slot boundaries and are
+    otherwise rounded out to whole segments, so a grid should have the
+    granularity of its timetable, e.g. TimeGrid.uniform(step=15).
+    
+    Attributes:
+        days (list): Day names, e.g. "DAY 1"
+        slots (list): (name, start_minute, end_minute) of each time slot
+        bits_per_day (int): Number of segments (bits) of one day
+    
+    Example:
+        grid = TimeGrid.uniform(start=8 * 60, end=21 * 60, step=15)
+        course = Course("MAT1001", "Calculus", lectures=[(0, 9 * 60, 10 * 60 + 30)], grid=grid)
+    """
+    
+    def __init__(self, days, slots):
+        """
+        Initialize a grid.
+        
+        Args:
+            days (list): Day names
+            slots (list): (name, start_minute, end_minute) tuples, in display order
+        
+        Raises:
+            ValueError: If there are no days or slots, or a slot is empty
+        """
+        if not days or not slots:
+            raise ValueError("a time grid needs at least one day and one slot")
+        for name, start, end in slots:
+            if not 0 <= start < end <= 24 * 60:
+                raise ValueError(f"slot {name!r} must start before it ends, within one day")
+        self.days = list(days)
+        self.slots = [(name, start, end) for name, start, end in slots]
+        
+        # Elementary segments: consecutive boundaries covered by some slot
+        boundaries = sorted({minute for _, start, end in self.slots for minute in (start, end)})
+        self._segment_starts = []
+        self._segment_ends = []
+        for seg_start, seg_end in zip(boundaries, boundaries[1:]):
+            if any(start <= seg_start and seg_end <= end for _, start, end in self.slots):
+                self._segment_starts.append(seg_start)
+                self._segment_ends.append(seg_end)
+        self.bits_per_day = len(self._segment_starts)
+        self._slot_masks = [self._day_interval_mask(start, end) for _, start, end in self.slots]
+    
+    @classmethod
+    def uniform(cls, days=None, start=8 * 60, end=21 * 60, step=15):
+        """
+        Build a grid of equal slots, named by their start time.
+        
+        Args:
+            days (list, optional): Day names; DAY 1-5 by default
+            start (int): Start of the first slot, in minutes after midnight
+            end (int): End of the last slot, in minutes after midnight
+            step (int): Slot length in minutes
+        
+        Returns:
+            TimeGrid: The grid
+        """
+        if days is None:
+            days = [f"DAY {day_num}" for day_num in range(1, NUM_DAYS + 1)]
+        slots = [
+            (format_minutes(minute), minute, min(minute + step, end))
+            for minute in range(start, end, step)
+        ]
+        return cls(days, slots)
+    
+    def __repr__(self):
+        return f"TimeGrid(days={self.days}, slots={self.slots})"
+    
+    def __eq__(self, other):
+        return isinstance(other, TimeGrid) and (self.days, self.slots) == (other.days, other.slots)
+    
+    def __hash__(self):
+        return hash((tuple(self.days), tuple(self.slots)))
+    
+    @property
+    def num_days(self):
+        return len(self.days)
+    
+    @property
+    def num_slots(self):
+        return len(self.slots)
+    
+    def _day_interval_mask(self, start, end):
+        """Get the segments of one day overlapping [start, end), as a mask of the first day."""
+        first = bisect_right(self._segment_ends, start)
+        last = bisect_left(self._segment_starts, end)
+        if first >= last:
+            return 0
+        return ((1 << (last - first)) - 1) << first
+    
+    def validate_time(self, time):
+        """
+        Check a (day_index, slot_index) or (day_index, start_minute, end_minute) time.
+        
+        Raises:
+            ValueError: If the time is not on the grid
+        """
+        if len(time) == 2:
+            day_idx, slot_idx = time
+            if not 0 <= slot_idx < self.num_slots:
+                raise ValueError(f"slot index {slot_idx} is not in 0-{self.num_slots - 1}")
+        elif len(time) == 3:
+            day_idx, start, end = time
+            if not start < end:
+                raise ValueError(f"interval {format_minutes(start)}-{format_minutes(end)} is empty")
+            if not self._day_interval_mask(start, end):
+                raise ValueError(
+                    f"interval {format_minutes(start)}-{format_minutes(end)} does not overlap any time slot"
+                )
+        else:
+            raise ValueError(f"invalid time {time!r}")
+        if not 0 <= day_idx < self.num_days:
+            raise ValueError(f"day index {day_idx} is not in 0-{self.num_days - 1}")
+    
+    def time_mask(self, time):
+        """
+        Get the bitmask of one time.
+        
+        Args:
+            time (tuple): (day_index, slot_index) or (day_index, start_minute, end_minute)
+        
+        Returns:
+            int: Bitmask of the segments the time overlaps
+        """
+        if len(time) == 2:
+            day_idx, slot_idx = time
+            return self._slot_masks[slot_idx] << (day_idx * self.bits_per_day)
+        day_idx, start, end = time
+        return self._day_interval_mask(start, end) << (day_idx * self.bits_per_day)
+    
+    def times_mask(self, times):
+        """Get the bitwise OR of time_mask() for every time."""
+        mask = 0
+        for time in times:
+            mask |= self.time_mask(time)
+        return mask
+    
+    def day_mask(self, day_idx):
+        """Get the bitmask of all segments of one day."""
+        return ((1 << self.bits_per_day) - 1) << (day_idx * self.bits_per_day)
+    
+    def slot_row_mask(self, slot_idx):
+        """Get the bitmask of one time slot on every day."""
+        return self.times_mask((day_idx, slot_idx) for day_idx in range(self.num_days))
+    
+    def gap_mask(self, mask):
+        """
+        Get the empty segments lying between two occupied segments of the same day.
+        
+        Args:
+            mask (int): Bitmask of occupied segments
+        
+        Returns:
+            int: Bitmask of the gap segments
+        """
+        gaps = 0
+        for day_idx in range(self.num_days):
+            day_segments = mask & self.day_mask(day_idx)
+            if day_segments:
+                # All segments from the first to the last occupied one, minus the occupied ones
+                lowest = day_segments & -day_segments
+                span = (1 << day_segments.bit_length()) - lowest
+                gaps |= span & ~day_segments
+        return gaps
+    
+    def slots_of(self, time):
+        """
+        Get the time slots a time overlaps.
+        
+        Args:
+            time (tuple): (day_index, slot_index) or (day_index, start_minute, end_minute)
+        
+        Returns:
+            list: (day_index, slot_index) of each overlapping slot, in slot order
+        """
+        if len(time) == 2:
+            return [tuple(time)]
+        day_idx, start, end = time
+        return [
+            (day_idx, slot_idx)
+            for slot_idx, (_, slot_start, slot_end) in enumerate(self.slots)
+            if slot_start < end and start < slot_end
+        ]
+    
+    def slot_label(self, slot_idx):
+        """Get the time range of a slot, e.g. "8:30-10:20"."""
+        _, start, end = self.slots[slot_idx]
+        return f"{format_minutes(start)}-{format_minutes(end)}"
+    
+    def format_time(self, time):
+        """
+        Describe a time, e.g. "DAY 1 Morning 1 (8:30-10:20)" or "DAY 1 9:00-10:30".
+        
+        Args:
+            time (tuple): (day_index, slot_index) or (day_index, start_minute, end_minute)
+        """
+        if len(time) == 2:
+            day_idx, slot_idx = time
+            return f"{self.days[day_idx]} {self.slots[slot_idx][0]} ({self.slot_label(slot_idx)})"
+        day_idx, start, end = time
+        return f"{self.days[day_idx]} {format_minutes(start)}-{format_minutes(end)}"
+
+
+# The grid of the interactive planner: DAY 1-5 x Morning 1 to Evening 3
+DEFAULT_GRID = TimeGrid(
+    [f"DAY {day_num}" for day_num in range(1, NUM_DAYS + 1)],
+    [
+        ("Morning 1", parse_minutes("8:30"), parse_minutes("10:20")),
+        ("Morning 2", parse_minutes("10:30"), parse_minutes("11:50")),
+        ("Afternoon 1", parse_minutes("13:30"), parse_minutes("15:20")),
+        ("Afternoon 2", parse_minutes("15:30"), parse_minutes("16:50")),
+        ("Evening 1", parse_minutes("18:00"), parse_minutes("18:50")),
+        ("Evening 2", parse_minutes("19:00"), parse_minutes("19:50")),
+        ("Evening 3", parse_minutes("20:00"), parse_minutes("20:50")),
+    ],
+)
+
+
+def slot_bit(day_idx, slot_idx):
+    """
+    Get the bit representing one time slot of the default weekly grid.
+    
+    Slots are numbered row-major by day, so (day_idx, slot_idx) maps to
+    bit day_idx * 7 + slot_idx.
+    
+    Args:
+        day_idx (int): 0-4 (DAY 1-5)
+        slot_idx (int): 0-6 (Morning 1 to Evening 3)
+    
+    Returns:
+        int: Integer with only the bit of this slot set
+    """
+    return DEFAULT_GRID.time_mask((day_idx, slot_idx))
+
+
+def slots_to_mask(slots):
+    """
+    Convert a list of (day_index, slot_index) tuples to a slot bitmask of the default grid.
+    
+    Args:
+        slots (list): List of (day_index, slot_index) tuples
+    
+    Returns:
+        int: Bitwise OR of slot_bit() for every slot
+    """
+    return DEFAULT_GRID.times_mask(slots)
+
+
+def day_mask(day_idx):
+    """Get the bitmask of all time slots of one day of the default grid."""
+    return DEFAULT_GRID.day_mask(day_idx)
+
+
+def slot_row_mask(slot_idx):
+    """Get the bitmask of one time slot on every day of the default grid."""
+    return DEFAULT_GRID.slot_row_mask(slot_idx)
+
+
+def gap_mask(mask):
+    """Get the empty slots lying between two occupied slots of the same day of the default grid."""
+    return DEFAULT_GRID.gap_mask(mask)
 
 
 class Course:
@@ -17,7 +345,11 @@ class Course:
         lectures (list): List of tuples (day_index, slot_index) for lecture times
                         day_index: 0-4 represents DAY 1-5
                         slot_index: 0-6 represents time slots (0=Morning 1, 1=Morning 2, etc.)
+                        A time may also be a (day_index, start_minute, end_minute) interval
         tutorials (list): List of tuples (day_index, slot_index) for tutorial times
+        grid (TimeGrid): The grid the times refer to
+        lecture_mask (int): Slot bitmask of all lectures (see TimeGrid.time_mask)
+        tutorial_masks (list): Slot bitmask of each tutorial option, in the same order as tutorials
     
     Example:
         course = Course(
@@ -28,7 +360,9 @@ class Course:
         )
     """
     
-    def __init__(self, course_code, course_name, lectures=None, tutorials=None):
+    __slots__ = ("course_code", "course_name", "lectures", "tutorials", "grid", "lecture_mask", "tutorial_masks")
+    
+    def __init__(self, course_code, course_name, lectures=None, tutorials=None, grid=None):
         """
         Initialize a Course object.
         
@@ -37,11 +371,16 @@ class Course:
             course_name (str): The course name
             lectures (list, optional): List of (day_index, slot_index) tuples for lectures
             tutorials (list, optional): List of (day_index, slot_index) tuples for tutorials
+            grid (TimeGrid, optional): The grid of the times; DEFAULT_GRID by default
         """
         self.course_code = course_code
         self.course_name = course_name
         self.lectures = lectures if lectures is not None else []
         self.tutorials = tutorials if tutorials is not None else []
+        self.grid = grid if grid is not None else DEFAULT_GRID
+        # Precomputed slot bitmasks, so conflict checks are a single bitwise AND
+        self.lecture_mask = self.grid.times_mask(self.lectures)
+        self.tutorial_masks = [self.grid.time_mask(time) for time in self.tutorials]
     
     def __repr__(self):
         return f"Course(code='{self.course_code}', name='{self.course_name}', lectures={self.lectures}, tutorials={self.tutorials})"
@@ -53,18 +392,23 @@ class Course:
         """
         Get all time slots (both lectures and tutorials) for this course.
         
+        A (day_index, start_minute, end_minute) interval gives every time slot
+        of the grid it overlaps.
+        
         Returns:
             list: List of tuples (day_index, slot_index, type) where type is 'Lecture' or 'Tutorial'
         """
         slots = []
-        for day_idx, slot_idx in self.lectures:
-            slots.append((day_idx, slot_idx, 'Lecture'))
-        for day_idx, slot_idx in self.tutorials:
-            slots.append((day_idx, slot_idx, 'Tutorial'))
+        for time in self.lectures:
+            for day_idx, slot_idx in self.grid.slots_of(time):
+                slots.append((day_idx, slot_idx, 'Lecture'))
+        for time in self.tutorials:
+            for day_idx, slot_idx in self.grid.slots_of(time):
+                slots.append((day_idx, slot_idx, 'Tutorial'))
         return slots
 
 
-def print_calendar():
+def print_calendar(grid=None):
     """
     Print a weekly calendar with the following time slots:
     - Morning 1: 8:30-10:20
@@ -74,48 +418,14 @@ def print_calendar():
     - Evening 1: 18:00-18:50
     - Evening 2: 19:00-19:50
     - Evening 3: 20:00-20:50
-    """
-    
-    # Define time slots
-    time_slots = [
-        ("Morning 1", "8:30-10:20"),
-        ("Morning 2", "10:30-11:50"),
-        ("Afternoon 1", "13:30-15:20"),
-        ("Afternoon 2", "15:30-16:50"),
-        ("Evening 1", "18:00-18:50"),
-        ("Evening 2", "19:00-19:50"),
-        ("Evening 3", "20:00-20:50"),
-    ]
-    
-    days = ["DAY 1", "DAY 2", "DAY 3", "DAY 4", "DAY 5"]
-    
-    # Print header separator
-    print("=" * 100)
-    
-    # Print day headers
-    header = "Time Slot\t\t"
-    for day in days:
-        header += f"{day}\t\t"
-    print(header)
     
-    print("=" * 100)
-    
-    # Print each time slot
-    for slot_name, slot_time in time_slots:
-        # Print slot name and time
-        row = f"{slot_name} {slot_time}\t"
-        
-        # Print empty cells for each day
-        for _ in days:
-            row += "\t\t"
-        
-        print(row)
-        print("-" * 100)
-    
-    print()
+    Args:
+        grid (TimeGrid, optional): Grid to print instead of DEFAULT_GRID
+    """
+    print_calendar_with_courses({}, grid=grid)
 
 
-def print_calendar_with_courses(schedule=None):
+def print_calendar_with_courses(schedule=None, grid=None):
     """
     Print a weekly calendar with courses filled in.
     
@@ -124,6 +434,7 @@ def print_calendar_with_courses(schedule=None):
                   {(day_index, slot_index): "Course Name"}
                   day_index: 0-4 (DAY 1-5)
                   slot_index: 0-6 (Morning 1 to Evening 3)
+        grid (TimeGrid, optional): Grid of the days and slots; DEFAULT_GRID by default
     
     Example:
         schedule = {
@@ -135,454 +446,3174 @@ def print_calendar_with_courses(schedule=None):
     
     if schedule is None:
         schedule = {}
-    
-    # Define time slots
-    time_slots = [
-        ("Morning 1", "8:30-10:20"),
-        ("Morning 2", "10:30-11:50"),
-        ("Afternoon 1", "13:30-15:20"),
-        ("Afternoon 2", "15:30-16:50"),
-        ("Evening 1", "18:00-18:50"),
-        ("Evening 2", "19:00-19:50"),
-        ("Evening 3", "20:00-20:50"),
-    ]
-    
-    days = ["DAY 1", "DAY 2", "DAY 3", "DAY 4", "DAY 5"]
-    
-    # Print header separator
-    print("=" * 100)
-    
-    # Print day headers
-    header = "Time Slot\t\t"
-    for day in days:
-        header += f"{day}\t\t"
-    print(header)
-    
-    print("=" * 100)
-    
-    # Print each time slot
-    for slot_idx, (slot_name, slot_time) in enumerate(time_slots):
-        # Print slot name and time
-        row = f"{slot_name} {slot_time}\t"
-        
-        # Print cells for each day
-        for day_idx in range(len(days)):
-            course = schedule.get((day_idx, slot_idx), "")
-            row += f"{course}\t\t"
-        
-        print(row)
-        print("-" * 100)
-    
-    print()
+    sys.stdout.write(CalendarRenderer.for_grid(grid).render(schedule))
 
 
-def print_calendar_with_course_list(courses):
+def print_calendar_with_course_list(courses, grid=None):
     """
     Print a weekly calendar with courses from a list of Course objects.
     Uses course codes to fill in the calendar slots.
     
+    A course given by minute intervals is shown in every slot its times overlap.
+    
     Args:
         courses (list): List of Course objects
+        grid (TimeGrid, optional): Grid to print; the grid of the courses by default
     
     Example:
         course1 = Course("MAT1001", "Calculus", lectures=[(0, 0), (2, 0)], tutorials=[(1, 1)])
         course2 = Course("PHY1001", "Physics", lectures=[(0, 2), (3, 2)])
         print_calendar_with_course_list([course1, course2])
     """
+    if grid is None:
+        grid = courses[0].grid if courses else DEFAULT_GRID
     
-    # Define time slots
-    time_slots = [
-        ("Morning 1", "8:30-10:20"),
-        ("Morning 2", "10:30-11:50"),
-        ("Afternoon 1", "13:30-15:20"),
-        ("Afternoon 2", "15:30-16:50"),
-        ("Evening 1", "18:00-18:50"),
-        ("Evening 2", "19:00-19:50"),
-        ("Evening 3", "20:00-20:50"),
-    ]
+    # Add lectures, then tutorials of each course
+    sessions = (
+        (course, time)
+        for course in courses
+        for time in chain(course.lectures, course.tutorials)
+    )
+    print_calendar_with_courses(_calendar_cells(sessions, grid), grid=grid)
+
+
+def print_calendar_with_schedule(schedule, grid=None):
+    """
+    Print a weekly calendar of one schedule: all lectures of its courses and
+    only their selected tutorials.
     
-    days = ["DAY 1", "DAY 2", "DAY 3", "DAY 4", "DAY 5"]
+    Args:
+        schedule (Schedule or tuple): Schedule, or (course_list, tutorial_selection)
+        grid (TimeGrid, optional): Grid to print; the grid of the courses by default
+    """
+    if grid is None:
+        grid = _schedule_grid(schedule)
+    sys.stdout.write(CalendarRenderer.for_grid(grid).render_schedule(schedule))
+
+
+def _schedule_grid(schedule):
+    """Get the grid of a schedule's courses (DEFAULT_GRID if it has none)."""
+    courses = schedule.courses if isinstance(schedule, Schedule) else schedule[0]
+    return courses[0].grid if courses else DEFAULT_GRID
+
+
+def _calendar_cells(sessions, grid):
+    """
+    Build the cells of a calendar from (course, time) sessions.
     
-    # Build schedule dictionary from course list
+    Returns:
+        dict: {(day_index, slot_index): "CODE / CODE ..."}
+    """
     schedule = {}
-    for course in courses:
-        # Add lectures
-        for day_idx, slot_idx in course.lectures:
-            key = (day_idx, slot_idx)
+    for course, time in sessions:
+        for key in grid.slots_of(time):
             if key in schedule:
                 # If slot is already occupied, append to it
                 schedule[key] += f" / {course.course_code}"
             else:
                 schedule[key] = f"{course.course_code}"
+    return schedule
+
+
+class CalendarRenderer:
+    """
+    Fast renderer of calendars of one grid, as text or HTML.
+    
+    The static parts of the calendar (headers, slot labels, separators and
+    tabs) are laid out once as a list of string pieces, with the position of
+    every (day, slot) cell recorded, and the cells each course time occupies
+    are worked out once per time. Rendering copies the pieces, drops the cell
+    texts in by index and joins them, so a whole calendar is one string that
+    can be written to a stream with a single call.
+    
+    Example:
+        renderer = CalendarRenderer.for_grid(DEFAULT_GRID)
+        sys.stdout.write(renderer.render_schedule(schedule))
+    """
+    
+    _by_grid = {}
+    
+    # Distinct times whose cells a renderer keeps before starting over
+    MAX_CACHED_TIMES = 4096
+    
+    def __init__(self, grid=None):
+        """
+        Build the calendar templates of a grid.
         
-        # Add tutorials
-        for day_idx, slot_idx in course.tutorials:
-            key = (day_idx, slot_idx)
-            if key in schedule:
-                # If slot is already occupied, append to it
-                schedule[key] += f" / {course.course_code}"
-            else:
-                schedule[key] = f"{course.course_code}"
+        Args:
+            grid (TimeGrid, optional): The grid; DEFAULT_GRID by default
+        """
+        self.grid = grid if grid is not None else DEFAULT_GRID
+        days = self.grid.days
+        slot_titles = [f"{name} {self.grid.slot_label(slot_idx)}" for slot_idx, (name, _, _) in enumerate(self.grid.slots)]
+        
+        # Cells are numbered row by row: slot_idx * num_days + day_idx
+        # Text: the layout of print_calendar_with_courses
+        self._text_parts = ["=" * 100 + "\nTime Slot\t\t" + "".join(f"{day}\t\t" for day in days) + "\n" + "=" * 100 + "\n"]
+        self._text_positions = []
+        for title in slot_titles:
+            self._text_parts.append(f"{title}\t")
+            for _ in days:
+                self._text_positions.append(len(self._text_parts))
+                self._text_parts.append("")
+                self._text_parts.append("\t\t")
+            self._text_parts.append("\n" + "-" * 100 + "\n")
+        self._text_parts.append("\n")
+        
+        # HTML: one table per calendar
+        self._html_parts = [
+            "<table>\n<tr><th>Time Slot</th>" + "".join(f"<th>{html.escape(day)}</th>" for day in days) + "</tr>\n"
+        ]
+        self._html_positions = []
+        for title in slot_titles:
+            self._html_parts.append(f"<tr><th>{html.escape(title)}</th>")
+            for _ in days:
+                self._html_parts.append("<td>")
+                self._html_positions.append(len(self._html_parts))
+                self._html_parts.append("")
+                self._html_parts.append("</td>")
+            self._html_parts.append("</tr>\n")
+        self._html_parts.append("</table>\n")
+        
+        # time tuple -> cell numbers; keyed on the times rather than the courses,
+        # so it holds no courses and stays right when their times are changed
+        self._cells_by_time = {}
     
-    # Print header separator
-    print("=" * 100)
+    @classmethod
+    def for_grid(cls, grid=None):
+        """Get the shared renderer of a grid, building it on first use."""
+        grid = grid if grid is not None else DEFAULT_GRID
+        renderer = cls._by_grid.get(grid)
+        if renderer is None:
+            renderer = cls._by_grid[grid] = cls(grid)
+        return renderer
     
-    # Print day headers
-    header = "Time Slot\t\t"
-    for day in days:
-        header += f"{day}\t\t"
-    print(header)
+    def _time_cells(self, time):
+        """Get the numbers of the cells a time overlaps, computed once per time."""
+        time = tuple(time)
+        cells = self._cells_by_time.get(time)
+        if cells is None:
+            if len(self._cells_by_time) >= self.MAX_CACHED_TIMES:
+                self._cells_by_time.clear()
+            num_days = self.grid.num_days
+            cells = self._cells_by_time[time] = tuple(
+                slot_idx * num_days + day_idx for day_idx, slot_idx in self.grid.slots_of(time)
+            )
+        return cells
     
-    print("=" * 100)
+    def _fill(self, schedule):
+        """Get {cell number: "CODE / CODE ..."} of a schedule."""
+        if isinstance(schedule, Schedule):
+            taken = schedule._taken()
+        else:
+            course_list, tutorial_selection = schedule
+            taken = (
+                (course, course.tutorials.index(tutorial_selection[course]) if course in tutorial_selection else NO_TUTORIAL)
+                for course in course_list
+            )
+        
+        texts = {}
+        time_cells = self._time_cells
+        for course, choice in taken:
+            code = course.course_code
+            # Lectures, then the selected tutorial
+            times = course.lectures if choice == NO_TUTORIAL else (*course.lectures, course.tutorials[choice])
+            for time in times:
+                for cell in time_cells(time):
+                    if cell in texts:
+                        # If slot is already occupied, append to it
+                        texts[cell] += f" / {code}"
+                    else:
+                        texts[cell] = f"{code}"
+        return texts
+    
+    def _cell_numbers(self, cells):
+        """Convert {(day_index, slot_index): text} to {cell number: text}, dropping keys off the grid."""
+        num_days, num_slots = self.grid.num_days, self.grid.num_slots
+        return {
+            slot_idx * num_days + day_idx: text
+            for (day_idx, slot_idx), text in cells.items()
+            if 0 <= day_idx < num_days and 0 <= slot_idx < num_slots
+        }
     
-    # Print each time slot
-    for slot_idx, (slot_name, slot_time) in enumerate(time_slots):
-        # Print slot name and time
-        row = f"{slot_name} {slot_time}\t"
+    def _render_text(self, texts):
+        parts = self._text_parts.copy()
+        positions = self._text_positions
+        for cell, text in texts.items():
+            parts[positions[cell]] = f"{text}"
+        return "".join(parts)
+    
+    def _render_html(self, texts):
+        parts = self._html_parts.copy()
+        positions = self._html_positions
+        for cell, text in texts.items():
+            parts[positions[cell]] = html.escape(f"{text}")
+        return "".join(parts)
+    
+    def render(self, cells):
+        """
+        Render a text calendar.
         
-        # Print cells for each day
-        for day_idx in range(len(days)):
-            course_info = schedule.get((day_idx, slot_idx), "")
-            row += f"{course_info}\t\t"
+        Args:
+            cells (dict): {(day_index, slot_index): text}; keys off the grid are ignored
         
-        print(row)
-        print("-" * 100)
+        Returns:
+            str: The calendar, as printed by print_calendar_with_courses
+        """
+        return self._render_text(self._cell_numbers(cells))
     
-    print()
+    def render_html(self, cells):
+        """
+        Render an HTML table calendar.
+        
+        Args:
+            cells (dict): {(day_index, slot_index): text}; keys off the grid are ignored
+        
+        Returns:
+            str: A <table> element
+        """
+        return self._render_html(self._cell_numbers(cells))
+    
+    def schedule_cells(self, schedule):
+        """
+        Get the calendar cells of a schedule: all lectures of its courses and
+        only their selected tutorials.
+        
+        Args:
+            schedule (Schedule or tuple): Schedule, or (course_list, tutorial_selection)
+        
+        Returns:
+            dict: {(day_index, slot_index): "CODE / CODE ..."}
+        """
+        num_days = self.grid.num_days
+        return {divmod(cell, num_days)[::-1]: text for cell, text in self._fill(schedule).items()}
+    
+    def render_schedule(self, schedule):
+        """Render the text calendar of a schedule."""
+        return self._render_text(self._fill(schedule))
+    
+    def render_schedule_html(self, schedule):
+        """Render the HTML table calendar of a schedule."""
+        return self._render_html(self._fill(schedule))
+    
+    def render_page(self, schedule, index):
+        """
+        Render one schedule as listed by print_all_valid_schedules: a title,
+        its courses and its calendar.
+        
+        Args:
+            schedule (Schedule or tuple): Schedule, or (course_list, tutorial_selection)
+            index (int): 1-based number of the schedule
+        
+        Returns:
+            str: The page
+        """
+        course_list = schedule.course_list if isinstance(schedule, Schedule) else schedule[0]
+        course_codes = ", ".join([course.course_code for course in course_list])
+        lines = [
+            "=" * 100,
+            f"SCHEDULE #{index} - {len(course_list)} course(s): [{course_codes}]",
+            "=" * 100,
+            "\nCourses in this schedule:",
+        ]
+        lines.extend(f"  • {course.course_code}: {course.course_name}" for course in course_list)
+        lines.append("\nCalendar View:")
+        return "\n".join(lines) + "\n" + self.render_schedule(schedule)
+
+
+# Search choice of a course that is taken but has no tutorial options
+# (a skipped course has choice None, otherwise the choice is the tutorial index)
+NO_TUTORIAL = -1
 
 
-def find_all_valid_schedules(courses):
+def _check_same_grid(courses):
     """
-    Find all valid course schedules where no time slots conflict.
+    Check that courses planned together use the same time grid.
     
-    For each course:
-    - ALL lecture time slots must be included (mandatory)
-    - Only ONE tutorial time slot needs to be selected from available options
+    Raises:
+        ValueError: If two courses use different grids, whose slot masks cannot be compared
+    """
+    for course in courses[1:]:
+        if course.grid is not courses[0].grid and course.grid != courses[0].grid:
+            raise ValueError(
+                f"{course.course_code} and {courses[0].course_code} use different time grids"
+            )
+
+
+def _course_key(course):
+    """Get the content of a course that decides its timetable: its code and times."""
+    return (course.course_code, tuple(map(tuple, course.lectures)), tuple(map(tuple, course.tutorials)))
+
+
+def _unique_courses(required_courses, optional_courses):
+    """
+    Drop repeated courses from a plan, so each timetable is found only once.
     
-    Args:
-        courses (list): List of Course objects
+    Courses are compared by content (see _course_key), so a course listed more
+    than once, as the same Course object or as equal copies, keeps its first
+    entry; a course that is both required and optional stays required.
     
     Returns:
-        list: List of tuples (course_selection, tutorial_selection) where:
-              - course_selection: list of Course objects that can be taken together
-              - tutorial_selection: dict mapping course to selected tutorial slot (day_idx, slot_idx)
-    
-    Example:
-        course1 = Course("MAT1001", "Calculus", lectures=[(0, 0)], tutorials=[(1, 1), (2, 1)])
-        course2 = Course("PHY1001", "Physics", lectures=[(0, 2)], tutorials=[(1, 1), (3, 2)])
-        # Math and Physics lectures don't conflict
-        # But both have tutorial option at (1, 1), so we need to pick different tutorial times
-        
-        valid_schedules = find_all_valid_schedules([course1, course2])
-        # Returns combinations where tutorial times don't conflict
+        tuple: (required_courses, optional_courses) as tuples
     """
-    from itertools import combinations, product
-    
-    def lectures_conflict(course_list):
-        """Check if lectures of courses conflict."""
-        occupied_slots = set()
-        for course in course_list:
-            for day_idx, slot_idx in course.lectures:
-                slot = (day_idx, slot_idx)
-                if slot in occupied_slots:
-                    return True
-                occupied_slots.add(slot)
-        return False
-    
-    def find_valid_tutorial_combinations(course_list):
-        """
-        Find all valid tutorial selections for a list of courses.
-        Returns list of dicts mapping course to selected tutorial slot.
-        """
-        # Get all lecture slots that are occupied
-        occupied_by_lectures = set()
-        for course in course_list:
-            for day_idx, slot_idx in course.lectures:
-                occupied_by_lectures.add((day_idx, slot_idx))
-        
-        # For each course, get available tutorial options (that don't conflict with lectures)
-        tutorial_options = []
-        courses_with_tutorials = []
-        
-        for course in course_list:
-            if course.tutorials:
-                # Filter out tutorials that conflict with lectures
-                available = [t for t in course.tutorials if t not in occupied_by_lectures]
-                if not available:
-                    # No valid tutorial time available for this course
-                    return []
-                tutorial_options.append(available)
-                courses_with_tutorials.append(course)
-            # If course has no tutorials, skip it
-        
-        if not courses_with_tutorials:
-            # No courses have tutorials
-            return [{}]
-        
-        # Generate all combinations of tutorial selections
-        valid_combinations = []
-        for tutorial_combo in product(*tutorial_options):
-            # Check if this combination has conflicts
-            tutorial_slots = set()
-            has_conflict = False
-            
-            for slot in tutorial_combo:
-                if slot in tutorial_slots or slot in occupied_by_lectures:
-                    has_conflict = True
-                    break
-                tutorial_slots.add(slot)
-            
-            if not has_conflict:
-                # Create mapping of course to selected tutorial
-                tutorial_selection = {}
-                for course, tutorial_slot in zip(courses_with_tutorials, tutorial_combo):
-                    tutorial_selection[course] = tutorial_slot
-                valid_combinations.append(tutorial_selection)
-        
-        return valid_combinations
+    seen = set()
+    unique = ([], [])
+    for courses, selected in zip((required_courses, optional_courses), unique):
+        for course in courses:
+            key = _course_key(course)
+            if key not in seen:
+                seen.add(key)
+                selected.append(course)
+    return tuple(unique[0]), tuple(unique[1])
+
+
+def _course_options(course, optional):
+    """
+    Get the search options of one course as (choice, slot_mask) pairs.
     
-    # Find all valid combinations
-    valid_schedules = []
+    A skipped course has choice None and occupies nothing; it is only an option
+    for optional courses and always comes first. Every other option takes ALL
+    lectures plus one tutorial whose slot does not clash with those lectures.
+    A tutorial time listed more than once is only an option once, under its
+    first index, since it gives the same timetable.
     
-    # Try all possible combinations of courses (from 1 course to all courses)
-    for r in range(1, len(courses) + 1):
-        for combination in combinations(courses, r):
-            course_list = list(combination)
-            
-            # First check if lectures conflict
-            if lectures_conflict(course_list):
+    Args:
+        course (Course): The course
+        optional (bool): Whether the course may be left out
+    
+    Returns:
+        list: List of (choice, slot_mask) tuples
+    """
+    options = [(None, 0)] if optional else []
+    if sum(course.grid.time_mask(time).bit_count() for time in course.lectures) > course.lecture_mask.bit_count():
+        # Lectures of the course overlap each other
+        return options
+    if course.tutorials:
+        seen_times = set()
+        for tutorial_idx, (time, tutorial_mask) in enumerate(zip(course.tutorials, course.tutorial_masks)):
+            if tuple(time) in seen_times:
                 continue
-            
-            # Then find all valid tutorial combinations
-            tutorial_combos = find_valid_tutorial_combinations(course_list)
-            
-            for tutorial_selection in tutorial_combos:
-                valid_schedules.append((course_list, tutorial_selection))
+            seen_times.add(tuple(time))
+            if not tutorial_mask & course.lecture_mask:
+                options.append((tutorial_idx, course.lecture_mask | tutorial_mask))
+    else:
+        options.append((NO_TUTORIAL, course.lecture_mask))
+    return options
+
+
+class SearchStats:
+    """
+    Counters and phase timings of a schedule search.
     
-    # Filter out schedules that are subsets of other schedules
-    # We only want maximal schedules (schedules that can't add more courses)
-    maximal_schedules = []
-    for schedule in valid_schedules:
-        course_list, _ = schedule
-        is_maximal = True
-        
-        for other_schedule in valid_schedules:
-            other_course_list, _ = other_schedule
-            if len(other_course_list) > len(course_list):
-                # Check if course_list is a subset of other_course_list
-                if all(course in other_course_list for course in course_list):
-                    is_maximal = False
-                    break
-        
-        if is_maximal:
-            maximal_schedules.append(schedule)
+    Pass an instance as stats= to the search functions to fill it in; without
+    one the counts are dropped and the phases are not timed. Counts add up over every
+    search the instance is passed to. The node, conflict and leaf counters cover
+    the backtracking search in this process, so they miss the subtrees searched
+    by worker processes and the "dlx" engine.
     
-    return maximal_schedules
+    Attributes:
+        nodes (int): Course options placed in the search tree (combinations visited)
+        conflicts (int): Options rejected because they collide with occupied slots
+        leaves (int): Conflict-free choices of a whole component found by the search
+        combinations (int): Combinations of per-component sub-schedules tried
+        maximality_checks (int): Lookups made by the maximal-schedule filter
+        cache_hits (int): Sub-searches answered by subsolution_cache
+        cache_misses (int): Sub-searches that had to be run
+        schedules (int): Schedules returned to the caller
+        phase_times (dict): Seconds spent in each phase: "setup" (building the
+                            search space), "search", "maximal_filter", "build"
+                            (making Schedule records, when done separately from
+                            the search) and "cache" (ScheduleCache lookups)
+    """
+    
+    COUNTERS = ("nodes", "conflicts", "leaves", "combinations", "maximality_checks",
+                "cache_hits", "cache_misses", "schedules")
+    
+    def __init__(self):
+        """Initialize all counters to zero."""
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.phase_times = {}
+    
+    def __repr__(self):
+        counters = ", ".join(f"{name}={getattr(self, name)}" for name in self.COUNTERS)
+        return f"SearchStats({counters})"
+    
+    def add_time(self, phase, seconds):
+        """Add seconds to the time spent in a phase."""
+        self.phase_times[phase] = self.phase_times.get(phase, 0.0) + seconds
+    
+    @contextmanager
+    def phase(self, name):
+        """Context manager timing the enclosed block as part of a phase."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+    
+    def as_dict(self):
+        """
+        Get the statistics as a dictionary.
+        
+        Returns:
+            dict: One entry per counter, plus "phase_times" in seconds
+        """
+        stats = {name: getattr(self, name) for name in self.COUNTERS}
+        stats["phase_times"] = dict(self.phase_times)
+        return stats
+    
+    def to_json(self, indent=None):
+        """Get the statistics as a JSON string (see as_dict)."""
+        return json.dumps(self.as_dict(), indent=indent)
+
+
+class CancellationToken:
+    """
+    Flag to stop a running schedule search from another thread.
+    
+    The search checks the token cooperatively, at the same points where it
+    checks its time budget, and then returns the schedules found so far.
+    """
+    
+    def __init__(self):
+        """Initialize a token that is not cancelled."""
+        self.cancelled = False
+    
+    def cancel(self):
+        """Ask the searches using this token to stop."""
+        self.cancelled = True
+
+
+# Exhausted search branches between two checks of a SearchBudget
+BUDGET_CHECK_INTERVAL = 1024
+
+# Seconds between two checks of a cancellation token while waiting for worker processes
+BUDGET_POLL_INTERVAL = 0.05
+
+
+class SearchBudget:
+    """
+    Limits of a schedule search: a time budget, a schedule count and a cancellation token.
+    
+    The search calls exceeded() every BUDGET_CHECK_INTERVAL exhausted branches
+    and for every schedule it produces, and stops once it returns True. The
+    first limit hit is kept as stop_reason.
+    
+    Attributes:
+        deadline (float): time.monotonic() value after which the search stops, or None
+        max_schedules (int): Number of schedules to stop at, or None
+        cancel_token (CancellationToken): Token to stop at once cancelled, or None
+        stop_reason (str): None while within the limits, otherwise
+                           "time_budget", "max_schedules" or "cancelled"
+    """
+    
+    def __init__(self, time_budget=None, max_schedules=None, cancel_token=None):
+        """
+        Initialize the budget; the time budget starts counting now.
+        
+        Args:
+            time_budget (float, optional): Seconds the search may take
+            max_schedules (int, optional): Number of schedules to stop at
+            cancel_token (CancellationToken, optional): Token to stop at once cancelled
+        """
+        self.deadline = None if time_budget is None else time.monotonic() + time_budget
+        self.max_schedules = max_schedules
+        self.cancel_token = cancel_token
+        self.stop_reason = None
+    
+    def exceeded(self):
+        """Check whether the search is cancelled or out of time."""
+        if self.stop_reason is None:
+            if self.cancel_token is not None and self.cancel_token.cancelled:
+                self.stop_reason = "cancelled"
+            elif self.deadline is not None and time.monotonic() >= self.deadline:
+                self.stop_reason = "time_budget"
+        return self.stop_reason is not None
+
+
+class ScheduleList(list):
+    """
+    List of schedules that tells whether the search finished.
+    
+    Attributes:
+        partial (bool): Whether the search was stopped before finding every schedule
+        stop_reason (str): Why the search stopped early (see SearchBudget), or None
+    """
+    
+    def __init__(self, schedules=(), stop_reason=None):
+        """
+        Initialize the list.
+        
+        Args:
+            schedules (iterable): The schedules found
+            stop_reason (str, optional): Why the search stopped early
+        """
+        super().__init__(schedules)
+        self.stop_reason = stop_reason
+    
+    @property
+    def partial(self):
+        """Whether the search was stopped before finding every schedule."""
+        return self.stop_reason is not None
+
+
+def _iter_choices(course_options, occupied_mask=0, stats=None, budget=None, after=None):
+    """
+    Depth-first backtracking over the options of each course.
+    
+    Courses are added one at a time, and a branch is pruned as soon as the
+    slot mask of an option collides with the slots already occupied.
+    
+    Without stats, budget or after, the search runs in a plain loop that does
+    no bookkeeping at all. Otherwise only the yielded schedules and the
+    exhausted branches of each depth are counted while searching; the node and
+    conflict counts of stats are worked out from them when the search ends or
+    is abandoned.
+    
+    Args:
+        course_options (list): One list of (choice, slot_mask) options per course
+        occupied_mask (int): Slots taken before the search starts
+        stats (SearchStats, optional): Statistics to count the search in
+        budget (SearchBudget, optional): Limits to stop the search at
+        after (tuple, optional): Choices of a schedule to continue the search after,
+                                 as if it had just been yielded
+    
+    Yields:
+        tuple: One choice per course for every conflict-free schedule
+    """
+    if stats is None and budget is None and after is None:
+        return _iter_choices_plain(course_options, occupied_mask)
+    return _iter_choices_tracked(course_options, occupied_mask, stats, budget, after)
+
+
+def _iter_choices_plain(course_options, occupied_mask):
+    """The search of _iter_choices without statistics, budget or resumption."""
+    n = len(course_options)
+    if n == 0:
+        yield ()
+        return
+    
+    choices = [None] * n
+    occupied = [occupied_mask] * n  # occupied[depth]: slots taken by courses before depth
+    positions = [0] * n  # positions[depth]: next option to try at depth
+    depth = 0
+    while depth >= 0:
+        options = course_options[depth]
+        position = positions[depth]
+        occupied_mask = occupied[depth]
+        # Skip options colliding with the occupied slots
+        while position < len(options) and options[position][1] & occupied_mask:
+            position += 1
+        if position == len(options):
+            # Branch exhausted, backtrack
+            positions[depth] = 0
+            depth -= 1
+            continue
+        
+        choice, slot_mask = options[position]
+        positions[depth] = position + 1
+        choices[depth] = choice
+        if depth == n - 1:
+            yield tuple(choices)
+        else:
+            depth += 1
+            occupied[depth] = occupied_mask | slot_mask
+
+
+def _iter_choices_tracked(course_options, occupied_mask, stats, budget, after):
+    """The search of _iter_choices with statistics, a budget or a resumption point."""
+    n = len(course_options)
+    if n == 0:
+        if stats is not None:
+            stats.leaves += 1
+        yield ()
+        return
+    
+    choices = [None] * n
+    occupied = [occupied_mask] * n  # occupied[depth]: slots taken by courses before depth
+    positions = [0] * n  # positions[depth]: next option to try at depth
+    depth = 0
+    if after is not None:
+        # Restore the search path of the schedule
+        for depth, choice in enumerate(after):
+            options = course_options[depth]
+            position = [option_choice for option_choice, _ in options].index(choice)
+            choices[depth] = choice
+            positions[depth] = position + 1
+            if depth < n - 1:
+                occupied[depth + 1] = occupied[depth] | options[position][1]
+        depth = n - 1
+    ticks = BUDGET_CHECK_INTERVAL
+    exhausted = [0] * n  # exhausted[depth]: branches at depth whose options were all tried
+    leaves = 0
+    try:
+        while depth >= 0:
+            options = course_options[depth]
+            position = positions[depth]
+            occupied_mask = occupied[depth]
+            # Skip options colliding with the occupied slots
+            while position < len(options) and options[position][1] & occupied_mask:
+                position += 1
+            if position == len(options):
+                # Branch exhausted, backtrack
+                positions[depth] = 0
+                exhausted[depth] += 1
+                depth -= 1
+                if budget is not None:
+                    ticks -= 1
+                    if not ticks:
+                        if budget.exceeded():
+                            return
+                        ticks = BUDGET_CHECK_INTERVAL
+                continue
+            
+            choice, slot_mask = options[position]
+            positions[depth] = position + 1
+            choices[depth] = choice
+            if depth == n - 1:
+                leaves += 1
+                yield tuple(choices)
+            else:
+                depth += 1
+                occupied[depth] = occupied_mask | slot_mask
+    finally:
+        if stats is not None:
+            # Each branch at a depth below the first was entered by placing an
+            # option one depth up; an exhausted branch tried all its options, and
+            # a branch still on the path (up to depth) tried positions[depth] of them
+            entered = sum(exhausted[1:]) + max(depth, 0)
+            tried = sum(len(options) * count for options, count in zip(course_options, exhausted))
+            tried += sum(positions[:depth + 1])
+            stats.nodes += leaves + entered
+            stats.conflicts += tried - leaves - entered
+            stats.leaves += leaves
+
+
+def _timed(stats, phase):
+    """Time a block as a phase of stats, or do nothing without stats."""
+    return nullcontext() if stats is None else stats.phase(phase)
+
+
+def _reachable_masks(course_options):
+    """
+    Get the slots the remaining courses can occupy at each depth of the search.
+    
+    Args:
+        course_options (list): One list of (choice, slot_mask) options per course
+    
+    Returns:
+        list: reachable[depth] is the union of all option masks of courses depth..
+    """
+    reachable = [0] * (len(course_options) + 1)
+    for depth in range(len(course_options) - 1, -1, -1):
+        reachable_mask = reachable[depth + 1]
+        for _, slot_mask in course_options[depth]:
+            reachable_mask |= slot_mask
+        reachable[depth] = reachable_mask
+    return reachable
+
+
+class _ScheduleCounter:
+    """
+    Memoised count of the schedules below each node of the backtracking search.
+    
+    The number of ways to complete a schedule only depends on the course index
+    and the occupied slots. Occupied slots that no remaining course can use are
+    dropped from the key, so branches that differ only in earlier, unrelated
+    choices share one entry.
+    
+    Courses of independent components (see _SearchSpace) never share a slot,
+    so each component is counted on its own: a node has the completions of the
+    rest of its component times the counts of the later components. Every
+    component keeps its own memo, keyed by depths relative to its start, so
+    another counter over the same component can start from it.
+    """
+    
+    def __init__(self, course_options, components=None, memos=None):
+        """
+        Initialize the counter.
+        
+        Args:
+            course_options (list): One list of (choice, slot_mask) options per course
+            components (list, optional): (start, end) depth range of each independent
+                                         component; all courses form one by default
+            memos (list, optional): Memo dict of each component to start from
+        """
+        self.course_options = course_options
+        self.reachable = _reachable_masks(course_options)
+        if components is None:
+            components = [(0, len(course_options))] if course_options else []
+        self.components = components
+        self.memos = memos if memos is not None else [{} for _ in components]
+        self._component_at = [
+            component_idx for component_idx, (start, end) in enumerate(components) for _ in range(start, end)
+        ]
+        self._later_counts = None
+    
+    def count(self, depth=0, occupied_mask=0):
+        """
+        Count the conflict-free completions of courses depth.. given occupied slots.
+        
+        Args:
+            depth (int): Index of the next course to decide
+            occupied_mask (int): Slots taken by the courses before depth
+        
+        Returns:
+            int: Number of schedules in the subtree
+        """
+        if depth == len(self.course_options):
+            return 1
+        component_idx = self._component_at[depth]
+        if self._later_counts is None:
+            # _later_counts[idx] = product of the counts of the components after idx
+            self._later_counts = [1] * len(self.components)
+            for idx in range(len(self.components) - 1, 0, -1):
+                self._later_counts[idx - 1] = (
+                    self._count_component(idx, self.components[idx][0], 0) * self._later_counts[idx]
+                )
+        return self._count_component(component_idx, depth, occupied_mask) * self._later_counts[component_idx]
+    
+    def _count_component(self, component_idx, depth, occupied_mask):
+        """Count the completions of the courses depth.. of a component given occupied slots."""
+        start, end = self.components[component_idx]
+        if depth == end:
+            return 1
+        memo = self.memos[component_idx]
+        # Occupied slots of other components are never reachable, so the key only depends on this one
+        key = (depth - start, occupied_mask & self.reachable[depth])
+        total = memo.get(key)
+        if total is None:
+            total = 0
+            for _, slot_mask in self.course_options[depth]:
+                if not slot_mask & occupied_mask:
+                    total += self._count_component(component_idx, depth + 1, occupied_mask | slot_mask)
+            memo[key] = total
+        return total
+    
+    def unrank(self, index):
+        """
+        Build the search choices of the schedule at a position of the search order.
+        
+        Args:
+            index (int): 0-based position in the search order
+        
+        Returns:
+            tuple: One choice per course
+        
+        Raises:
+            IndexError: If index is not in range(self.count())
+        """
+        if index < 0 or index >= self.count():
+            raise IndexError(f"schedule index {index} out of range")
+        choices = []
+        occupied_mask = 0
+        for depth, options in enumerate(self.course_options):
+            for choice, slot_mask in options:
+                if slot_mask & occupied_mask:
+                    continue
+                subtree_count = self.count(depth + 1, occupied_mask | slot_mask)
+                if index < subtree_count:
+                    choices.append(choice)
+                    occupied_mask |= slot_mask
+                    break
+                index -= subtree_count
+        return tuple(choices)
+    
+    def rank(self, choices):
+        """
+        Get the position of search choices in the search order.
+        
+        Args:
+            choices (tuple): One choice per course
+        
+        Returns:
+            int: 0-based position in the search order
+        
+        Raises:
+            ValueError: If the choices are not a valid schedule
+        """
+        index = 0
+        occupied_mask = 0
+        for depth, (options, selected) in enumerate(zip(self.course_options, choices)):
+            for choice, slot_mask in options:
+                if slot_mask & occupied_mask:
+                    continue
+                if choice == selected:
+                    occupied_mask |= slot_mask
+                    break
+                index += self.count(depth + 1, occupied_mask | slot_mask)
+            else:
+                raise ValueError("not a valid schedule of these courses")
+        return index
+
+
+class Schedule:
+    """
+    One valid schedule, stored compactly and read-only.
+    
+    A schedule keeps a reference to the tuple of all courses of its plan, which
+    is shared by every schedule of the plan, a bitmask of the courses it takes
+    and the tutorial choice of each taken course. The course list and the
+    tutorial dict are only built when asked for, so a schedule costs a small
+    object and one tuple instead of a list and a dict.
+    
+    A Schedule unpacks like a (course_list, tutorial_selection) tuple:
+    
+        course_list, tutorial_selection = schedule
+    
+    Attributes:
+        courses (tuple): All Course objects of the plan
+        course_mask (int): Bitmask with bit i set if courses[i] is taken
+        tutorial_choices (tuple): Tutorial index of each taken course, in course
+                                  order, or NO_TUTORIAL for a course without tutorials
+    """
+    
+    __slots__ = ("_courses", "_course_mask", "_tutorial_choices")
+    
+    def __init__(self, courses, course_mask, tutorial_choices):
+        """
+        Initialize a schedule.
+        
+        Args:
+            courses (tuple): All Course objects of the plan
+            course_mask (int): Bitmask of the taken courses
+            tutorial_choices (tuple): Tutorial index of each taken course, in course order
+        """
+        self._courses = courses
+        self._course_mask = course_mask
+        self._tutorial_choices = tutorial_choices
+    
+    @classmethod
+    def from_choices(cls, courses, choices):
+        """
+        Build a schedule from search choices.
+        
+        Args:
+            courses (tuple): All Course objects of the plan
+            choices (tuple): One choice per course, as yielded by _iter_choices
+        
+        Returns:
+            Schedule: The schedule
+        """
+        course_mask = 0
+        tutorial_choices = []
+        for course_idx, choice in enumerate(choices):
+            if choice is not None:
+                course_mask |= 1 << course_idx
+                tutorial_choices.append(choice)
+        return cls(courses, course_mask, tuple(tutorial_choices))
+    
+    @property
+    def courses(self):
+        return self._courses
+    
+    @property
+    def course_mask(self):
+        return self._course_mask
+    
+    @property
+    def tutorial_choices(self):
+        return self._tutorial_choices
+    
+    @property
+    def course_list(self):
+        """List of the taken Course objects, in course order."""
+        return [course for course, _ in self._taken()]
+    
+    @property
+    def tutorial_selection(self):
+        """Dict mapping each taken course with tutorials to its selected tutorial time."""
+        return {
+            course: course.tutorials[choice]
+            for course, choice in self._taken()
+            if choice != NO_TUTORIAL
+        }
+    
+    def _taken(self):
+        """Yield (course, tutorial choice) of every taken course."""
+        remaining = self._course_mask
+        for choice in self._tutorial_choices:
+            course_bit = remaining & -remaining
+            remaining ^= course_bit
+            yield self._courses[course_bit.bit_length() - 1], choice
+    
+    def choices(self):
+        """
+        Get the search choice of every course of the plan.
+        
+        Returns:
+            list: None for a skipped course, else its tutorial index or NO_TUTORIAL
+        """
+        choices = [None] * len(self._courses)
+        remaining = self._course_mask
+        for choice in self._tutorial_choices:
+            course_bit = remaining & -remaining
+            remaining ^= course_bit
+            choices[course_bit.bit_length() - 1] = choice
+        return choices
+    
+    def sessions(self):
+        """
+        Yield the sessions of the schedule, for rendering.
+        
+        Yields:
+            tuple: (course, time, "Lecture" or "Tutorial"), lectures of a course
+                   before its selected tutorial
+        """
+        for course, choice in self._taken():
+            for time in course.lectures:
+                yield course, time, "Lecture"
+            if choice != NO_TUTORIAL:
+                yield course, course.tutorials[choice], "Tutorial"
+    
+    def __iter__(self):
+        yield self.course_list
+        yield self.tutorial_selection
+    
+    def __getitem__(self, index):
+        return (self.course_list, self.tutorial_selection)[index]
+    
+    def __len__(self):
+        return 2
+    
+    def __eq__(self, other):
+        if not isinstance(other, Schedule):
+            return NotImplemented
+        return (
+            self._course_mask == other._course_mask
+            and self._tutorial_choices == other._tutorial_choices
+            and self.course_list == other.course_list
+        )
+    
+    def __hash__(self):
+        return hash((self._course_mask, self._tutorial_choices))
+    
+    def __repr__(self):
+        codes = [course.course_code for course in self.course_list]
+        tutorials = {course.course_code: time for course, time in self.tutorial_selection.items()}
+        return f"Schedule(courses={codes}, tutorials={tutorials})"
+
+
+def _schedule_from_choices(courses, choices):
+    """
+    Build a Schedule from search choices.
+    
+    Args:
+        courses (tuple): Course objects the choices refer to
+        choices (tuple): One choice per course, as yielded by _iter_choices
+    
+    Returns:
+        Schedule: The schedule, which unpacks as (course_list, tutorial_selection)
+    """
+    return Schedule.from_choices(courses, choices)
+
+
+def schedule_key(schedule):
+    """
+    Get the canonical key of a schedule's timetable.
+    
+    Two schedules have the same key exactly when they show the same
+    timetable: the same courses (by code and lecture times), each with the
+    same selected tutorial time, in any order. Within one plan this matches
+    the Schedule's own (course_mask, tutorial_choices) key, but it also
+    compares schedules of different plans and (course_list, tutorial_selection)
+    tuples.
+    
+    Args:
+        schedule (Schedule or tuple): Schedule, or (course_list, tutorial_selection)
+    
+    Returns:
+        tuple: Sorted (course_code, lectures, tutorial_time) triples, with
+               tutorial_time () for a course without a tutorial
+    """
+    course_list, tutorial_selection = schedule
+    return tuple(sorted(
+        (course.course_code, tuple(map(tuple, course.lectures)), tuple(tutorial_selection.get(course, ())))
+        for course in course_list
+    ))
+
+
+def unique_schedules(schedules, key=schedule_key):
+    """
+    Yield each distinct timetable of a stream of schedules once.
+    
+    Deduplication is streaming: schedules are yielded as they arrive and only
+    the hash keys of the ones seen so far are kept, so it works on generators
+    such as iter_valid_schedules and keeps their order.
+    
+    Args:
+        schedules (iterable): Schedules, or (course_list, tutorial_selection) tuples
+        key (callable): Canonical key of a schedule; schedule_key by default
+    
+    Yields:
+        The first schedule of every distinct key
+    
+    Example:
+        for course_list, tutorial_selection in unique_schedules(iter_valid_schedules(required, optional)):
+            ...
+    """
+    seen = set()
+    for schedule in schedules:
+        schedule_id = key(schedule)
+        if schedule_id not in seen:
+            seen.add(schedule_id)
+            yield schedule
+
+
+def _course_mask(choices):
+    """
+    Get the course-membership bitmask of search choices.
+    
+    Args:
+        choices (tuple): One choice per course, as yielded by _iter_choices
+    
+    Returns:
+        int: Bitmask with bit i set if course i is taken
+    """
+    course_mask = 0
+    for course_idx, choice in enumerate(choices):
+        if choice is not None:
+            course_mask |= 1 << course_idx
+    return course_mask
+
+
+def _maximal_course_masks(course_masks, num_courses, stats=None):
+    """
+    Find the course sets that are not a strict subset of another course set.
+    
+    The valid course sets are closed under taking subsets (dropping a course
+    only frees slots), so a set is maximal exactly when no single course can be
+    added to it. That takes one hash lookup per missing course instead of a
+    subset comparison against every other set.
+    
+    Args:
+        course_masks (set): Course-membership bitmasks of all valid course sets
+        num_courses (int): Number of courses the bitmasks range over
+        stats (SearchStats, optional): Statistics to count the lookups in
+    
+    Returns:
+        set: The maximal course-membership bitmasks
+    """
+    all_courses = (1 << num_courses) - 1
+    maximal_masks = set()
+    checks = 0
+    for course_mask in course_masks:
+        missing = all_courses & ~course_mask
+        while missing:
+            course_bit = missing & -missing
+            checks += 1
+            if course_mask | course_bit in course_masks:
+                break
+            missing ^= course_bit
+        else:
+            maximal_masks.add(course_mask)
+    if stats is not None:
+        stats.maximality_checks += checks
+    return maximal_masks
+
+
+class SubsolutionCache:
+    """
+    Bounded LRU cache of schedule search sub-solutions.
+    
+    Maps a sub-search key to the tuple of all choices of that sub-search. Keys
+    describe the courses by content (see _course_key) rather than by object,
+    so the cache keeps no Course alive and equal copies of a course share its
+    entries. At most max_choices choices are kept over all entries, the least
+    recently used entries are evicted first, and sub-solutions with more than
+    max_entry_size schedules are never stored, so memory stays capped.
+    
+    Attributes:
+        hits (int): Number of lookups answered from the cache
+        misses (int): Number of lookups not found in the cache
+        evictions (int): Number of entries dropped to make room
+    """
+    
+    def __init__(self, max_choices=200000, max_entry_size=10000):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_choices (int): Maximum number of choices (schedules) over all cached sub-solutions
+            max_entry_size (int): Maximum number of schedules in one cached sub-solution
+        """
+        self.max_choices = max_choices
+        self.max_entry_size = max_entry_size
+        self._entries = OrderedDict()
+        self._num_choices = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    @property
+    def num_choices(self):
+        """Number of choices held over all entries."""
+        return self._num_choices
+    
+    def get(self, key):
+        """
+        Look up a sub-solution.
+        
+        Args:
+            key (tuple): The sub-search key
+        
+        Returns:
+            tuple or None: The cached choices, or None if not cached
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+    
+    def put(self, key, value):
+        """
+        Store a sub-solution, evicting the least recently used ones beyond max_choices.
+        
+        Args:
+            key (tuple): The sub-search key
+            value (tuple): All choices of the sub-search
+        """
+        if len(value) > min(self.max_entry_size, self.max_choices):
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._num_choices -= len(previous)
+        self._entries[key] = value
+        self._num_choices += len(value)
+        while self._num_choices > self.max_choices:
+            _, evicted = self._entries.popitem(last=False)
+            self._num_choices -= len(evicted)
+            self.evictions += 1
+    
+    def clear(self):
+        """Drop all entries and reset the statistics."""
+        self._entries.clear()
+        self._num_choices = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def stats(self):
+        """
+        Get the cache statistics.
+        
+        Returns:
+            dict: hits, misses, evictions, size (entries), choices and max_choices
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "choices": self._num_choices,
+            "max_choices": self.max_choices,
+        }
+
+
+# Sub-solutions shared by all searches of this process
+subsolution_cache = SubsolutionCache()
+
+
+class ScheduleCache:
+    """
+    Persistent on-disk cache of find_all_valid_schedules_with_optional results.
+    
+    Results are stored in a sqlite file, keyed by a SHA-256 fingerprint of the
+    codes, lecture slots and tutorial slots of the required and optional
+    courses, so a plan is found again across sessions and students as long as
+    its courses are unchanged (course names do not matter). Each result is
+    packed as the course_mask of each of its Schedule objects and an index into
+    a table of their distinct tutorial_choices tuples (schedules share few of
+    them), at fixed widths, then the table itself as one (or, for courses with
+    over 128 tutorials, two) signed bytes per choice, compressed with zlib.
+    Reading a result back is a single pass that shares the tuples of the table
+    between its schedules.
+    
+    A file written with another FORMAT_VERSION is emptied when opened, and a
+    stored result that cannot be decoded is deleted and counts as a miss.
+    When the stored results exceed max_bytes, the least recently used ones
+    are deleted first; a result larger than max_bytes on its own is not stored.
+    
+    Attributes:
+        hits (int): Number of lookups answered from the cache
+        misses (int): Number of lookups not found in the cache
+        evictions (int): Number of results deleted to make room
+    
+    Example:
+        cache = ScheduleCache("schedules.sqlite")
+        schedules = find_all_valid_schedules_with_optional(required, optional, cache=cache)
+    """
+    
+    # Layout of the stored results, kept in the user_version of the sqlite file
+    FORMAT_VERSION = 1
+    
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        """
+        Open (or create) a cache file.
+        
+        Args:
+            path (str): Path of the sqlite file; ":memory:" keeps it in memory
+            max_bytes (int): Maximum total size of the stored results
+        
+        Raises:
+            ValueError: If the file cannot be opened or is not a sqlite database
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        try:
+            self._db = sqlite3.connect(path)
+        except sqlite3.Error as e:
+            raise ValueError(f"cannot open schedule cache {path}: {e}") from e
+        try:
+            if self._db.execute("PRAGMA user_version").fetchone()[0] != self.FORMAT_VERSION:
+                # Results in another layout cannot be read back; start over
+                self._db.execute("DROP TABLE IF EXISTS schedules")
+                self._db.execute(f"PRAGMA user_version = {self.FORMAT_VERSION}")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS schedules ("
+                "key TEXT PRIMARY KEY, num_schedules INTEGER, width INTEGER, "
+                "data BLOB, size INTEGER, last_used INTEGER)"
+            )
+            self._db.commit()
+        except sqlite3.DatabaseError as e:
+            self._db.close()
+            raise ValueError(f"{path} is not a schedule cache: {e}") from e
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM schedules").fetchone()[0]
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    @classmethod
+    def fingerprint(cls, required_courses, optional_courses):
+        """
+        Get the cache key of a plan.
+        
+        Args:
+            required_courses (list): List of Course objects that must be included
+            optional_courses (list): List of Course objects that are optional
+        
+        Returns:
+            str: Hex SHA-256 digest of the course codes and slots, in order, and their grid
+        """
+        required_courses, optional_courses = _unique_courses(required_courses, optional_courses)
+        courses = required_courses + optional_courses
+        content = [
+            courses[0].grid.slots if courses else [],
+            [[course.course_code, course.lectures, course.tutorials] for course in required_courses],
+            [[course.course_code, course.lectures, course.tutorials] for course in optional_courses],
+        ]
+        return hashlib.sha256(json.dumps(content).encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def _typecode(num_bits):
+        """Get the smallest unsigned array typecode holding num_bits bits, or None if over 64 are needed."""
+        for typecode in ("B", "H", "I", "L", "Q"):
+            if array(typecode).itemsize * 8 >= num_bits:
+                return typecode
+        return None
+    
+    def get(self, required_courses, optional_courses):
+        """
+        Look up the schedules of a plan.
+        
+        Args:
+            required_courses (list): List of Course objects that must be included
+            optional_courses (list): List of Course objects that are optional
+        
+        Returns:
+            list or None: The schedules, as from find_all_valid_schedules_with_optional,
+                          built from the given Course objects; None if not cached
+        """
+        key = self.fingerprint(required_courses, optional_courses)
+        row = self._db.execute(
+            "SELECT num_schedules, width, data FROM schedules WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None:
+            required_courses, optional_courses = _unique_courses(required_courses, optional_courses)
+            try:
+                schedules = self._unpack(required_courses + optional_courses, *row)
+            except (zlib.error, ValueError):
+                self._db.execute("DELETE FROM schedules WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._db.execute("UPDATE schedules SET last_used = ? WHERE key = ?", (time.time_ns(), key))
+        self._db.commit()
+        return schedules
+    
+    def _unpack(self, courses, num_schedules, width, data):
+        """
+        Decode a stored result.
+        
+        Raises:
+            ValueError: If data does not hold num_schedules schedules of the courses
+        """
+        raw = zlib.decompress(data)
+        typecode = self._typecode(len(courses))
+        if typecode is None:
+            mask_bytes = (len(courses) + 7) // 8
+            split = num_schedules * mask_bytes
+            masks = [int.from_bytes(raw[idx:idx + mask_bytes], "little") for idx in range(0, split, mask_bytes)]
+        else:
+            masks = array(typecode)
+            split = num_schedules * masks.itemsize
+            masks.frombytes(raw[:split])
+        choice_idxs = array(self._typecode(max(num_schedules - 1, 0).bit_length()))
+        choice_idxs.frombytes(raw[split:split + num_schedules * choice_idxs.itemsize])
+        choices = array("b" if width == 1 else "h")
+        choices.frombytes(raw[split + num_schedules * choice_idxs.itemsize:])
+        choices = choices.tolist()
+        if len(masks) != num_schedules or len(choice_idxs) != num_schedules:
+            raise ValueError("truncated schedules")
+        
+        # A tutorial_choices tuple is stored when first used, so the table grows in order
+        choice_table = []
+        start = 0
+        schedules = []
+        for course_mask, choice_idx in zip(masks, choice_idxs):
+            if choice_idx == len(choice_table):
+                end = start + course_mask.bit_count()
+                choice_table.append(tuple(choices[start:end]))
+                start = end
+            schedules.append(Schedule(courses, course_mask, choice_table[choice_idx]))
+        if start != len(choices) or any(course_mask >> len(courses) for course_mask in masks):
+            raise ValueError("schedules do not match the courses")
+        return schedules
+    
+    def put(self, required_courses, optional_courses, schedules):
+        """
+        Store the schedules of a plan, evicting the least recently used results beyond max_bytes.
+        
+        Args:
+            required_courses (list): List of Course objects that must be included
+            optional_courses (list): List of Course objects that are optional
+            schedules (list): Its (course_selection, tutorial_selection) schedules
+        """
+        required_courses, optional_courses = _unique_courses(required_courses, optional_courses)
+        courses = required_courses + optional_courses
+        masks = []
+        choice_idxs = []
+        choice_table = {}
+        plan_courses = None
+        for schedule in schedules:
+            if isinstance(schedule, Schedule) and (schedule.courses is plan_courses or schedule.courses == courses):
+                plan_courses = schedule.courses
+                course_mask, tutorial_choices = schedule.course_mask, schedule.tutorial_choices
+            else:
+                course_list, tutorial_selection = schedule
+                taken = {id(course) for course in course_list}
+                course_mask = 0
+                tutorial_choices = []
+                for course_idx, course in enumerate(courses):
+                    if id(course) in taken:
+                        course_mask |= 1 << course_idx
+                        if course in tutorial_selection:
+                            tutorial_choices.append(course.tutorials.index(tutorial_selection[course]))
+                        else:
+                            tutorial_choices.append(NO_TUTORIAL)
+                tutorial_choices = tuple(tutorial_choices)
+            masks.append(course_mask)
+            choice_idxs.append(choice_table.setdefault(tutorial_choices, len(choice_table)))
+        
+        typecode = self._typecode(len(courses))
+        if typecode is None:
+            mask_bytes = (len(courses) + 7) // 8
+            packed = [b"".join(course_mask.to_bytes(mask_bytes, "little") for course_mask in masks)]
+        else:
+            packed = [array(typecode, masks).tobytes()]
+        packed.append(array(self._typecode(max(len(masks) - 1, 0).bit_length()), choice_idxs).tobytes())
+        width = 1 if all(len(course.tutorials) <= 128 for course in courses) else 2
+        choices = array("b" if width == 1 else "h")
+        choices.fromlist(list(chain.from_iterable(choice_table)))
+        packed.append(choices.tobytes())
+        data = zlib.compress(b"".join(packed))
+        if len(data) > self.max_bytes:
+            return
+        
+        key = self.fingerprint(required_courses, optional_courses)
+        self._db.execute(
+            "INSERT OR REPLACE INTO schedules VALUES (?, ?, ?, ?, ?, ?)",
+            (key, len(masks), width, data, len(data), time.time_ns()),
+        )
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM schedules").fetchone()[0]
+        if total > self.max_bytes:
+            for old_key, size in self._db.execute(
+                "SELECT key, size FROM schedules ORDER BY last_used"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM schedules WHERE key = ?", (old_key,))
+                total -= size
+                self.evictions += 1
+        self._db.commit()
+    
+    def clear(self):
+        """Delete all stored results and reset the statistics."""
+        self._db.execute("DELETE FROM schedules")
+        self._db.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def close(self):
+        """Close the cache file."""
+        self._db.close()
+    
+    def stats(self):
+        """
+        Get the cache statistics.
+        
+        Returns:
+            dict: hits, misses, evictions, size (number of results), bytes and max_bytes
+        """
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM schedules").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self),
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def _conflict_components(course_options):
+    """
+    Split courses into the connected components of their conflict graph.
+    
+    Two courses are connected when any of their options share a slot. Courses
+    of different components can never collide, so they can be scheduled
+    independently.
+    
+    Args:
+        course_options (list): One list of (choice, slot_mask) options per course
+    
+    Returns:
+        list: Components as lists of course indices, each in ascending order,
+              ordered by their first course
+    """
+    parent = list(range(len(course_options)))
+    
+    def find(course_idx):
+        while parent[course_idx] != course_idx:
+            parent[course_idx] = parent[parent[course_idx]]
+            course_idx = parent[course_idx]
+        return course_idx
+    
+    # Union courses through the first course seen in each slot
+    slot_owner = {}
+    for course_idx, options in enumerate(course_options):
+        course_slots = 0
+        for _, slot_mask in options:
+            course_slots |= slot_mask
+        while course_slots:
+            slot = course_slots & -course_slots
+            course_slots ^= slot
+            owner = slot_owner.setdefault(slot, course_idx)
+            parent[find(course_idx)] = find(owner)
+    
+    components = {}
+    for course_idx in range(len(course_options)):
+        components.setdefault(find(course_idx), []).append(course_idx)
+    return sorted(components.values())
+
+
+class _SearchSpace:
+    """
+    The schedule search problem of required and optional courses.
+    
+    The courses are split into independent components of their conflict graph
+    (see _conflict_components) and searched component by component, so every
+    schedule is one sub-schedule per component put side by side. Search choices
+    are therefore kept in search order, which groups the courses by component.
+    The largest component comes last, judging by the number of option
+    combinations.
+    
+    Attributes:
+        courses (tuple): Required courses followed by optional courses
+        order (list): Index into courses of the course at each search depth
+        course_options (list): Options of the course at each search depth
+        optional (list): Whether the course at each search depth is optional
+        components (list): (start, end) search depth range of each component
+    """
+    
+    def __init__(self, required_courses, optional_courses, catalog=None):
+        """
+        Initialize the search space.
+        
+        Args:
+            required_courses (list): List of Course objects that must be included
+            optional_courses (list): List of Course objects that are optional
+            catalog (CompiledCatalog, optional): Catalog holding the courses, whose
+                                                 precomputed options and conflicts are reused
+        """
+        required_courses, optional_courses = _unique_courses(required_courses, optional_courses)
+        self.courses = required_courses + optional_courses
+        _check_same_grid(self.courses)
+        num_required = len(required_courses)
+        if catalog is None:
+            options_by_course = [
+                _course_options(course, optional=course_idx >= num_required)
+                for course_idx, course in enumerate(self.courses)
+            ]
+            components = _conflict_components(options_by_course)
+        else:
+            catalog_ids = [catalog.index_of(course) for course in self.courses]
+            options_by_course = [
+                catalog.options[catalog_idx][course_idx >= num_required]
+                for course_idx, catalog_idx in enumerate(catalog_ids)
+            ]
+            components = catalog.components(catalog_ids)
+        
+        def combinations_estimate(component):
+            total = 1
+            for course_idx in component:
+                total *= max(len(options_by_course[course_idx]), 1)
+            return total
+        
+        components = sorted(components, key=combinations_estimate)
+        self.order = [course_idx for component in components for course_idx in component]
+        self.course_options = [options_by_course[course_idx] for course_idx in self.order]
+        self.optional = [course_idx >= num_required for course_idx in self.order]
+        # Content of the course at each search depth, for the subsolution cache keys
+        self._course_keys = [_course_key(self.courses[course_idx]) for course_idx in self.order]
+        self.components = []
+        start = 0
+        for component in components:
+            self.components.append((start, start + len(component)))
+            start += len(component)
+        self._counter = None
+    
+    @property
+    def counter(self):
+        """_ScheduleCounter over the search order, created on first use."""
+        if self._counter is None:
+            self._counter = _ScheduleCounter(self.course_options, self.components)
+        return self._counter
+    
+    def _range_key(self, start, end):
+        """Content of the courses of a search depth range, equal across search spaces."""
+        return (self.courses[0].grid, tuple(self._course_keys[start:end]), tuple(self.optional[start:end]))
+    
+    def reuse_counts(self, other):
+        """
+        Start counting from the memoised counts of the components shared with another search space.
+        
+        A component is shared if it has the same courses, in the same search
+        order and equally optional, e.g. one that a course added to a plan does
+        not clash with. Does nothing once this space has counted.
+        
+        Args:
+            other (_SearchSpace): An earlier search space
+        """
+        if self._counter is not None or other._counter is None:
+            return
+        shared = {
+            other._range_key(start, end): memo for (start, end), memo in zip(other.components, other._counter.memos)
+        }
+        memos = [shared.get(self._range_key(start, end), {}) for start, end in self.components]
+        self._counter = _ScheduleCounter(self.course_options, self.components, memos)
+    
+    def iter_choices(self, stats=None, budget=None):
+        """
+        Generate the search choices of all valid schedules in search order.
+        
+        Components are solved independently and combined as a Cartesian product;
+        only the last (largest) component is searched lazily, once per
+        combination of the others unless its solutions fit into the
+        subsolution cache.
+        
+        Args:
+            stats (SearchStats, optional): Statistics to count the search in
+            budget (SearchBudget, optional): Limits to stop the search at
+        
+        Yields:
+            tuple: One choice per search depth
+        """
+        if not self.components:
+            yield ()
+            return
+        
+        *head_components, (last_start, last_end) = self.components
+        head_choices = []
+        for start, end in head_components:
+            component_choices = list(self.iter_subtree(start, end, stats=stats, budget=budget))
+            if not component_choices:
+                return
+            head_choices.append(component_choices)
+        
+        for head in product(*head_choices):
+            if budget is not None and budget.stop_reason is not None:
+                return
+            if stats is not None:
+                stats.combinations += 1
+            prefix = tuple(chain.from_iterable(head))
+            for tail in self.iter_subtree(last_start, last_end, stats=stats, budget=budget):
+                yield prefix + tail
+    
+    def iter_subtree(self, start, end, occupied_mask=0, stats=None, budget=None):
+        """
+        Generate the choices of a search depth range given occupied slots.
+        
+        Sub-solutions are memoised in subsolution_cache, keyed by the content of
+        the courses of the range and the occupied slots they can use, so a
+        repeated sub-search becomes a dictionary lookup.
+        
+        Args:
+            start (int): First search depth of the range
+            end (int): End of the search depth range
+            occupied_mask (int): Slots taken by the courses before start
+            stats (SearchStats, optional): Statistics to count the search in
+            budget (SearchBudget, optional): Limits to stop the search at; a
+                                             sub-search stopped early is not cached
+        
+        Yields:
+            tuple: One choice per search depth of the range
+        """
+        course_options = self.course_options[start:end]
+        usable_slots = 0
+        for options in course_options:
+            for _, slot_mask in options:
+                usable_slots |= slot_mask
+        key = self._range_key(start, end) + (occupied_mask & usable_slots,)
+        cached = subsolution_cache.get(key)
+        if stats is not None:
+            if cached is None:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        if cached is not None:
+            yield from cached
+            return
+        
+        collected = []
+        for choices in _iter_choices(course_options, occupied_mask, stats, budget):
+            if collected is not None:
+                collected.append(choices)
+                if len(collected) > subsolution_cache.max_entry_size:
+                    # Too large to cache; keep streaming
+                    collected = None
+            yield choices
+        if collected is not None and (budget is None or budget.stop_reason is None):
+            subsolution_cache.put(key, tuple(collected))
+    
+    def schedule(self, choices):
+        """
+        Build a (course_list, tutorial_selection) schedule from search choices.
+        
+        Args:
+            choices (tuple): One choice per search depth
+        
+        Returns:
+            tuple: (course_list, tutorial_selection) with courses in their original order
+        """
+        course_choices = [None] * len(self.courses)
+        for course_idx, choice in zip(self.order, choices):
+            course_choices[course_idx] = choice
+        return _schedule_from_choices(self.courses, course_choices)
+    
+    def choices_of(self, schedule):
+        """
+        Get the search choices of a (course_list, tutorial_selection) schedule.
+        
+        Args:
+            schedule (tuple): (course_list, tutorial_selection)
+        
+        Returns:
+            tuple: One choice per search depth
+        
+        Raises:
+            ValueError: If a selected tutorial is not an option of its course
+        """
+        course_list, tutorial_selection = schedule
+        selected_courses = set(course_list)
+        choices = []
+        for course_idx in self.order:
+            course = self.courses[course_idx]
+            if course not in selected_courses:
+                choices.append(None)
+            elif course in tutorial_selection:
+                if tutorial_selection[course] not in course.tutorials:
+                    raise ValueError(f"{course.course_code} has no tutorial at {tutorial_selection[course]}")
+                choices.append(course.tutorials.index(tutorial_selection[course]))
+            else:
+                choices.append(NO_TUTORIAL)
+        return tuple(choices)
+
+
+# Search space of the last (required, optional) course lists, reused by repeated lookups
+_last_search_space = {}
+
+
+def _search_space(required_courses, optional_courses):
+    """
+    Get the _SearchSpace of required and optional courses.
+    
+    The search space of the last course lists is kept, so that looking up
+    several schedules of the same plan reuses its memoised counts.
+    
+    Args:
+        required_courses (list): List of Course objects that must be included
+        optional_courses (list): List of Course objects that are optional
+    
+    Returns:
+        _SearchSpace: The search space
+    """
+    key = (tuple(required_courses), tuple(optional_courses))
+    if key not in _last_search_space:
+        _last_search_space.clear()
+        _last_search_space[key] = _SearchSpace(required_courses, optional_courses)
+    return _last_search_space[key]
+
+
+def cache_info():
+    """
+    Describe the in-process caches of the solver.
+    
+    Returns:
+        dict: "subsolutions", the statistics of subsolution_cache (see
+              SubsolutionCache.stats), and "search_spaces", the number of
+              search spaces kept for count, rank and unrank lookups
+    """
+    return {"subsolutions": subsolution_cache.stats(), "search_spaces": len(_last_search_space)}
+
+
+def clear_caches():
+    """
+    Drop the in-process caches of the solver, e.g. to time searches from a cold start.
+    
+    Empties subsolution_cache (resetting its statistics) and the search space
+    kept for count, rank and unrank lookups. Results do not change; only
+    repeated searches get slower until the caches fill again.
+    """
+    subsolution_cache.clear()
+    _last_search_space.clear()
+
+
+# Search space of a worker process of the parallel search
+_worker_space = None
+
+
+def _init_worker(required_courses, optional_courses):
+    """Build the search space once per worker process."""
+    global _worker_space
+    _worker_space = _SearchSpace(required_courses, optional_courses)
+
+
+def _worker_pool(workers, space_args):
+    """
+    Start a pool of worker processes for the parallel search.
+    
+    Args:
+        workers (int): Number of worker processes
+        space_args (tuple): (required_courses, optional_courses) to build the search space of
+    
+    Returns:
+        multiprocessing.pool.Pool: The pool; leaving it as a context manager terminates it
+    """
+    return multiprocessing.Pool(workers, initializer=_init_worker, initargs=space_args)
+
+
+# Schedules a worker returns per task, so subtrees stream back in bounded pieces
+PARALLEL_CHUNK_SIZE = 10000
+
+# Chunks fetched ahead for a subtree that is not being yielded yet
+PARALLEL_CHUNKS_AHEAD = 2
+
+# Option combinations a group of courses needs before it is worth searching with workers
+PARALLEL_MIN_COMBINATIONS = 4096
+
+
+def _worth_parallel(course_options):
+    """Whether a range of courses has enough option combinations to search it with workers."""
+    return prod(max(len(options), 1) for options in course_options) >= PARALLEL_MIN_COMBINATIONS
+
+
+def _solve_subtree(task):
+    """
+    Search the next chunk of one subtree in a worker process.
+    
+    Args:
+        task (tuple): (start, end, prefix_length, occupied_mask, after, deadline) where start
+                      and end are the search depth range, the first prefix_length courses of
+                      it are already decided, occupying occupied_mask, after is the last
+                      choices returned for the subtree so far (None for its first chunk),
+                      and deadline is the time.monotonic() value to stop at, or None
+    
+    Returns:
+        tuple: (tails, after, stop_reason) where tails holds the choices of the remaining
+               courses of at most PARALLEL_CHUNK_SIZE schedules, after is the last of them,
+               or None once the subtree is done, and stop_reason is "time_budget" if the
+               deadline cut the chunk short
+    """
+    start, end, prefix_length, occupied_mask, after, deadline = task
+    course_options = _worker_space.course_options[start + prefix_length:end]
+    budget = None
+    if deadline is not None:
+        budget = SearchBudget()
+        budget.deadline = deadline
+    all_choices = _iter_choices(course_options, occupied_mask, budget=budget, after=after)
+    tails = list(islice(all_choices, PARALLEL_CHUNK_SIZE))
+    if budget is not None and budget.stop_reason is not None:
+        return tails, None, budget.stop_reason
+    return tails, (tails[-1] if len(tails) == PARALLEL_CHUNK_SIZE else None), None
+
+
+class _Subtree:
+    """A subtree of the parallel search, fetched from the workers chunk by chunk."""
+    
+    __slots__ = ("prefix", "occupied_mask", "after", "pending", "chunks", "done")
+    
+    def __init__(self, prefix, occupied_mask):
+        self.prefix = prefix  # choices of the courses deciding the subtree
+        self.occupied_mask = occupied_mask
+        self.after = None  # last choices fetched, to continue after
+        self.pending = None  # AsyncResult of the chunk being searched
+        self.chunks = deque()  # fetched chunks not yielded yet
+        self.done = False
+
+
+def _split_prefixes(course_options, min_prefixes):
+    """
+    Split the search tree into subtrees by the choices of its first courses.
+    
+    Args:
+        course_options (list): One list of (choice, slot_mask) options per course
+        min_prefixes (int): Stop once there are at least this many subtrees
+    
+    Returns:
+        tuple: (prefixes, prefix_length) where prefixes lists the conflict-free
+               (choices, occupied_mask) of the first prefix_length courses, in search order
+    """
+    prefixes = [((), 0)]
+    prefix_length = 0
+    while len(prefixes) < min_prefixes and prefix_length < len(course_options):
+        prefixes = [
+            (choices + (choice,), occupied_mask | slot_mask)
+            for choices, occupied_mask in prefixes
+            for choice, slot_mask in course_options[prefix_length]
+            if not slot_mask & occupied_mask
+        ]
+        prefix_length += 1
+    return prefixes, prefix_length
+
+
+def _iter_choices_parallel(space, start, end, workers, space_args, budget=None, pool=None):
+    """
+    Search a search depth range of a _SearchSpace with a pool of worker processes.
+    
+    The tree is split by the choices of its first few courses into subtrees,
+    and workers search them in chunks of PARALLEL_CHUNK_SIZE schedules, each
+    continuing after the last schedule of the one before. Results are yielded
+    in search order: the first open subtree is yielded chunk by chunk while the
+    workers fetch up to PARALLEL_CHUNKS_AHEAD chunks of the next ones, so memory
+    stays bounded however large a subtree is.
+    
+    The deadline of a budget is passed on to the workers, which stop at it and
+    return what they found. The budget is also checked before every chunk and,
+    while waiting for the workers, every BUDGET_POLL_INTERVAL seconds, so a
+    cancellation token is noticed promptly. A pool started here is terminated
+    as soon as the search stops, abandoning the subtrees still being searched.
+    
+    Args:
+        space (_SearchSpace): The search space
+        start (int): First search depth of the range
+        end (int): End of the search depth range
+        workers (int): Number of worker processes
+        space_args (tuple): (required_courses, optional_courses) the space was built from
+        budget (SearchBudget, optional): Limits to stop the search at
+        pool (multiprocessing.pool.Pool, optional): Pool from _worker_pool to use;
+                                                    by default one is started and terminated here
+    
+    Yields:
+        tuple: One choice per search depth of the range
+    """
+    if pool is None:
+        with _worker_pool(workers, space_args) as pool:
+            yield from _iter_choices_parallel(space, start, end, workers, space_args, budget, pool)
+        return
+    
+    finished = queue.Queue()  # (subtree, result or error) of every chunk done by the workers
+    
+    def submit(subtree):
+        deadline = None if budget is None else budget.deadline
+        task = (start, end, prefix_length, subtree.occupied_mask, subtree.after, deadline)
+        subtree.pending = pool.apply_async(
+            _solve_subtree, (task,),
+            callback=lambda result: finished.put((subtree, result)),
+            error_callback=lambda error: finished.put((subtree, error)),
+        )
+    
+    def collect(subtree, result):
+        if isinstance(result, BaseException):
+            raise result
+        tails, subtree.after, stop_reason = result
+        subtree.pending = None
+        subtree.chunks.append(tails)
+        if stop_reason is not None and budget.stop_reason is None:
+            budget.stop_reason = stop_reason
+        if subtree.after is None:
+            subtree.done = True
+        elif len(subtree.chunks) < PARALLEL_CHUNKS_AHEAD:
+            submit(subtree)
+    
+    prefixes, prefix_length = _split_prefixes(space.course_options[start:end], workers * 4)
+    prefixes = iter(prefixes)
+    subtrees = deque()
+    while True:
+        for prefix, occupied_mask in islice(prefixes, workers * 2 - len(subtrees)):
+            subtrees.append(_Subtree(prefix, occupied_mask))
+            submit(subtrees[-1])
+        if not subtrees or (budget is not None and budget.exceeded()):
+            return
+        
+        while not finished.empty():
+            collect(*finished.get())
+        head = subtrees[0]
+        if head.chunks:
+            tails = head.chunks.popleft()
+            if head.pending is None and not head.done:
+                submit(head)
+            for tail in tails:
+                yield head.prefix + tail
+        elif head.done:
+            subtrees.popleft()
+        else:
+            # Wait for the next chunk
+            timeout = None
+            if budget is not None:
+                timeout = BUDGET_POLL_INTERVAL
+                if budget.deadline is not None:
+                    timeout = min(timeout, max(budget.deadline - time.monotonic(), 0))
+            try:
+                collect(*finished.get(timeout=timeout))
+            except queue.Empty:
+                budget.exceeded()
+
+
+def find_all_valid_schedules(courses, workers=None, stats=None):
+    """
+    Find all valid course schedules where no time slots conflict.
+    
+    For each course:
+    - ALL lecture time slots must be included (mandatory)
+    - Only ONE tutorial time slot needs to be selected from available options
+    
+    Args:
+        courses (list): List of Course objects
+        workers (int, optional): Number of worker processes to search with;
+                                 None or 1 searches in this process
+        stats (SearchStats, optional): Statistics to count the search in
+    
+    Returns:
+        list: List of Schedule records, which unpack as (course_selection, tutorial_selection) where:
+              - course_selection: list of Course objects that can be taken together
+              - tutorial_selection: dict mapping course to selected tutorial slot (day_idx, slot_idx)
+    
+    Example:
+        course1 = Course("MAT1001", "Calculus", lectures=[(0, 0)], tutorials=[(1, 1), (2, 1)])
+        course2 = Course("PHY1001", "Physics", lectures=[(0, 2)], tutorials=[(1, 1), (3, 2)])
+        # Math and Physics lectures don't conflict
+        # But both have tutorial option at (1, 1), so we need to pick different tutorial times
+        
+        valid_schedules = find_all_valid_schedules([course1, course2])
+        # Returns combinations where tutorial times don't conflict
+    """
+    # Every course is optional; the independent components are solved separately
+    with _timed(stats, "setup"):
+        space = _SearchSpace([], courses)
+    # Only components with enough combinations are searched by the workers, all in one pool
+    parallel = [
+        workers is not None and workers > 1 and _worth_parallel(space.course_options[start:end])
+        for start, end in space.components
+    ]
+    pool = _worker_pool(workers, ([], courses)) if any(parallel) else None
+    component_schedules = []
+    with pool if pool is not None else nullcontext():
+        for (start, end), in_pool in zip(space.components, parallel):
+            # Find all valid combinations of the component with backtracking
+            with _timed(stats, "search"):
+                if in_pool:
+                    component_choices = _iter_choices_parallel(space, start, end, workers, ([], courses), pool=pool)
+                else:
+                    component_choices = _iter_choices(space.course_options[start:end], stats=stats)
+                valid_choices = [(_course_mask(choices), choices) for choices in component_choices]
+            
+            # Filter out schedules that are subsets of other schedules
+            # We only want maximal schedules (schedules that can't add more courses)
+            with _timed(stats, "maximal_filter"):
+                maximal_masks = _maximal_course_masks(
+                    {course_mask for course_mask, _ in valid_choices}, end - start, stats
+                )
+                component_schedules.append(
+                    [choices for course_mask, choices in valid_choices if course_mask in maximal_masks]
+                )
+    
+    # A maximal schedule is a maximal sub-schedule of every component
+    maximal_schedules = []
+    with _timed(stats, "build"):
+        for parts in product(*component_schedules):
+            choices = tuple(chain.from_iterable(parts))
+            if any(choice is not None for choice in choices):
+                maximal_schedules.append(space.schedule(choices))
+    if stats is not None:
+        stats.combinations += prod(len(schedules) for schedules in component_schedules)
+        stats.schedules += len(maximal_schedules)
+    return maximal_schedules
+
+
+def _timed_schedules(space, all_choices, stats):
+    """
+    Build the schedules of search choices, timing the search in stats.
+    
+    Only the time spent producing each schedule counts as "search"; the time
+    the caller spends between schedules is left out.
+    
+    Args:
+        space (_SearchSpace): The search space
+        all_choices (iterable): Search choices, produced lazily by the search
+        stats (SearchStats): Statistics to count the schedules in
+    
+    Yields:
+        Schedule: One record per search choices
+    """
+    resumed = time.perf_counter()
+    for choices in all_choices:
+        schedule = space.schedule(choices)
+        stats.schedules += 1
+        stats.add_time("search", time.perf_counter() - resumed)
+        yield schedule
+        resumed = time.perf_counter()
+    stats.add_time("search", time.perf_counter() - resumed)
+
+
+def _iter_within_budget(all_choices, budget):
+    """
+    Pass search choices through until a budget is exceeded or its schedule count is reached.
+    
+    Args:
+        all_choices (iterable): Search choices, produced lazily by the search
+        budget (SearchBudget): Limits to stop at
+    
+    Yields:
+        tuple: The search choices within the budget
+    """
+    found = 0
+    for choices in all_choices:
+        if found == budget.max_schedules:
+            budget.stop_reason = "max_schedules"
+            return
+        if budget.exceeded():
+            return
+        found += 1
+        yield choices
+
+
+def iter_valid_schedules(required_courses, optional_courses, workers=None, stats=None, budget=None):
+    """
+    Lazily generate all valid course schedules with required and optional courses.
+    
+    Requirements:
+    - ALL courses in required_courses must be included
+    - Optional courses are added if possible, but schedules without them are also valid
+    - If an optional course has multiple tutorial options that all work, 
+      separate schedules are yielded for each option
+    
+    Courses are first split into independent groups that never share a slot
+    (components of the conflict graph). Each group is searched on its own by
+    depth-first backtracking, and the schedules are the combinations of one
+    sub-schedule per group. Within a group, required courses come first and, for
+    each optional course, the schedules without it come before the ones with it,
+    so the first schedule holds only the required courses. The order is
+    deterministic.
+    
+    With workers > 1 the search tree is split by the choices of its first few
+    courses and the subtrees are searched by a pool of worker processes. The
+    schedules are still yielded in the same order.
+    
+    With a budget the generator ends early once a limit is hit, leaving the
+    reason in budget.stop_reason.
+    
+    Args:
+        required_courses (list): List of Course objects that must be included
+        optional_courses (list): List of Course objects that are optional
+        workers (int, optional): Number of worker processes to search with;
+                                 None or 1 searches in this process
+        stats (SearchStats, optional): Statistics to count the search in
+        budget (SearchBudget, optional): Limits to stop the search at
+    
+    Yields:
+        Schedule: Record that unpacks as (course_selection, tutorial_selection) where:
+               - course_selection: list of Course objects (includes all required + some optional)
+               - tutorial_selection: dict mapping course to selected tutorial slot (day_idx, slot_idx)
+    """
+    with _timed(stats, "setup"):
+        space = _SearchSpace(required_courses, optional_courses)
+    if workers is not None and workers > 1 and _worth_parallel(space.course_options):
+        all_choices = _iter_choices_parallel(
+            space, 0, len(space.order), workers, (required_courses, optional_courses), budget
+        )
+    else:
+        all_choices = space.iter_choices(stats, budget)
+    if budget is not None:
+        all_choices = _iter_within_budget(all_choices, budget)
+    if stats is not None:
+        yield from _timed_schedules(space, all_choices, stats)
+        return
+    for choices in all_choices:
+        yield space.schedule(choices)
+
+
+def _iter_exact_cover_positions(course_options, budget=None):
+    """
+    Enumerate schedules as exact covers with Algorithm X.
+    
+    Every course is a primary column that must be covered exactly once, and
+    every slot is a secondary column that may be covered at most once. Each
+    option of a course is a row covering its course column and its slots (a
+    skipped optional course covers only its course column). Branching always
+    picks the course with the fewest rows left (most-constrained first), and
+    selecting a row removes every row sharing a column with it, so conflicts
+    propagate to all courses at once.
+    
+    Args:
+        course_options (list): One list of (choice, slot_mask) options per course
+        budget (SearchBudget, optional): Limits to stop the search at, checked at every node
+    
+    Yields:
+        tuple: The option position chosen for each course; the order of the
+               covers is not the search order
+    """
+    num_courses = len(course_options)
+    rows = {}
+    for depth, options in enumerate(course_options):
+        for position, (_, slot_mask) in enumerate(options):
+            row_columns = [depth]
+            while slot_mask:
+                slot = slot_mask & -slot_mask
+                slot_mask ^= slot
+                row_columns.append(num_courses + slot.bit_length() - 1)
+            rows[(depth, position)] = row_columns
+    columns = {}
+    for depth in range(num_courses):
+        columns[depth] = set()
+    for row, row_columns in rows.items():
+        for column in row_columns:
+            columns.setdefault(column, set()).add(row)
+    
+    def select(row):
+        removed = []
+        for column in rows[row]:
+            for other_row in columns[column]:
+                for other_column in rows[other_row]:
+                    if other_column != column:
+                        columns[other_column].remove(other_row)
+            removed.append(columns.pop(column))
+        return removed
+    
+    def deselect(row, removed):
+        for column in reversed(rows[row]):
+            columns[column] = removed.pop()
+            for other_row in columns[column]:
+                for other_column in rows[other_row]:
+                    if other_column != column:
+                        columns[other_column].add(other_row)
+    
+    positions = [None] * num_courses
+    
+    def search():
+        if budget is not None and budget.exceeded():
+            return
+        open_courses = [depth for depth in range(num_courses) if depth in columns]
+        if not open_courses:
+            yield tuple(positions)
+            return
+        depth = min(open_courses, key=lambda course_column: len(columns[course_column]))
+        for row in sorted(columns[depth]):
+            removed = select(row)
+            positions[row[0]] = row[1]
+            yield from search()
+            deselect(row, removed)
+    
+    yield from search()
+
+
+def _find_choices_exact_cover(space, budget=None):
+    """
+    Find the search choices of all valid schedules with the exact-cover engine.
+    
+    Args:
+        space (_SearchSpace): The search space
+        budget (SearchBudget, optional): Limits to stop the search at; the
+                                         schedule count is applied after sorting
+    
+    Returns:
+        list: One choice per search depth for every schedule, in search order
+    """
+    # Option positions compare in the same order as the backtracking search visits them
+    all_positions = sorted(_iter_exact_cover_positions(space.course_options, budget))
+    if budget is not None and budget.max_schedules is not None and len(all_positions) > budget.max_schedules:
+        del all_positions[budget.max_schedules:]
+        if budget.stop_reason is None:
+            budget.stop_reason = "max_schedules"
+    return [
+        tuple(options[position][0] for options, position in zip(space.course_options, positions))
+        for positions in all_positions
+    ]
+
+
+def find_all_valid_schedules_with_optional(required_courses, optional_courses, workers=None, engine="backtracking",
+                                           cache=None, stats=None, time_budget=None, max_schedules=None,
+                                           cancel_token=None):
+    """
+    Find all valid course schedules with required and optional courses.
+    
+    Collects iter_valid_schedules into a list; see there for the requirements
+    and the order of the schedules.
+    
+    The search can be bounded by time_budget, max_schedules and cancel_token.
+    When a limit is hit, the search stops cleanly and the schedules found so
+    far are returned, in the same order, with partial set on the result. A
+    partial result is never stored in the cache.
+    
+    The "dlx" engine models the plan as an exact-cover problem instead: each
+    course must be covered once (by one of its options, or by skipping it if
+    it is optional) and each slot at most once. It is solved with Algorithm X,
+    branching on the most-constrained course first, which keeps the search tree
+    small on tightly packed catalogs. It returns the same list in the same order.
+    
+    Args:
+        required_courses (list): List of Course objects that must be included
+        optional_courses (list): List of Course objects that are optional
+        workers (int, optional): Number of worker processes to search with;
+                                 None or 1 searches in this process
+        engine (str): "backtracking" (default) or "dlx"
+        cache (ScheduleCache, optional): Persistent cache to look the result up in
+                                         first, and to store it in once found
+        stats (SearchStats, optional): Statistics to count the search in; the
+                                       cache lookup and store are timed as phase "cache"
+        time_budget (float, optional): Seconds the search may take
+        max_schedules (int, optional): Number of schedules to stop at; the "dlx"
+                                       engine still enumerates every schedule first
+        cancel_token (CancellationToken, optional): Token to stop the search from another thread
+    
+    Returns:
+        ScheduleList: List of Schedule records, which unpack as (course_selection, tutorial_selection) where:
+                      - course_selection: list of Course objects (includes all required + some optional)
+                      - tutorial_selection: dict mapping course to selected tutorial slot (day_idx, slot_idx)
+                      Its partial and stop_reason attributes tell whether a limit was hit.
+    """
+    if engine not in ("backtracking", "dlx"):
+        raise ValueError(f"unknown engine: {engine!r}")
+    if engine == "dlx" and workers is not None and workers > 1:
+        raise ValueError("workers is only supported by the backtracking engine")
+    budget = None
+    if time_budget is not None or max_schedules is not None or cancel_token is not None:
+        budget = SearchBudget(time_budget, max_schedules, cancel_token)
+    if cache is not None:
+        with _timed(stats, "cache"):
+            cached = cache.get(required_courses, optional_courses)
+        if cached is not None:
+            schedules = ScheduleList(cached)
+            if max_schedules is not None and len(schedules) > max_schedules:
+                del schedules[max_schedules:]
+                schedules.stop_reason = "max_schedules"
+            if stats is not None:
+                stats.schedules += len(schedules)
+            return schedules
+    
+    if engine == "dlx":
+        with _timed(stats, "setup"):
+            space = _SearchSpace(required_courses, optional_courses)
+        with _timed(stats, "search"):
+            schedules = ScheduleList(space.schedule(choices) for choices in _find_choices_exact_cover(space, budget))
+        if stats is not None:
+            stats.schedules += len(schedules)
+    else:
+        # Note: We want all schedules, even if they are subsets, because optional courses
+        # can be included or not, so schedules with fewer optional courses are still valid
+        schedules = ScheduleList(
+            iter_valid_schedules(required_courses, optional_courses, workers=workers, stats=stats, budget=budget)
+        )
+    if budget is not None:
+        schedules.stop_reason = budget.stop_reason
+    
+    if cache is not None and not schedules.partial:
+        with _timed(stats, "cache"):
+            cache.put(required_courses, optional_courses, schedules)
+    return schedules
+
+
+def count_valid_schedules(required_courses, optional_courses):
+    """
+    Count the valid course schedules with required and optional courses.
+    
+    Gives len(find_all_valid_schedules_with_optional(...)) without enumerating
+    the schedules: the count is computed by memoised dynamic programming over
+    the course index and the occupied-slot bitmask, so the time depends on the
+    number of distinct occupancy states rather than the number of schedules.
+    Occupancy never carries over between independent groups of courses, so the
+    count is the product of the group counts at the cost of their sum.
+    
+    Args:
+        required_courses (list): List of Course objects that must be included
+        optional_courses (list): List of Course objects that are optional
+    
+    Returns:
+        int: Number of valid schedules
+    """
+    return _search_space(required_courses, optional_courses).counter.count()
+
+
+def unrank_schedule(required_courses, optional_courses, k):
+    """
+    Build the k-th valid schedule without enumerating the schedules before it.
+    
+    The schedule is built course by course from the memoised subtree counts
+    of count_valid_schedules, so the cost does not grow with k.
+    
+    Args:
+        required_courses (list): List of Course objects that must be included
+        optional_courses (list): List of Course objects that are optional
+        k (int): 0-based index in the order of iter_valid_schedules
+    
+    Returns:
+        Schedule: The schedule, as from iter_valid_schedules
+    
+    Raises:
+        IndexError: If k is not in range(count_valid_schedules(...))
+    """
+    space = _search_space(required_courses, optional_courses)
+    return space.schedule(space.counter.unrank(k))
+
+
+def rank_schedule(required_courses, optional_courses, schedule):
+    """
+    Get the index of a valid schedule; the inverse of unrank_schedule.
+    
+    Args:
+        required_courses (list): List of Course objects that must be included
+        optional_courses (list): List of Course objects that are optional
+        schedule (tuple): (course_selection, tutorial_selection), as from iter_valid_schedules
+    
+    Returns:
+        int: 0-based index in the order of iter_valid_schedules
+    
+    Raises:
+        ValueError: If schedule is not a valid schedule of these courses
+    """
+    space = _search_space(required_courses, optional_courses)
+    return space.counter.rank(space.choices_of(schedule))
+
+
+class ScheduleScorer(ABC):
+    """
+    Base class of preference scores for best_schedules (higher is better).
+    
+    A scorer rates a complete schedule by its occupied slots and the number of
+    optional courses in it. For pruning, it must also give an upper bound of the
+    score of every schedule that can still be reached from a partial one.
+    """
+    
+    @abstractmethod
+    def score(self, occupied_mask, num_optional):
+        """
+        Score a complete schedule.
+        
+        Args:
+            occupied_mask (int): Slots taken by lectures and selected tutorials
+            num_optional (int): Number of optional courses in the schedule
+        
+        Returns:
+            float: The score
+        """
+    
+    @abstractmethod
+    def upper_bound(self, occupied_mask, num_optional, reachable_mask, optional_left):
+        """
+        Bound the score of every completion of a partial schedule from above.
+        
+        Args:
+            occupied_mask (int): Slots taken so far
+            num_optional (int): Number of optional courses taken so far
+            reachable_mask (int): Slots the remaining courses could still take
+            optional_left (int): Upper bound of how many undecided optional courses can still be added
+        
+        Returns:
+            float: Upper bound of the score
+        """
+
+
+class MostOptionalScorer(ScheduleScorer):
+    """Prefer schedules with as many optional courses as possible."""
+    
+    def score(self, occupied_mask, num_optional):
+        return num_optional
+    
+    def upper_bound(self, occupied_mask, num_optional, reachable_mask, optional_left):
+        return num_optional + optional_left
+
+
+class FewestDaysScorer(ScheduleScorer):
+    """Prefer schedules with classes on as few days as possible."""
+    
+    def __init__(self, grid=None):
+        """
+        Initialize the scorer.
+        
+        Args:
+            grid (TimeGrid, optional): Grid of the courses; DEFAULT_GRID by default
+        """
+        grid = grid if grid is not None else DEFAULT_GRID
+        self.day_masks = [grid.day_mask(day_idx) for day_idx in range(grid.num_days)]
+    
+    def score(self, occupied_mask, num_optional):
+        return -sum(1 for mask in self.day_masks if occupied_mask & mask)
+    
+    def upper_bound(self, occupied_mask, num_optional, reachable_mask, optional_left):
+        # Adding courses never frees a day
+        return self.score(occupied_mask, num_optional)
+
+
+class AvoidSlotsScorer(ScheduleScorer):
+    """Prefer schedules using few of the given time slots (Morning 1 by default)."""
+    
+    def __init__(self, slot_indices=(0,), grid=None):
+        """
+        Initialize the scorer.
+        
+        Args:
+            slot_indices (tuple): Slot indices to avoid, 0-6 (Morning 1 to Evening 3)
+            grid (TimeGrid, optional): Grid of the courses; DEFAULT_GRID by default
+        """
+        grid = grid if grid is not None else DEFAULT_GRID
+        self.avoid_mask = 0
+        for slot_idx in slot_indices:
+            self.avoid_mask |= grid.slot_row_mask(slot_idx)
+    
+    def score(self, occupied_mask, num_optional):
+        return -(occupied_mask & self.avoid_mask).bit_count()
+    
+    def upper_bound(self, occupied_mask, num_optional, reachable_mask, optional_left):
+        # Adding courses never frees a slot
+        return self.score(occupied_mask, num_optional)
+
+
+class NoGapsScorer(ScheduleScorer):
+    """Prefer schedules with few empty slots between classes of the same day."""
+    
+    def __init__(self, grid=None):
+        """
+        Initialize the scorer.
+        
+        Args:
+            grid (TimeGrid, optional): Grid of the courses; DEFAULT_GRID by default
+        """
+        self.grid = grid if grid is not None else DEFAULT_GRID
+    
+    def score(self, occupied_mask, num_optional):
+        return -self.grid.gap_mask(occupied_mask).bit_count()
+    
+    def upper_bound(self, occupied_mask, num_optional, reachable_mask, optional_left):
+        # A gap stays a gap unless a remaining course can fill it
+        return -(self.grid.gap_mask(occupied_mask) & ~reachable_mask).bit_count()
+
+
+class WeightedScorer(ScheduleScorer):
+    """
+    Combine several scorers as a weighted sum.
+    
+    Example:
+        score = WeightedScorer([(MostOptionalScorer(), 10), (FewestDaysScorer(), 1)])
+    """
+    
+    def __init__(self, weighted_scorers):
+        """
+        Initialize the scorer.
+        
+        Args:
+            weighted_scorers (list): List of (ScheduleScorer, weight) tuples; weights must not be negative
+        """
+        for _, weight in weighted_scorers:
+            if weight < 0:
+                raise ValueError("weights of a WeightedScorer must not be negative")
+        self.weighted_scorers = list(weighted_scorers)
+    
+    def score(self, occupied_mask, num_optional):
+        return sum(weight * scorer.score(occupied_mask, num_optional) for scorer, weight in self.weighted_scorers)
+    
+    def upper_bound(self, occupied_mask, num_optional, reachable_mask, optional_left):
+        return sum(
+            weight * scorer.upper_bound(occupied_mask, num_optional, reachable_mask, optional_left)
+            for scorer, weight in self.weighted_scorers
+        )
+
+
+def best_schedules(required_courses, optional_courses, k=10, score=None):
+    """
+    Find the k best valid schedules by a preference score.
+    
+    Runs a branch-and-bound search over the same space as iter_valid_schedules:
+    a branch is cut as soon as the scorer's upper bound shows it cannot beat the
+    k-th best schedule found so far, so the full space is never enumerated.
+    
+    Args:
+        required_courses (list): List of Course objects that must be included
+        optional_courses (list): List of Course objects that are optional
+        k (int): Number of schedules to return
+        score (ScheduleScorer, optional): Preference score; MostOptionalScorer() by default
+    
+    Returns:
+        list: List of (score, Schedule) tuples, best first.
+              Schedules with equal scores keep the order in which they were found.
+    
+    Example:
+        best = best_schedules(required, optional, k=5,
+                              score=WeightedScorer([(FewestDaysScorer(), 2), (AvoidSlotsScorer(), 1)]))
+    """
+    if score is None:
+        score = MostOptionalScorer()
+    if k <= 0:
+        return []
+    
+    space = _SearchSpace(required_courses, optional_courses)
+    course_options = space.course_options
+    optional = space.optional
+    num_courses = len(course_options)
+    reachable = _reachable_masks(course_options)
+    # Try taking each optional course before skipping it, so good schedules are found early
+    search_options = [
+        options[1:] + options[:1] if is_optional else options
+        for options, is_optional in zip(course_options, optional)
+    ]
+    
+    best = []  # min-heap of (score, -sequence, choices) holding the k best so far
+    sequence = count()
+    choices = [None] * num_courses
+    
+    def optional_left(depth, occupied_mask):
+        """
+        Bound how many of the remaining optional courses can still be added.
+        
+        Counts the courses with an option that fits into the free slots, but no
+        more than the free slots can hold when each course takes its smallest
+        fitting option.
+        """
+        free_slots = (reachable[depth] & ~occupied_mask).bit_count()
+        slots_needed = sorted(
+            min(
+                (slot_mask.bit_count() for choice, slot_mask in options
+                 if choice is not None and not slot_mask & occupied_mask),
+                default=free_slots + 1
+            )
+            for options, is_optional in zip(course_options[depth:], optional[depth:])
+            if is_optional
+        )
+        num_fitting = 0
+        for needed in slots_needed:
+            if needed > free_slots:
+                break
+            free_slots -= needed
+            num_fitting += 1
+        return num_fitting
+    
+    def search(depth, occupied_mask, num_optional):
+        if len(best) == k:
+            bound = score.upper_bound(
+                occupied_mask, num_optional, reachable[depth], optional_left(depth, occupied_mask)
+            )
+            if bound <= best[0][0]:
+                return
+        
+        if depth == num_courses:
+            entry = (score.score(occupied_mask, num_optional), -next(sequence), tuple(choices))
+            if len(best) < k:
+                heapq.heappush(best, entry)
+            elif entry[0] > best[0][0]:
+                # The bound only prunes branches, so the leaf may still be no better
+                heapq.heapreplace(best, entry)
+            return
+        
+        is_optional = optional[depth]
+        for choice, slot_mask in search_options[depth]:
+            if slot_mask & occupied_mask:
+                continue
+            choices[depth] = choice
+            search(depth + 1, occupied_mask | slot_mask, num_optional + (is_optional and choice is not None))
+    
+    search(0, 0, 0)
+    return [
+        (value, space.schedule(schedule_choices))
+        for value, _, schedule_choices in sorted(best, reverse=True)
+    ]
+
+
+class SchedulePlanner:
+    """
+    Keeps the valid schedules of a plan up to date as courses are added or removed.
+    
+    The planner stores every valid schedule compactly, as its search choices and
+    occupied-slot bitmask. Adding a course only checks the new course against
+    those schedules: each one is extended with every option of the course that
+    fits (and also kept without it if the course is optional). Removing an
+    optional course drops the schedules that took it; removing a required course
+    re-solves, since schedules it blocked may become valid.
+    
+    Schedules are kept in course insertion order: for each course, in the order it
+    was added, optional courses are first left out and then taken. The set of
+    schedules equals find_all_valid_schedules_with_optional(planner.required_courses,
+    planner.optional_courses).
+    
+    Example:
+        planner = SchedulePlanner([course1], [course2])
+        planner.add_course(course3, optional=True)
+        for course_list, tutorial_selection in planner:
+            ...
+    """
+    
+    def __init__(self, required_courses=None, optional_courses=None):
+        """
+        Initialize the planner.
+        
+        Args:
+            required_courses (list, optional): Course objects that must be included
+            optional_courses (list, optional): Course objects that are optional
+        """
+        self.courses = []
+        self.optional = []
+        self._schedules = [((), 0)]  # (choices per course, occupied slot mask)
+        self._layout = None  # (courses of the schedules, planner index of each), built on demand
+        for course in required_courses or []:
+            self.add_course(course)
+        for course in optional_courses or []:
+            self.add_course(course, optional=True)
+    
+    @property
+    def required_courses(self):
+        """List of required Course objects, in insertion order."""
+        return [course for course, is_optional in zip(self.courses, self.optional) if not is_optional]
+    
+    @property
+    def optional_courses(self):
+        """List of optional Course objects, in insertion order."""
+        return [course for course, is_optional in zip(self.courses, self.optional) if is_optional]
+    
+    def add_course(self, course, optional=False):
+        """
+        Add a course and extend the existing schedules with it.
+        
+        Args:
+            course (Course): The course to add
+            optional (bool): Whether the course may be left out
+        
+        Raises:
+            ValueError: If the course, or a copy with the same code and times, is already
+                        in the plan, or the course uses another time grid
+        """
+        key = _course_key(course)
+        if any(_course_key(existing) == key for existing in self.courses):
+            raise ValueError(f"{course.course_code} is already in the plan")
+        _check_same_grid(self.courses[:1] + [course])
+        options = _course_options(course, optional)
+        self._schedules = [
+            (choices + (choice,), occupied_mask | slot_mask)
+            for choices, occupied_mask in self._schedules
+            for choice, slot_mask in options
+            if not slot_mask & occupied_mask
+        ]
+        self.courses.append(course)
+        self.optional.append(optional)
+        self._layout = None
+    
+    def remove_course(self, course):
+        """
+        Remove a course from the plan.
+        
+        Args:
+            course (Course): The course to remove
+        
+        Raises:
+            ValueError: If the course is not in the plan
+        """
+        for course_idx, existing in enumerate(self.courses):
+            if existing is course:
+                break
+        else:
+            raise ValueError(f"{course.course_code} is not in the plan")
+        
+        was_optional = self.optional[course_idx]
+        del self.courses[course_idx]
+        del self.optional[course_idx]
+        self._layout = None
+        if was_optional:
+            # Schedules without the course stay valid; schedules with it duplicate them
+            self._schedules = [
+                (choices[:course_idx] + choices[course_idx + 1:], occupied_mask)
+                for choices, occupied_mask in self._schedules
+                if choices[course_idx] is None
+            ]
+        else:
+            # Schedules blocked by the course may become valid, so solve again
+            courses, optional = self.courses, self.optional
+            self.courses, self.optional = [], []
+            self._schedules = [((), 0)]
+            for remaining, is_optional in zip(courses, optional):
+                self.add_course(remaining, optional=is_optional)
+    
+    def __len__(self):
+        return len(self._schedules)
+    
+    def __getitem__(self, index):
+        """Get a (course_list, tutorial_selection) schedule by its 0-based index."""
+        choices, _ = self._schedules[index]
+        return self._schedule(choices)
+    
+    def __iter__(self):
+        for choices, _ in self._schedules:
+            yield self._schedule(choices)
+    
+    def _schedule(self, choices):
+        """Build a Schedule listing required courses before optional ones."""
+        if self._layout is None:
+            # Planner indices of the required courses, then of the optional ones
+            order = [
+                course_idx
+                for is_optional in (False, True)
+                for course_idx in range(len(self.courses))
+                if self.optional[course_idx] == is_optional
+            ]
+            self._layout = (tuple(self.courses[course_idx] for course_idx in order), order)
+        courses, order = self._layout
+        return Schedule.from_choices(courses, [choices[course_idx] for course_idx in order])
+
+
+class BackgroundPlanner:
+    """
+    Keeps a running count of the valid schedules of a plan in a worker thread.
+    
+    add_course returns at once; a daemon thread counts the valid schedules of
+    the courses added so far while the caller goes on, e.g. prompting for the
+    next course. When several courses are queued, only the latest plan is
+    counted. Each plan starts from the counts of the independent components
+    (see _SearchSpace) it shares with the plan counted before, so a new course
+    only costs the recount of the courses it clashes with, directly or not.
+    Counting memoises the subtree counts that count_valid_schedules and
+    unrank_schedule reuse, so listing the schedules afterwards is quick.
+    
+    No schedule is stored, so a plan with billions of schedules costs no more
+    memory than a small one. A thread keeps the search space in this process,
+    and a prompt waiting in input() releases the interpreter lock, so it stays
+    responsive while the worker counts.
+    
+    Call wait() before reading num_schedules, and close() when done.
+    
+    Example:
+        with BackgroundPlanner() as background:
+            background.add_course(course1)
+            background.add_course(course2, optional=True)
+            background.wait()
+            print(background.num_schedules)
+    """
+    
+    def __init__(self):
+        """Initialize the planner and start its worker thread."""
+        self.courses = []
+        self.optional = []
+        self._tasks = queue.Queue()
+        self._idle = threading.Condition()
+        self._num_counted = 0  # courses covered by num_schedules
+        self.num_schedules = 1  # the empty plan has one, empty schedule
+        self._error = None
+        self._closed = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="schedule-planner", daemon=True)
+        self._thread.start()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    @property
+    def required_courses(self):
+        """List of required Course objects added so far, counted or not."""
+        return [course for course, is_optional in zip(self.courses, self.optional) if not is_optional]
+    
+    @property
+    def optional_courses(self):
+        """List of optional Course objects added so far, counted or not."""
+        return [course for course, is_optional in zip(self.courses, self.optional) if is_optional]
+    
+    @property
+    def pending(self):
+        """Number of added courses the worker has not counted yet."""
+        return len(self.courses) - self._num_counted
+    
+    @property
+    def done(self):
+        """Whether every added course has been counted."""
+        return not self.pending
+    
+    def add_course(self, course, optional=False):
+        """
+        Queue a course to be added to the plan.
+        
+        Args:
+            course (Course): The course to add
+            optional (bool): Whether the course may be left out
+        
+        Raises:
+            ValueError: If the course, or a copy with the same code and times, is already
+                        in the plan, the course uses another time grid or the planner is closed
+        """
+        if self._closed:
+            raise ValueError("the planner is closed")
+        key = _course_key(course)
+        if any(_course_key(existing) == key for existing in self.courses):
+            raise ValueError(f"{course.course_code} is already in the plan")
+        _check_same_grid(self.courses[:1] + [course])
+        with self._idle:
+            self.courses.append(course)
+            self.optional.append(optional)
+        self._tasks.put(None)
+    
+    def wait(self, timeout=None):
+        """
+        Wait until every added course has been counted.
+        
+        Args:
+            timeout (float, optional): Seconds to wait at most; None waits until done
+        
+        Returns:
+            bool: Whether num_schedules is up to date; False at once if the planner
+                  was closed before counting every course
+        
+        Raises:
+            Exception: The error the worker hit while counting a plan, if any
+        """
+        with self._idle:
+            self._idle.wait_for(lambda: self.done or self._stopped, timeout)
+            finished = self.done
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        return finished
+    
+    def close(self, timeout=None):
+        """
+        Stop the worker thread once the plan it is counting, if any, is done.
+        
+        Courses still queued are not counted, and no course can be added afterwards.
+        
+        Args:
+            timeout (float, optional): Seconds to wait for the thread at most; None waits until it stops
+        
+        Returns:
+            bool: Whether the thread has stopped
+        """
+        self._closed = True
+        self._tasks.put(None)
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+    
+    def _run(self):
+        """Count the latest plan whenever courses were added, until closed."""
+        space = None
+        while True:
+            self._tasks.get()
+            # Plans superseded by courses queued since need no counting
+            while True:
+                try:
+                    self._tasks.get_nowait()
+                except queue.Empty:
+                    break
+            if self._closed:
+                break
+            with self._idle:
+                courses, optional = list(self.courses), list(self.optional)
+            num_courses = len(courses)
+            num_schedules = None
+            try:
+                previous, space = space, _search_space(
+                    [course for course, is_optional in zip(courses, optional) if not is_optional],
+                    [course for course, is_optional in zip(courses, optional) if is_optional],
+                )
+                if previous is not None:
+                    space.reuse_counts(previous)
+                num_schedules = space.counter.count()
+            except Exception as e:
+                # Reported to the caller by wait()
+                if self._error is None:
+                    self._error = e
+            finally:
+                with self._idle:
+                    if num_schedules is not None:
+                        self.num_schedules = num_schedules
+                    self._num_counted = num_courses
+                    if self.done:
+                        self._idle.notify_all()
+        # Wake up wait() calls for courses that will not be counted
+        with self._idle:
+            self._stopped = True
+            self._idle.notify_all()
+
+
+class CompiledCatalog:
+    """
+    A course catalog compiled once to plan many students against it.
+    
+    Compiling precomputes, for every course, its slot masks and tutorial
+    options (with and without the option to skip it) and a pairwise conflict
+    table of the courses that share a slot. Each plan then only picks its
+    courses from these tables instead of rebuilding them, and the searches of
+    all plans share the subsolution cache, since they use the same Course objects.
+    
+    Plans give the same schedules, in the same order, as
+    find_all_valid_schedules_with_optional on the selected courses.
+    
+    Example:
+        catalog = CompiledCatalog(courses)
+        results = catalog.plan_many([
+            (["MAT1001", "PHY1001"], ["GED2003"]),
+            (["MAT1001"], ["GED2003", "CSC1001"]),
+        ])
+    """
+    
+    def __init__(self, courses):
+        """
+        Compile a catalog.
+        
+        Args:
+            courses (list): Catalog Course objects, with unique course codes
+        
+        Raises:
+            ValueError: If a course code appears more than once, or the courses use different time grids
+        """
+        self.courses = list(courses)
+        _check_same_grid(self.courses)
+        self._index = {}
+        for catalog_idx, course in enumerate(self.courses):
+            if course.course_code in self._index:
+                raise ValueError(f"duplicated course code {course.course_code}")
+            self._index[course.course_code] = catalog_idx
+        
+        # options[idx] = (options as a required course, options as an optional course)
+        self.options = [
+            (_course_options(course, optional=False), _course_options(course, optional=True))
+            for course in self.courses
+        ]
+        self.slot_masks = []
+        for _, optional_options in self.options:
+            course_slots = 0
+            for _, slot_mask in optional_options:
+                course_slots |= slot_mask
+            self.slot_masks.append(course_slots)
+        
+        # conflicts[idx] = bitmask of the catalog indices of the courses sharing a slot with it
+        self.conflicts = [0] * len(self.courses)
+        slot_courses = {}
+        for catalog_idx, course_slots in enumerate(self.slot_masks):
+            while course_slots:
+                slot = course_slots & -course_slots
+                course_slots ^= slot
+                slot_courses[slot] = slot_courses.get(slot, 0) | (1 << catalog_idx)
+        for course_bits in slot_courses.values():
+            remaining = course_bits
+            while remaining:
+                course_bit = remaining & -remaining
+                remaining ^= course_bit
+                self.conflicts[course_bit.bit_length() - 1] |= course_bits & ~course_bit
+    
+    def __len__(self):
+        return len(self.courses)
+    
+    def index_of(self, course):
+        """
+        Get the catalog index of a course.
+        
+        Raises:
+            ValueError: If the course is not in the catalog
+        """
+        catalog_idx = self._index.get(course.course_code)
+        if catalog_idx is None or self.courses[catalog_idx] is not course:
+            raise ValueError(f"{course.course_code} is not in the catalog")
+        return catalog_idx
+    
+    def select(self, required_codes, optional_codes):
+        """
+        Pick the courses of a plan by their codes.
+        
+        Args:
+            required_codes (list): Codes of the required courses
+            optional_codes (list): Codes of the optional courses
+        
+        Returns:
+            tuple: (required_courses, optional_courses)
+        
+        Raises:
+            ValueError: If a code is not in the catalog or is selected twice
+        """
+        codes = list(required_codes) + list(optional_codes)
+        missing = [code for code in codes if code not in self._index]
+        if missing:
+            raise ValueError(f"unknown course code(s): {', '.join(missing)}")
+        if len(set(codes)) != len(codes):
+            raise ValueError("a course code is selected more than once")
+        return (
+            [self.courses[self._index[code]] for code in required_codes],
+            [self.courses[self._index[code]] for code in optional_codes],
+        )
+    
+    def components(self, catalog_ids):
+        """
+        Split selected courses into the components of their conflict graph.
+        
+        Gives the same components as _conflict_components on their options,
+        from the precomputed conflict table.
+        
+        Args:
+            catalog_ids (list): Catalog indices of the selected courses
+        
+        Returns:
+            list: Components as lists of positions in catalog_ids, each in
+                  ascending order, ordered by their first course
+        """
+        position_of = {catalog_idx: position for position, catalog_idx in enumerate(catalog_ids)}
+        selected = 0
+        for catalog_idx in catalog_ids:
+            selected |= 1 << catalog_idx
+        
+        components = []
+        unvisited = selected
+        for catalog_idx in catalog_ids:
+            if not unvisited >> catalog_idx & 1:
+                continue
+            unvisited &= ~(1 << catalog_idx)
+            stack = [catalog_idx]
+            component = []
+            while stack:
+                current = stack.pop()
+                component.append(position_of[current])
+                neighbours = self.conflicts[current] & unvisited
+                unvisited &= ~neighbours
+                while neighbours:
+                    neighbour = neighbours & -neighbours
+                    neighbours ^= neighbour
+                    stack.append(neighbour.bit_length() - 1)
+            components.append(sorted(component))
+        return components
+    
+    def space(self, required_codes, optional_codes):
+        """Build the _SearchSpace of a plan from the compiled tables."""
+        required_courses, optional_courses = self.select(required_codes, optional_codes)
+        return _SearchSpace(required_courses, optional_courses, catalog=self)
+    
+    def plan(self, required_codes, optional_codes, stats=None):
+        """
+        Find all valid schedules of one plan.
+        
+        Args:
+            required_codes (list): Codes of the required courses
+            optional_codes (list): Codes of the optional courses
+            stats (SearchStats, optional): Statistics to count the search in
+        
+        Returns:
+            list: Schedule records, as from
+                  find_all_valid_schedules_with_optional
+        
+        Raises:
+            ValueError: If a code is not in the catalog or is selected twice
+        """
+        with _timed(stats, "setup"):
+            space = self.space(required_codes, optional_codes)
+        if stats is not None:
+            return list(_timed_schedules(space, space.iter_choices(stats), stats))
+        return [space.schedule(choices) for choices in space.iter_choices()]
+    
+    def plan_many(self, requests, workers=None):
+        """
+        Find all valid schedules of many plans.
+        
+        With workers > 1 the plans are solved by a pool of worker processes.
+        Where processes are forked, the workers inherit the compiled catalog
+        copy-on-write instead of receiving a copy of it; elsewhere each worker
+        receives one copy when it starts. Only course codes are sent to the
+        workers, and only search choices are sent back.
+        
+        Args:
+            requests (iterable): (required_codes, optional_codes) pairs, one per plan
+            workers (int, optional): Number of worker processes to solve with;
+                                     None or 1 solves in this process
+        
+        Returns:
+            list: The list of schedules of each plan, in the order of requests
+        
+        Raises:
+            ValueError: If a code is not in the catalog or is selected twice
+        """
+        requests = [(list(required_codes), list(optional_codes)) for required_codes, optional_codes in requests]
+        if workers is None or workers <= 1:
+            return [self.plan(required_codes, optional_codes) for required_codes, optional_codes in requests]
+        
+        # Validate in this process so that errors are raised before any work starts
+        spaces = [self.space(required_codes, optional_codes) for required_codes, optional_codes in requests]
+        global _worker_catalog
+        try:
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+            _worker_catalog = self
+        except ValueError:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_catalog_worker, initargs=(self,))
+        try:
+            with executor:
+                all_choices = list(executor.map(_plan_choices, requests))
+        finally:
+            _worker_catalog = None
+        return [
+            [space.schedule(choices) for choices in plan_choices]
+            for space, plan_choices in zip(spaces, all_choices)
+        ]
+
+
+# Compiled catalog of a worker process of CompiledCatalog.plan_many
+_worker_catalog = None
+
+
+def _init_catalog_worker(catalog):
+    """Keep the compiled catalog of a worker process that is not forked."""
+    global _worker_catalog
+    _worker_catalog = catalog
 
 
-def find_all_valid_schedules_with_optional(required_courses, optional_courses):
+def _plan_choices(request):
     """
-    Find all valid course schedules with required and optional courses.
-    
-    Requirements:
-    - ALL courses in required_courses must be included
-    - Optional courses are added if possible, but schedules without them are also valid
-    - If an optional course has multiple tutorial options that all work, 
-      separate schedules are returned for each option
+    Solve one plan in a worker process.
     
     Args:
-        required_courses (list): List of Course objects that must be included
-        optional_courses (list): List of Course objects that are optional
+        request (tuple): (required_codes, optional_codes)
     
     Returns:
-        list: List of tuples (course_selection, tutorial_selection) where:
-              - course_selection: list of Course objects (includes all required + some optional)
-              - tutorial_selection: dict mapping course to selected tutorial slot (day_idx, slot_idx)
+        list: Search choices of every valid schedule, in search order
     """
-    from itertools import combinations, product
-    
-    def lectures_conflict(course_list):
-        """Check if lectures of courses conflict."""
-        occupied_slots = set()
-        for course in course_list:
-            for day_idx, slot_idx in course.lectures:
-                slot = (day_idx, slot_idx)
-                if slot in occupied_slots:
-                    return True
-                occupied_slots.add(slot)
-        return False
-    
-    def find_valid_tutorial_combinations(course_list):
-        """
-        Find all valid tutorial selections for a list of courses.
-        Returns list of dicts mapping course to selected tutorial slot.
-        """
-        # Get all lecture slots that are occupied
-        occupied_by_lectures = set()
-        for course in course_list:
-            for day_idx, slot_idx in course.lectures:
-                occupied_by_lectures.add((day_idx, slot_idx))
-        
-        # For each course, get available tutorial options (that don't conflict with lectures)
-        tutorial_options = []
-        courses_with_tutorials = []
-        
-        for course in course_list:
-            if course.tutorials:
-                # Filter out tutorials that conflict with lectures
-                available = [t for t in course.tutorials if t not in occupied_by_lectures]
-                if not available:
-                    # No valid tutorial time available for this course
-                    return []
-                tutorial_options.append(available)
-                courses_with_tutorials.append(course)
-            # If course has no tutorials, skip it
-        
-        if not courses_with_tutorials:
-            # No courses have tutorials
-            return [{}]
-        
-        # Generate all combinations of tutorial selections
-        valid_combinations = []
-        for tutorial_combo in product(*tutorial_options):
-            # Check if this combination has conflicts
-            tutorial_slots = set()
-            has_conflict = False
-            
-            for slot in tutorial_combo:
-                if slot in tutorial_slots or slot in occupied_by_lectures:
-                    has_conflict = True
-                    break
-                tutorial_slots.add(slot)
-            
-            if not has_conflict:
-                # Create mapping of course to selected tutorial
-                tutorial_selection = {}
-                for course, tutorial_slot in zip(courses_with_tutorials, tutorial_combo):
-                    tutorial_selection[course] = tutorial_slot
-                valid_combinations.append(tutorial_selection)
-        
-        return valid_combinations
-    
-    def find_valid_tutorial_combinations_with_occupied(course_list, occupied_slots):
-        """
-        Find all valid tutorial selections for a list of courses, given already occupied slots.
-        Returns list of dicts mapping course to selected tutorial slot.
-        """
-        # For each course, get available tutorial options (that don't conflict with occupied slots)
-        tutorial_options = []
-        courses_with_tutorials = []
-        
-        for course in course_list:
-            if course.tutorials:
-                # Filter out tutorials that conflict with occupied slots
-                available = [t for t in course.tutorials if t not in occupied_slots]
-                if not available:
-                    # No valid tutorial time available for this course
-                    return []
-                tutorial_options.append(available)
-                courses_with_tutorials.append(course)
-        
-        if not courses_with_tutorials:
-            # No courses have tutorials
-            return [{}]
-        
-        # Generate all combinations of tutorial selections
-        valid_combinations = []
-        for tutorial_combo in product(*tutorial_options):
-            # Check if this combination has conflicts
-            tutorial_slots = set()
-            has_conflict = False
-            
-            for slot in tutorial_combo:
-                if slot in tutorial_slots or slot in occupied_slots:
-                    has_conflict = True
-                    break
-                tutorial_slots.add(slot)
-            
-            if not has_conflict:
-                # Create mapping of course to selected tutorial
-                tutorial_selection = {}
-                for course, tutorial_slot in zip(courses_with_tutorials, tutorial_combo):
-                    tutorial_selection[course] = tutorial_slot
-                valid_combinations.append(tutorial_selection)
-        
-        return valid_combinations
-    
-    # First, check if required courses have conflicts
-    if lectures_conflict(required_courses):
-        return []  # Cannot satisfy required courses
-    
-    # Find all valid tutorial combinations for required courses
-    required_tutorial_combos = find_valid_tutorial_combinations(required_courses)
-    if not required_tutorial_combos:
-        return []  # Cannot satisfy required courses' tutorials
-    
-    # Now, for each valid tutorial combination of required courses,
-    # try to add optional courses
-    all_valid_schedules = []
-    
-    for required_tutorial_selection in required_tutorial_combos:
-        # Get occupied slots from required courses (lectures + selected tutorials)
-        occupied_slots = set()
-        for course in required_courses:
-            for day_idx, slot_idx in course.lectures:
-                occupied_slots.add((day_idx, slot_idx))
-            if course in required_tutorial_selection:
-                occupied_slots.add(required_tutorial_selection[course])
-        
-        # Try all possible combinations of optional courses (including none)
-        for r in range(len(optional_courses) + 1):
-            for optional_combo in combinations(optional_courses, r):
-                optional_list = list(optional_combo)
-                
-                # If no optional courses, add schedule with just required courses
-                if not optional_list:
-                    full_course_list = required_courses.copy()
-                    full_tutorial_selection = required_tutorial_selection.copy()
-                    all_valid_schedules.append((full_course_list, full_tutorial_selection))
-                    continue
-                
-                # Check if optional courses conflict with required courses or each other
-                # First check lectures
-                if lectures_conflict(optional_list):
-                    continue
-                
-                # Check if optional courses' lectures conflict with occupied slots
-                temp_occupied = occupied_slots.copy()
-                has_lecture_conflict = False
-                for course in optional_list:
-                    for day_idx, slot_idx in course.lectures:
-                        if (day_idx, slot_idx) in temp_occupied:
-                            has_lecture_conflict = True
-                            break
-                        temp_occupied.add((day_idx, slot_idx))
-                    if has_lecture_conflict:
-                        break
-                
-                if has_lecture_conflict:
-                    continue
-                
-                # No lecture conflict, now find valid tutorial combinations for optional courses
-                # considering the occupied slots
-                optional_tutorial_combos = find_valid_tutorial_combinations_with_occupied(
-                    optional_list, temp_occupied
-                )
-                
-                if not optional_tutorial_combos:
-                    # Cannot add these optional courses due to tutorial conflicts
-                    continue
-                
-                for optional_tutorial_selection in optional_tutorial_combos:
-                    # Combine required and optional courses
-                    full_course_list = required_courses + optional_list
-                    full_tutorial_selection = {**required_tutorial_selection, **optional_tutorial_selection}
-                    all_valid_schedules.append((full_course_list, full_tutorial_selection))
-    
-    # Remove duplicates and return
-    # Note: We want all schedules, even if they are subsets, because optional courses
-    # can be included or not, so schedules with fewer optional courses are still valid
-    return all_valid_schedules
+    return list(_worker_catalog.space(*request).iter_choices())
 
 
 def print_all_valid_schedules(courses):
@@ -607,62 +3638,12 @@ def print_all_valid_schedules(courses):
     
     print(f"Found {len(valid_schedules)} valid schedule(s):\n")
     
-    for idx, (course_list, tutorial_selection) in enumerate(valid_schedules, 1):
-        print("=" * 100)
-        # Create a summary line with all course codes
-        course_codes = ", ".join([course.course_code for course in course_list])
-        print(f"SCHEDULE #{idx} - {len(course_list)} course(s): [{course_codes}]")
-        print("=" * 100)
-        
-        # Print course details
-        print("\nCourses in this schedule:")
-        for course in course_list:
-            print(f"  • {course.course_code}: {course.course_name}")
-            # if course.lectures:
-                # print(f"    Lectures: {len(course.lectures)} session(s) - ALL required")
-            # if course.tutorials:
-            #     selected_tutorial = tutorial_selection.get(course)
-            #     if selected_tutorial:
-            #         day_idx, slot_idx = selected_tutorial
-            #         time_slots = [
-            #             "Morning 1 (8:30-10:20)",
-            #             "Morning 2 (10:30-11:50)",
-            #             "Afternoon 1 (13:30-15:20)",
-            #             "Afternoon 2 (15:30-16:50)",
-            #             "Evening 1 (18:00-18:50)",
-            #             "Evening 2 (19:00-19:50)",
-            #             "Evening 3 (20:00-20:50)",
-            #         ]
-            #         days = ["DAY 1", "DAY 2", "DAY 3", "DAY 4", "DAY 5"]
-            #         print(f"    Tutorial: Selected {days[day_idx]} {time_slots[slot_idx]} (from {len(course.tutorials)} option(s))")
-        
-        print("\nCalendar View:")
-        # Create modified course objects with only selected tutorials
-        modified_courses = []
-        for course in course_list:
-            selected_tutorial = tutorial_selection.get(course)
-            if selected_tutorial:
-                # Create a new course with only the selected tutorial
-                modified_course = Course(
-                    course.course_code,
-                    course.course_name,
-                    lectures=course.lectures,
-                    tutorials=[selected_tutorial]
-                )
-            else:
-                # No tutorial for this course
-                modified_course = Course(
-                    course.course_code,
-                    course.course_name,
-                    lectures=course.lectures,
-                    tutorials=[]
-                )
-            modified_courses.append(modified_course)
-        
-        print_calendar_with_course_list(modified_courses)
-        
+    # One write per schedule: its title, course list and calendar
+    for idx, schedule in enumerate(valid_schedules, 1):
+        page = CalendarRenderer.for_grid(_schedule_grid(schedule)).render_page(schedule, idx)
         if idx < len(valid_schedules):
-            print("\n")
+            page += "\n\n"
+        sys.stdout.write(page)
 
 
 def print_schedule_by_index(schedule_index, valid_schedules, required_courses, optional_courses):
@@ -671,15 +3652,25 @@ def print_schedule_by_index(schedule_index, valid_schedules, required_courses, o
     
     Args:
         schedule_index (int): Index of the schedule (1-based)
-        valid_schedules (list): List of valid schedules from find_all_valid_schedules_with_optional
+        valid_schedules (list or None): List of valid schedules from find_all_valid_schedules_with_optional
+                                        (or a SchedulePlanner), or None to build the requested schedule
+                                        directly with unrank_schedule
         required_courses (list): List of required Course objects
         optional_courses (list): List of optional Course objects
     """
-    if schedule_index < 1 or schedule_index > len(valid_schedules):
-        print(f"[ERROR] Invalid schedule index. Please enter a number between 1 and {len(valid_schedules)}.")
-        return
+    if valid_schedules is None:
+        num_schedules = count_valid_schedules(required_courses, optional_courses)
+        if schedule_index < 1 or schedule_index > num_schedules:
+            print(f"[ERROR] Invalid schedule index. Please enter a number between 1 and {num_schedules}.")
+            return
+        schedule = unrank_schedule(required_courses, optional_courses, schedule_index - 1)
+    else:
+        if schedule_index < 1 or schedule_index > len(valid_schedules):
+            print(f"[ERROR] Invalid schedule index. Please enter a number between 1 and {len(valid_schedules)}.")
+            return
+        schedule = valid_schedules[schedule_index - 1]
     
-    course_list, tutorial_selection = valid_schedules[schedule_index - 1]
+    course_list, tutorial_selection = schedule
     
     print("=" * 100)
     # Create a summary line with all course codes
@@ -699,29 +3690,7 @@ def print_schedule_by_index(schedule_index, valid_schedules, required_courses, o
         print(f"  • {course.course_code}: {course.course_name} ({course_type})")
     
     print("\nCalendar View:")
-    # Create modified course objects with only selected tutorials
-    modified_courses = []
-    for course in course_list:
-        selected_tutorial = tutorial_selection.get(course)
-        if selected_tutorial:
-            # Create a new course with only the selected tutorial
-            modified_course = Course(
-                course.course_code,
-                course.course_name,
-                lectures=course.lectures,
-                tutorials=[selected_tutorial]
-            )
-        else:
-            # No tutorial for this course
-            modified_course = Course(
-                course.course_code,
-                course.course_name,
-                lectures=course.lectures,
-                tutorials=[]
-            )
-        modified_courses.append(modified_course)
-    
-    print_calendar_with_course_list(modified_courses)
+    print_calendar_with_schedule(schedule)
     print()
 
 
@@ -736,79 +3705,122 @@ def list_all_valid_schedules(required_courses, optional_courses):
     Returns:
         list: List of tuples (course_list, tutorial_selection) from find_all_valid_schedules_with_optional
     """
-    valid_schedules = find_all_valid_schedules_with_optional(required_courses, optional_courses)
+    valid_schedules = []
+    for idx, (course_list, tutorial_selection) in enumerate(
+        iter_valid_schedules(required_courses, optional_courses), 1
+    ):
+        if idx == 1:
+            print("\nValid schedule(s):\n")
+        course_codes = ", ".join([course.course_code for course in course_list])
+        print(f"  [{idx}] {course_codes}")
+        valid_schedules.append((course_list, tutorial_selection))
     
     if not valid_schedules:
         print("No valid schedules found! Required courses have conflicts.")
         return []
     
-    print(f"\nFound {len(valid_schedules)} valid schedule(s):\n")
+    print(f"\nFound {len(valid_schedules)} valid schedule(s).\n")
+    return valid_schedules
+
+
+def print_schedule_page(required_courses, optional_courses, page_start=0, page_size=SCHEDULE_PAGE_SIZE,
+                        valid_schedules=None):
+    """
+    List one page of valid course schedules with course code lists and indices.
+    
+    Schedules on the page are built directly with unrank_schedule, so only the
+    current page is held in memory and later pages are as fast as the first.
+    
+    Args:
+        required_courses (list): List of Course objects that must be included
+        optional_courses (list): List of Course objects that are optional
+        page_start (int): 0-based index of the first schedule on the page
+        page_size (int): Maximum number of schedules on the page
+        valid_schedules (list or SchedulePlanner, optional): Schedules to list instead
+    
+    Returns:
+        tuple: (num_printed, has_more) where has_more tells if schedules follow this page
+    """
+    if valid_schedules is None:
+        num_schedules = count_valid_schedules(required_courses, optional_courses)
+    else:
+        num_schedules = len(valid_schedules)
+    page_end = min(page_start + page_size, num_schedules)
+    if page_start >= page_end:
+        return 0, False
     
-    for idx, (course_list, tutorial_selection) in enumerate(valid_schedules, 1):
+    print(f"\nFound {num_schedules} valid schedule(s), showing #{page_start + 1}-#{page_end}:\n")
+    for idx in range(page_start, page_end):
+        if valid_schedules is None:
+            course_list, _ = unrank_schedule(required_courses, optional_courses, idx)
+        else:
+            course_list, _ = valid_schedules[idx]
         course_codes = ", ".join([course.course_code for course in course_list])
-        print(f"  [{idx}] {course_codes}")
+        print(f"  [{idx + 1}] {course_codes}")
     
     print()
-    return valid_schedules
+    return page_end - page_start, page_end < num_schedules
 
 
-def print_time_slots_reference():
-    """Print a reference table for time slots."""
-    time_slots = [
-        ("Morning 1", "8:30-10:20"),
-        ("Morning 2", "10:30-11:50"),
-        ("Afternoon 1", "13:30-15:20"),
-        ("Afternoon 2", "15:30-16:50"),
-        ("Evening 1", "18:00-18:50"),
-        ("Evening 2", "19:00-19:50"),
-        ("Evening 3", "20:00-20:50"),
-    ]
+def print_time_slots_reference(grid=None):
+    """
+    Print a reference table for time slots.
     
-    days = ["DAY 1", "DAY 2", "DAY 3", "DAY 4", "DAY 5"]
+    Args:
+        grid (TimeGrid, optional): Grid to describe; DEFAULT_GRID by default
+    """
+    if grid is None:
+        grid = DEFAULT_GRID
     
     print("\nTime Slot Reference:")
     print("-" * 60)
-    print("Day numbers: 1-5 (DAY 1 = Monday, DAY 5 = Friday)")
+    if grid is DEFAULT_GRID:
+        print("Day numbers: 1-5 (DAY 1 = Monday, DAY 5 = Friday)")
+    else:
+        print(f"Day numbers: 1-{grid.num_days} ({', '.join(grid.days)})")
     print("\nTime slot numbers:")
-    for idx, (name, time) in enumerate(time_slots):
-        print(f"  {idx}: {name} ({time})")
+    for idx, (name, _, _) in enumerate(grid.slots):
+        print(f"  {idx}: {name} ({grid.slot_label(idx)})")
     print("-" * 60)
     print()
 
 
-def input_time_slots(slot_type="lecture"):
+def input_time_slots(slot_type="lecture", grid=None):
     """
     Interactively input time slots for lectures or tutorials.
     
     Args:
         slot_type (str): "lecture" or "tutorial"
+        grid (TimeGrid, optional): Grid of the slots; DEFAULT_GRID by default
     
     Returns:
         list: List of tuples (day_index, slot_index)
     """
+    if grid is None:
+        grid = DEFAULT_GRID
     time_slots_list = []
     
     print(f"\nPlease input {slot_type} time slots.")
     if slot_type == "tutorial":
         print("For tutorials, you can input multiple available time slots, and the plan needs to inlucde only one of them.")
-    print_time_slots_reference()
+    print_time_slots_reference(grid)
     
     while True:
         try:
-            day_input = input(f"Enter day number (1-5) for this {slot_type}, or 'e' to finish: \n> ").strip().lower()
+            day_input = input(f"Enter day number (1-{grid.num_days}) for this {slot_type}, or 'e' to finish: \n> ").strip().lower()
             
             if day_input.strip().lower() == 'e':
                 break
             
             day_num = int(day_input)
-            if day_num < 1 or day_num > 5:
-                print("[ERROR] Day number must be between 1 and 5.")
+            if day_num < 1 or day_num > grid.num_days:
+                print(f"[ERROR] Day number must be between 1 and {grid.num_days}.")
                 continue
             
-            slot_input = input(f"Enter time slot number (0-6) for this {slot_type}: \n> ").strip()
+            slot_input = input(f"Enter time slot number (0-{grid.num_slots - 1}) for this {slot_type}: \n> ").strip()
             slot_num = int(slot_input)
-            if slot_num < 0 or slot_num > 6:
-                print("[ERROR] Time slot number must be between 0 and 6.")
+            if slot_num < 0 or slot_num > grid.num_slots - 1:
+                print(f"[ERROR] Time slot number must be between 0 and {grid.num_slots - 1}.")
                 continue
             
             # Convert to 0-based indexing
@@ -820,17 +3832,7 @@ def input_time_slots(slot_type="lecture"):
                 print(f"[WARNING] This time slot is already added. Skipping duplicate.")
             else:
                 time_slots_list.append(time_slot)
-                time_slots = [
-                    ("Morning 1", "8:30-10:20"),
-                    ("Morning 2", "10:30-11:50"),
-                    ("Afternoon 1", "13:30-15:20"),
-                    ("Afternoon 2", "15:30-16:50"),
-                    ("Evening 1", "18:00-18:50"),
-                    ("Evening 2", "19:00-19:50"),
-                    ("Evening 3", "20:00-20:50"),
-                ]
-                days = ["DAY 1", "DAY 2", "DAY 3", "DAY 4", "DAY 5"]
-                print(f"  Added: {days[day_index]} {time_slots[slot_index][0]} ({time_slots[slot_index][1]})")
+                print(f"  Added: {grid.format_time(time_slot)}")
                 
         except ValueError:
             print("[ERROR] Please enter a valid number.")
@@ -839,8 +3841,81 @@ def input_time_slots(slot_type="lecture"):
     return time_slots_list
 
 
-if __name__ == "__main__":
+def input_course(course_code_ls, grid=None):
+    """
+    Interactively input one course with its lectures and tutorials.
+    
+    Args:
+        course_code_ls (list): Codes of the courses added so far; the new code is appended
+        grid (TimeGrid, optional): Grid of the course times; DEFAULT_GRID by default
+    
+    Returns:
+        tuple: (course, is_optional)
+    """
+    if grid is None:
+        grid = DEFAULT_GRID
+    while True:
+        course_code = input("Please input the course code: \n> ").strip()
+        if course_code == "":
+            print("[ERROR] Course code cannot be empty.")
+            continue
+        if course_code in course_code_ls:
+            print("[ERROR] Duplicated course code. Please enter a different code.")
+            continue
+        break
+
+    course_name = input("Please input the course name (DEFAULT_NAME by default): \n> ").strip()
+    if course_name == "":
+        course_name = "DEFAULT_NAME"
+
+    # Input lectures
+    lectures = input_time_slots("lecture", grid)
+
+    # Input tutorials
+    tutorials = input_time_slots("tutorial", grid)
+
+    # Create Course object
+    new_course = Course(course_code, course_name, lectures=lectures, tutorials=tutorials, grid=grid)
+    course_code_ls.append(course_code)
+
+    is_optional = input("Is this course optional, i.e. you want to include curriculum without this course? (y/n, n by default): \n> ")
+    is_optional = is_optional.strip().lower() == "y"
+
+    # Print course information
+    print(f"\n{'='*60}")
+    print(f"Course added successfully!")
+    print(f"Course Code: {new_course.course_code}")
+    print(f"Course Name: {new_course.course_name}")
+    print(f"Is Optional: {'Yes' if is_optional else 'No'}")
+    print(f"Lectures: {len(new_course.lectures)} session(s)")
+    for time in new_course.lectures:
+        print(f"  - {grid.format_time(time)}")
+    print(f"Tutorials: {len(new_course.tutorials)} option(s)")
+    for time in new_course.tutorials:
+        print(f"  - {grid.format_time(time)}")
+    print('='*60)
+    
+    return new_course, is_optional
+
+
+def _wait_for_planner(background):
+    """
+    Wait for the background count, saying so if it is still busy.
+    
+    Args:
+        background (BackgroundPlanner): The planner courses were added to
+    
+    Returns:
+        int: Number of valid schedules of the courses added
+    """
+    if not background.wait(timeout=0.1):
+        print("[INFO] Still counting the valid schedules...")
+        background.wait()
+    return background.num_schedules
 
+
+def run_interactive_planner():
+    """Enter courses at the prompt and browse the valid schedules."""
     print("=== Curriculum Planner ===")
     print("==== Author: Yimeng (Rosalind) ====")
     print("==== Github Profile: https://github.com/TeenSpirit1107 ====")
@@ -863,8 +3938,7 @@ if __name__ == "__main__":
     #                 tutorials = [(2,1)]
     #                 )
 
-    course_ls = []
-    optional_course_ls = []
+    background = BackgroundPlanner()
     course_code_ls = []
     
     while True:
@@ -879,100 +3953,615 @@ if __name__ == "__main__":
             print("\nNo courses added yet.")
         print('='*60)
         
-        while True:
-            course_code = input("Please input the course code: \n> ").strip()
-            if course_code == "":
-                print("[ERROR] Course code cannot be empty.")
-                continue
-            if course_code in course_code_ls:
-                print("[ERROR] Duplicated course code. Please enter a different code.")
-                continue
-            break
-
-        course_name = input("Please input the course name (DEFAULT_NAME by default): \n> ").strip()
-        if course_name == "":
-            course_name = "DEFAULT_NAME"
-
-        # Input lectures
-        lectures = input_time_slots("lecture")
-        
-        # Input tutorials
-        tutorials = input_time_slots("tutorial")
-        
-        # Create Course object
-        new_course = Course(course_code, course_name, lectures=lectures, tutorials=tutorials)
-        course_code_ls.append(course_code)
-
-        is_optional = input("Is this course optional, i.e. you want to include curriculum without this course? (y/n, n by default): \n> ")
-        if is_optional.strip().lower() == "y":
-            optional_course_ls.append(new_course)
-        else:
-            course_ls.append(new_course)
-
-        # Print course information
-        print(f"\n{'='*60}")
-        print(f"Course added successfully!")
-        print(f"Course Code: {new_course.course_code}")
-        print(f"Course Name: {new_course.course_name}")
-        print(f"Is Optional: {'Yes' if is_optional.strip().lower() == 'y' else 'No'}")
-        print(f"Lectures: {len(new_course.lectures)} session(s)")
-        if new_course.lectures:
-            time_slots = [
-                ("Morning 1", "8:30-10:20"),
-                ("Morning 2", "10:30-11:50"),
-                ("Afternoon 1", "13:30-15:20"),
-                ("Afternoon 2", "15:30-16:50"),
-                ("Evening 1", "18:00-18:50"),
-                ("Evening 2", "19:00-19:50"),
-                ("Evening 3", "20:00-20:50"),
-            ]
-            days = ["DAY 1", "DAY 2", "DAY 3", "DAY 4", "DAY 5"]
-            for day_idx, slot_idx in new_course.lectures:
-                print(f"  - {days[day_idx]} {time_slots[slot_idx][0]} ({time_slots[slot_idx][1]})")
-        print(f"Tutorials: {len(new_course.tutorials)} option(s)")
-        if new_course.tutorials:
-            time_slots = [
-                ("Morning 1", "8:30-10:20"),
-                ("Morning 2", "10:30-11:50"),
-                ("Afternoon 1", "13:30-15:20"),
-                ("Afternoon 2", "15:30-16:50"),
-                ("Evening 1", "18:00-18:50"),
-                ("Evening 2", "19:00-19:50"),
-                ("Evening 3", "20:00-20:50"),
-            ]
-            days = ["DAY 1", "DAY 2", "DAY 3", "DAY 4", "DAY 5"]
-            for day_idx, slot_idx in new_course.tutorials:
-                print(f"  - {days[day_idx]} {time_slots[slot_idx][0]} ({time_slots[slot_idx][1]})")
-        print('='*60)
+        new_course, is_optional = input_course(course_code_ls)
+        # Extend the valid schedules with the new course while the next one is entered
+        background.add_course(new_course, optional=is_optional)
         
         cont = input("\nPress ENTER to add another course; press 'e' to finish: \n> ")
         if cont.strip().lower() == "e":
             break
     
     print(f"\n{'='*60}")
-    print(f"Required courses: {len(course_ls)}")
-    print(f"Optional courses: {len(optional_course_ls)}")
+    print(f"Required courses: {len(background.required_courses)}")
+    print(f"Optional courses: {len(background.optional_courses)}")
     print('='*60)
     
-    if course_ls:
-        # List all valid schedules
-        valid_schedules = list_all_valid_schedules(course_ls, optional_course_ls)
+    if background.required_courses:
+        _wait_for_planner(background)
+        # List valid schedules page by page, building only the schedules shown
+        page_start = 0
+        num_printed, has_more = print_schedule_page(
+            background.required_courses, background.optional_courses, page_start
+        )
         
-        if valid_schedules:
+        if num_printed:
             # Interactive mode: let user select schedule by index
             while True:
-                user_input = input("Enter schedule index to view calendar (or 'q' to exit): \n> ").strip().lower()
+                user_input = input("Enter schedule index to view calendar, 'n' for the next page, 'a' to add a course (or 'q' to exit): \n> ").strip().lower()
                 if user_input == 'q':
                     print("Exiting.")
                     break
+                if user_input == 'n':
+                    if not has_more:
+                        print("[INFO] No more schedules.")
+                        continue
+                    page_start += SCHEDULE_PAGE_SIZE
+                    num_printed, has_more = print_schedule_page(
+                        background.required_courses, background.optional_courses, page_start
+                    )
+                    continue
+                if user_input == 'a':
+                    new_course, is_optional = input_course(course_code_ls)
+                    background.add_course(new_course, optional=is_optional)
+                    _wait_for_planner(background)
+                    page_start = 0
+                    num_printed, has_more = print_schedule_page(
+                        background.required_courses, background.optional_courses, page_start
+                    )
+                    continue
                 try:
                     schedule_index = int(user_input)
-                    print_schedule_by_index(schedule_index, valid_schedules, course_ls, optional_course_ls)
+                    print_schedule_by_index(
+                        schedule_index, None, background.required_courses, background.optional_courses
+                    )
                     continue
                 except ValueError:
-                    print("[ERROR] Please enter a valid number or 'q' to exit.")
+                    print("[ERROR] Please enter a valid number, 'n', 'a' or 'q' to exit.")
                     continue
+        else:
+            print("No valid schedules found! Required courses have conflicts.")
 
     else:
-        print("No required courses added. Exiting.")    
-    
\ No newline at end of file
+        print("No required courses added. Exiting.")
+    background.close()
+
+
+def load_catalog(path, grid=None):
+    """
+    Load a course catalog from a CSV or JSON file in a single pass.
+    
+    Days are numbered 1-5 and time slots 0-6, as in the interactive planner
+    (slot numbers refer to the slots of grid when one is given).
+    A time may also be given as a minute interval instead of a slot number:
+    "9:00-10:30" in the slot column of a CSV file, or [day, "9:00", "10:30"]
+    in a JSON file. An interval takes every slot of the grid it overlaps, so
+    intervals conflict whenever they share a slot; a finer grid such as
+    TimeGrid.uniform(step=15) tells close intervals apart.
+    
+    CSV files have one row per session, with the header
+    code,name,type,day,slot[,optional] where type is "lecture" or "tutorial"
+    and optional is "y"/"yes"/"true"/"1" for optional courses:
+    
+        code,name,type,day,slot,optional
+        MAT1001,Calculus,lecture,1,0,
+        MAT1001,Calculus,tutorial,2,1,
+        GED2003,Gender Matters,lecture,1,1,y
+    
+    JSON files hold a list of courses (or {"courses": [...]}):
+    
+        [{"code": "MAT1001", "name": "Calculus", "lectures": [[1, 0]],
+          "tutorials": [[2, 1], [3, 1]], "optional": false}]
+    
+    Args:
+        path (str): Path of a .csv or .json file
+        grid (TimeGrid, optional): Grid of the times; DEFAULT_GRID by default
+    
+    Returns:
+        tuple: (courses, optional_codes) with courses in the order they first appear
+    
+    Raises:
+        ValueError: If the file is malformed
+    """
+    if grid is None:
+        grid = DEFAULT_GRID
+    
+    def to_time(where, *values):
+        if len(values) not in (2, 3):
+            raise ValueError(f"{where}: a time must be [day, slot] or [day, start, end]")
+        day, slot = values[:2]
+        try:
+            day_idx = int(day) - 1
+            if len(values) == 3:
+                time = (day_idx, parse_minutes(str(slot)), parse_minutes(str(values[2])))
+            elif isinstance(slot, str) and "-" in slot:
+                start_text, _, end_text = slot.partition("-")
+                time = (day_idx, parse_minutes(start_text), parse_minutes(end_text))
+            else:
+                time = (day_idx, int(slot))
+        except (TypeError, ValueError):
+            raise ValueError(f"{where}: day must be a number and slot a number or a H:MM-H:MM interval") from None
+        if not 0 <= day_idx < grid.num_days:
+            raise ValueError(f"{where}: day must be 1-{grid.num_days}")
+        try:
+            grid.validate_time(time)
+        except ValueError as e:
+            raise ValueError(f"{where}: {e}") from None
+        return time
+    
+    def to_times(where, item, key):
+        times = item.get(key, [])
+        if not isinstance(times, list) or not all(isinstance(time, list) for time in times):
+            raise ValueError(f"{where}: {key} must be a list of [day, slot] or [day, start, end] times")
+        return [to_time(where, *time) for time in times]
+    
+    entries = {}  # code -> [name, lectures, tutorials]
+    optional_codes = set()
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict) and "courses" in data:
+            data = data["courses"]
+        if not isinstance(data, list):
+            raise ValueError(f'{path}: expected a list of courses or {{"courses": [...]}}')
+        for idx, item in enumerate(data):
+            where = f"{path}: course #{idx + 1}"
+            if not isinstance(item, dict):
+                raise ValueError(f"{where}: expected a JSON object")
+            if "code" not in item:
+                raise ValueError(f"{where}: missing code")
+            code = str(item["code"])
+            if code in entries:
+                raise ValueError(f"{where}: duplicated course code {code}")
+            entries[code] = [
+                item.get("name", "DEFAULT_NAME"),
+                to_times(where, item, "lectures"),
+                to_times(where, item, "tutorials"),
+            ]
+            if item.get("optional", False):
+                optional_codes.add(code)
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            for line_num, row in enumerate(csv.DictReader(f), 2):
+                where = f"{path}:{line_num}"
+                code = (row.get("code") or "").strip()
+                if not code:
+                    raise ValueError(f"{where}: missing code")
+                entry = entries.setdefault(code, [(row.get("name") or "").strip() or "DEFAULT_NAME", [], []])
+                session_type = (row.get("type") or "").strip().lower()
+                if session_type not in ("lecture", "tutorial"):
+                    raise ValueError(f"{where}: type must be lecture or tutorial")
+                time_slot = to_time(where, row.get("day"), (row.get("slot") or "").strip())
+                slots = entry[1] if session_type == "lecture" else entry[2]
+                if time_slot not in slots:
+                    slots.append(time_slot)
+                if (row.get("optional") or "").strip().lower() in ("y", "yes", "true", "1"):
+                    optional_codes.add(code)
+    
+    courses = [
+        Course(code, name, lectures=lectures, tutorials=tutorials, grid=grid)
+        for code, (name, lectures, tutorials) in entries.items()
+    ]
+    return courses, optional_codes
+
+
+def schedule_to_record(schedule, index=None):
+    """
+    Convert a schedule to a JSON-serialisable record.
+    
+    Days are numbered 1-5 and time slots 0-6, as in catalog files; a minute
+    interval is written as [day, "H:MM", "H:MM"].
+    
+    Args:
+        schedule (tuple): (course_list, tutorial_selection)
+        index (int, optional): 1-based index of the schedule to include
+    
+    Returns:
+        dict: {"index": ..., "courses": [codes], "tutorials": {code: [day, slot]}}
+    """
+    course_list, tutorial_selection = schedule
+    record = {} if index is None else {"index": index}
+    record["courses"] = [course.course_code for course in course_list]
+    record["tutorials"] = {}
+    for course, time in tutorial_selection.items():
+        if len(time) == 3:
+            day_idx, start, end = time
+            record["tutorials"][course.course_code] = [day_idx + 1, format_minutes(start), format_minutes(end)]
+        else:
+            day_idx, slot_idx = time
+            record["tutorials"][course.course_code] = [day_idx + 1, slot_idx]
+    return record
+
+
+def write_schedules_jsonl(schedules, out, limit=None, fields=None):
+    """
+    Write schedules as JSON Lines, one record per schedule.
+    
+    Args:
+        schedules (iterable): (course_list, tutorial_selection) schedules
+        out (file): Text stream to write to
+        limit (int, optional): Maximum number of schedules to write
+        fields (dict, optional): Fields to put first in every record, e.g. {"student": "s001"}
+    
+    Returns:
+        int: Number of schedules written
+    """
+    num_written = 0
+    for index, schedule in enumerate(islice(schedules, limit), 1):
+        record = schedule_to_record(schedule, index)
+        out.write(json.dumps({**fields, **record} if fields else record))
+        out.write("\n")
+        num_written += 1
+    return num_written
+
+
+# Output formats of write_schedules, by file extension
+EXPORT_FORMATS = {".txt": "text", ".html": "html", ".htm": "html", ".csv": "csv", ".jsonl": "jsonl"}
+
+
+def write_schedules(schedules, out, fmt="text", limit=None):
+    """
+    Write schedules to a text stream in bulk.
+    
+    Formats:
+    - "text": the pages of print_all_valid_schedules (title, courses, calendar)
+    - "html": one HTML document with a heading and a calendar table per schedule
+    - "csv": one row per session, with the columns
+      schedule,course_code,course_name,session,day,slot,start,end
+      (day is 1-based, slot is empty for times given as minute intervals)
+    - "jsonl": as write_schedules_jsonl
+    
+    Each schedule is rendered into one string from prebuilt calendar
+    templates and written with a single call, so the output runs at the
+    speed of the stream's buffer rather than one write per line.
+    
+    Args:
+        schedules (iterable): Schedules, or (course_list, tutorial_selection) tuples
+        out (file): Text stream to write to (open CSV files with newline="")
+        fmt (str): "text", "html", "csv" or "jsonl"
+        limit (int, optional): Maximum number of schedules to write
+    
+    Returns:
+        int: Number of schedules written
+    
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if fmt == "jsonl":
+        return write_schedules_jsonl(schedules, out, limit=limit)
+    if fmt not in ("text", "html", "csv"):
+        raise ValueError(f"unknown export format: {fmt!r}")
+    
+    renderer = None
+    num_written = 0
+    if fmt == "html":
+        out.write(
+            "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>Schedules</title>\n"
+            "<style>table{border-collapse:collapse;margin-bottom:2em}"
+            "th,td{border:1px solid #999;padding:2px 8px}</style>\n</head>\n<body>\n"
+        )
+    elif fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(["schedule", "course_code", "course_name", "session", "day", "slot", "start", "end"])
+        time_fields = {}  # (id of grid, time) -> its day, slot, start and end columns
+    
+    for index, schedule in enumerate(islice(schedules, limit), 1):
+        grid = _schedule_grid(schedule)
+        if renderer is None or renderer.grid is not grid:
+            renderer = CalendarRenderer.for_grid(grid)
+        if fmt == "text":
+            page = renderer.render_page(schedule, index)
+            out.write(page if index == 1 else "\n\n" + page)
+        elif fmt == "html":
+            course_list = schedule.course_list if isinstance(schedule, Schedule) else schedule[0]
+            course_codes = ", ".join([course.course_code for course in course_list])
+            out.write(
+                f"<h2>Schedule #{index} - {len(course_list)} course(s): [{html.escape(course_codes)}]</h2>\n"
+                + renderer.render_schedule_html(schedule)
+            )
+        else:
+            if isinstance(schedule, Schedule):
+                sessions = schedule.sessions()
+            else:
+                course_list, tutorial_selection = schedule
+                sessions = (
+                    (course, time, session)
+                    for course in course_list
+                    for time, session in chain(
+                        ((time, "Lecture") for time in course.lectures),
+                        [(tutorial_selection[course], "Tutorial")] if course in tutorial_selection else [],
+                    )
+                )
+            rows = []
+            for course, time, session in sessions:
+                key = (id(grid), tuple(time))
+                fields = time_fields.get(key)
+                if fields is None:
+                    if len(time) == 3:
+                        day_idx, start, end = time
+                        slot = ""
+                    else:
+                        day_idx, slot = time
+                        _, start, end = grid.slots[slot]
+                    fields = time_fields[key] = (day_idx + 1, slot, format_minutes(start), format_minutes(end))
+                rows.append((index, course.course_code, course.course_name, session) + fields)
+            writer.writerows(rows)
+        num_written += 1
+    
+    if fmt == "html":
+        out.write("</body>\n</html>\n")
+    return num_written
+
+
+def export_schedules(schedules, path, fmt=None, limit=None):
+    """
+    Export schedules to a text, HTML, CSV or JSON Lines file.
+    
+    Args:
+        schedules (iterable): Schedules, or (course_list, tutorial_selection) tuples
+        path (str): Output file path
+        fmt (str, optional): "text", "html", "csv" or "jsonl"; by default taken
+                             from the file extension (see EXPORT_FORMATS), else "text"
+        limit (int, optional): Maximum number of schedules to write
+    
+    Returns:
+        int: Number of schedules written
+    
+    Example:
+        export_schedules(find_all_valid_schedules_with_optional(required, optional), "schedules.html")
+    """
+    if fmt is None:
+        extension = path[path.rfind("."):].lower() if "." in path else ""
+        fmt = EXPORT_FORMATS.get(extension, "text")
+    # A large buffer keeps the number of write system calls low
+    with open(path, "w", encoding="utf-8", newline="" if fmt == "csv" else None, buffering=1 << 20) as out:
+        return write_schedules(schedules, out, fmt=fmt, limit=limit)
+
+
+def _split_codes(codes):
+    """Split a comma-separated list of course codes."""
+    return [code.strip() for code in codes.split(",") if code.strip()]
+
+
+def select_courses(courses, optional_codes, required=None, optional=None):
+    """
+    Pick the required and optional courses of a plan from a catalog.
+    
+    Args:
+        courses (list): Catalog Course objects
+        optional_codes (set): Codes of the courses the catalog marks as optional
+        required (list, optional): Codes of the required courses; by default every
+                                   course not marked optional (when optional is not given either)
+        optional (list, optional): Codes of the optional courses; by default every
+                                   course marked optional (when required is not given either)
+    
+    Returns:
+        tuple: (required_courses, optional_courses)
+    
+    Raises:
+        ValueError: If a code is not in the catalog
+    """
+    by_code = {course.course_code: course for course in courses}
+    if required is None and optional is None:
+        return (
+            [course for course in courses if course.course_code not in optional_codes],
+            [course for course in courses if course.course_code in optional_codes],
+        )
+    
+    selected = []
+    for codes in (required or [], optional or []):
+        missing = [code for code in codes if code not in by_code]
+        if missing:
+            raise ValueError(f"unknown course code(s): {', '.join(missing)}")
+        selected.append([by_code[code] for code in codes])
+    return selected[0], selected[1]
+
+
+def load_students(path):
+    """
+    Load the plan requests of a cohort from a JSON Lines file.
+    
+    Each line holds one student, with the codes of their required and
+    optional courses:
+    
+        {"id": "s001", "required": ["MAT1001", "PHY1001"], "optional": ["GED2003"]}
+    
+    Args:
+        path (str): Path of a .jsonl file
+    
+    Returns:
+        list: (student_id, required_codes, optional_codes) per student, in file order
+    
+    Raises:
+        ValueError: If a line is malformed
+    """
+    students = []
+    with open(path, encoding="utf-8") as f:
+        for line_num, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            where = f"{path}:{line_num}"
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{where}: {e.msg}") from None
+            if not isinstance(item, dict):
+                raise ValueError(f"{where}: expected a JSON object")
+            for key in ("required", "optional"):
+                if not isinstance(item.get(key, []), list):
+                    raise ValueError(f"{where}: {key} must be a list of course codes")
+            students.append((
+                item.get("id", len(students) + 1),
+                [str(code) for code in item.get("required", [])],
+                [str(code) for code in item.get("optional", [])],
+            ))
+    return students
+
+
+def _catalog_grid(args):
+    """Get the grid of the catalog times: a uniform grid with --grid-step, DEFAULT_GRID otherwise."""
+    if args.grid_step is None:
+        return DEFAULT_GRID
+    return TimeGrid.uniform(step=args.grid_step)
+
+
+def run_cohort(args):
+    """
+    Solve the plans of a cohort against one compiled catalog and write them as JSON Lines.
+    
+    Each record carries the "student" id of its plan. Options that only apply
+    to a single plan are rejected rather than ignored.
+    
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments
+    
+    Returns:
+        int: Process exit status
+    """
+    unsupported = [
+        option for option, given in (
+            ("--format", args.format != "jsonl"),
+            ("--required", args.required is not None),
+            ("--optional", args.optional is not None),
+            ("--cache", args.cache is not None),
+            ("--stats", args.stats),
+            ("--time-budget", args.time_budget is not None),
+        )
+        if given
+    ]
+    if unsupported:
+        print(f"[ERROR] {', '.join(unsupported)} cannot be used with --students", file=sys.stderr)
+        return 1
+    
+    try:
+        courses, _ = load_catalog(args.catalog, _catalog_grid(args))
+        students = load_students(args.students)
+        catalog = CompiledCatalog(courses)
+        requests = [(required_codes, optional_codes) for _, required_codes, optional_codes in students]
+        if args.count:
+            results = [catalog.space(*request).counter.count() for request in requests]
+        else:
+            results = catalog.plan_many(requests, workers=args.workers)
+        out = sys.stdout if args.output in (None, "-") else open(args.output, "w", encoding="utf-8")
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    
+    try:
+        for (student_id, _, _), result in zip(students, results):
+            if args.count:
+                out.write(json.dumps({"student": student_id, "count": result}))
+                out.write("\n")
+            else:
+                write_schedules_jsonl(result, out, limit=args.limit, fields={"student": student_id})
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def run_batch(args):
+    """
+    Solve a plan from a catalog file and write its schedules as JSON Lines.
+    
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments
+    
+    Returns:
+        int: Process exit status
+    """
+    if args.count:
+        # Counting neither searches nor writes schedules
+        unsupported = [
+            option for option, given in (
+                ("--limit", args.limit is not None),
+                ("--workers", args.workers is not None),
+                ("--cache", args.cache is not None),
+                ("--stats", args.stats),
+                ("--time-budget", args.time_budget is not None),
+            )
+            if given
+        ]
+        if unsupported:
+            print(f"[ERROR] {', '.join(unsupported)} cannot be used with --count", file=sys.stderr)
+            return 1
+    
+    try:
+        courses, optional_codes = load_catalog(args.catalog, _catalog_grid(args))
+        required_courses, optional_courses = select_courses(
+            courses, optional_codes,
+            required=_split_codes(args.required) if args.required is not None else None,
+            optional=_split_codes(args.optional) if args.optional is not None else None,
+        )
+        cache = ScheduleCache(args.cache) if args.cache else None
+        if args.output in (None, "-"):
+            out = sys.stdout
+        else:
+            out = open(args.output, "w", encoding="utf-8", newline="" if args.format == "csv" else None,
+                       buffering=1 << 20)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    
+    stats = SearchStats() if args.stats else None
+    budget = SearchBudget(args.time_budget) if args.time_budget is not None else None
+    try:
+        if args.count:
+            out.write(json.dumps({"count": count_valid_schedules(required_courses, optional_courses)}))
+            out.write("\n")
+        elif cache is not None:
+            with cache:
+                schedules = find_all_valid_schedules_with_optional(
+                    required_courses, optional_courses, workers=args.workers, cache=cache, stats=stats,
+                    time_budget=args.time_budget,
+                )
+            if budget is not None:
+                budget.stop_reason = schedules.stop_reason
+            write_schedules(schedules, out, fmt=args.format, limit=args.limit)
+        else:
+            schedules = iter_valid_schedules(
+                required_courses, optional_courses, workers=args.workers, stats=stats, budget=budget
+            )
+            write_schedules(schedules, out, fmt=args.format, limit=args.limit)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if stats is not None:
+        print(stats.to_json(), file=sys.stderr)
+    if budget is not None and budget.stop_reason is not None:
+        print(f"[WARNING] The search stopped early ({budget.stop_reason}); the schedules are incomplete.",
+              file=sys.stderr)
+    return 0
+
+
+def parse_args(argv=None):
+    """Parse the command-line arguments of the planner."""
+    parser = argparse.ArgumentParser(
+        description="Curriculum planner. Without --catalog, courses are entered interactively."
+    )
+    parser.add_argument("--catalog", help="course catalog file (.csv or .json) to plan without prompts")
+    parser.add_argument("--output", "-o", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=["jsonl", "text", "html", "csv"], default="jsonl",
+                        help="output format of the schedules of a single plan (default: jsonl)")
+    parser.add_argument("--required", help="comma-separated codes of the required courses")
+    parser.add_argument("--optional", help="comma-separated codes of the optional courses")
+    parser.add_argument("--limit", type=int, help="write at most this many schedules")
+    parser.add_argument("--count", action="store_true", help="only write the number of valid schedules")
+    parser.add_argument("--workers", type=int, help="number of worker processes to search with")
+    parser.add_argument("--cache", help="sqlite file to keep solved plans in across runs")
+    parser.add_argument("--students", help="JSON Lines file of student plans to solve against the catalog")
+    parser.add_argument("--time-budget", type=float,
+                        help="stop the search of a single plan after this many seconds, keeping the schedules found")
+    parser.add_argument("--stats", action="store_true",
+                        help="print search statistics of a single plan as JSON to stderr")
+    parser.add_argument("--grid-step", type=int, metavar="MINUTES",
+                        help="plan the catalog on slots of this many minutes from 8:00 to 21:00, numbered from 0, "
+                             "instead of the 7 default slots")
+    args = parser.parse_args(argv)
+    if args.grid_step is not None and args.grid_step <= 0:
+        parser.error("--grid-step must be a positive number of minutes")
+    if args.limit is not None and args.limit < 0:
+        parser.error("--limit must not be negative")
+    if args.workers is not None and args.workers <= 0:
+        parser.error("--workers must be a positive number")
+    if args.time_budget is not None and args.time_budget < 0:
+        parser.error("--time-budget must not be negative")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.catalog and args.students:
+        sys.exit(run_cohort(args))
+    if args.catalog:
+        sys.exit(run_batch(args))
+    run_interactive_planner()
@@ -1,25 +1,174 @@
-from scipy.stats import norm
-import matplotlib.pyplot as plt
-import numpy as np
+"""
+Grade Percentile Calculator
+Rank scores in a truncated normal distribution
 
-def truncated_normal_percentile(mean, std, x, low=0, high=100):
+numpy, scipy and matplotlib are imported only by the functions that need them,
+so importing this module (e.g. to call truncated_normal_percentile) is fast.
+"""
+
+import csv
+import math
+import numbers
+from itertools import islice
+
+def normal_cdf(x, mean=0, std=1):
+    """
+    CDF of a normal distribution.
+
+    Numbers are computed with math.erfc so that scipy is not needed; arrays
+    are computed elementwise with scipy.special.ndtr, imported only for them.
+    """
+    if all(isinstance(value, numbers.Real) for value in (x, mean, std)):
+        return 0.5 * math.erfc((mean - x) / (std * math.sqrt(2)))
+    import numpy as np
+    from scipy.special import ndtr
+
+    return ndtr((np.asarray(x, dtype=float) - mean) / std)
+
+def truncated_normal_percentile(mean, std, x, low=0, high=100, cdf=normal_cdf):
     """
     Compute the percentile of a truncated normal distribution.
+
+    cdf(x, mean, std) is the normal CDF to use; the default needs no scipy
+    for a single score, and scipy.stats.norm.cdf can be passed instead.
     """
     # CDF of the original CDF
-    cdf_x = norm.cdf(x, mean, std)
-    cdf_low = norm.cdf(low, mean, std)
-    cdf_high = norm.cdf(high, mean, std)
+    cdf_x = cdf(x, mean, std)
+    cdf_low = cdf(low, mean, std)
+    cdf_high = cdf(high, mean, std)
 
     # truncated percentile
     percentile = (cdf_x - cdf_low) / (cdf_high - cdf_low) * 100
     return percentile
 
+def truncated_normal_percentiles(scores, mean, std, low=0, high=100):
+    """
+    Compute the percentiles of many scores of a truncated normal distribution at once.
+
+    mean, std, low and high are broadcast against scores, so each can be one
+    value for the whole roster or one value per score. The normal CDF is taken
+    with scipy.special.ndtr in a single vectorised pass; a bound that is a
+    single value is evaluated only once. Scores outside [low, high] are
+    clipped to it, so they rank 0 or 100.
+
+    Args:
+        scores (array_like): Scores to rank
+        mean (float or array_like): Mean of the distribution
+        std (float or array_like): Standard deviation of the distribution
+        low (float or array_like): Lower bound of the distribution
+        high (float or array_like): Upper bound of the distribution
+
+    Returns:
+        numpy.ndarray: Percentile of each score, 0-100
+    """
+    import numpy as np
+    from scipy.special import ndtr
+
+    mean = np.asarray(mean, dtype=float)
+    std = np.asarray(std, dtype=float)
+    low = np.asarray(low, dtype=float)
+    high = np.asarray(high, dtype=float)
+    z_x = (np.clip(np.asarray(scores, dtype=float), low, high) - mean) / std
+    z_low = (low - mean) / std
+    z_high = (high - mean) / std
+
+    # Above the mean, subtract upper tails instead of CDF values close to 1,
+    # which would cancel out far in the tail
+    sign = np.where(z_low > 0, -1.0, 1.0)
+    cdf_low = ndtr(sign * z_low)
+    return (ndtr(sign * z_x) - cdf_low) / (ndtr(sign * z_high) - cdf_low) * 100
+
+def _csv_parameter(value, header, chunk, name):
+    """
+    Get a parameter of percentiles_from_csv for a chunk of rows.
+
+    Args:
+        value (float or str): The value for every row, or the name of the column holding it
+        header (list): Column names of the CSV file
+        chunk (list): Rows of the chunk
+        name (str): Name of the parameter, for error messages
+
+    Returns:
+        float or numpy.ndarray: The value, or its column in the chunk
+
+    Raises:
+        ValueError: If the column does not exist
+    """
+    import numpy as np
+
+    if not isinstance(value, str):
+        return value
+    if value not in header:
+        raise ValueError(f"{name} column {value!r} not found in the CSV header")
+    column_idx = header.index(value)
+    return np.array([row[column_idx] for row in chunk], dtype=float)
+
+def percentiles_from_csv(in_path, out_path, mean, std=15, low=0, high=100, score_column="score",
+                         percentile_column="percentile", chunk_size=100000):
+    """
+    Add a percentile column to a CSV gradebook, streaming it in chunks.
+
+    Only chunk_size rows are held in memory at a time, so files of any size
+    can be processed. Each of mean, std, low and high is either one number for
+    every row or the name of a column holding one value per row.
+
+    Args:
+        in_path (str): CSV file with a header row
+        out_path (str): CSV file to write, with the input columns plus percentile_column
+        mean (float or str): Mean of the distribution, or its column
+        std (float or str): Standard deviation of the distribution, or its column
+        low (float or str): Lower bound of the distribution, or its column
+        high (float or str): Upper bound of the distribution, or its column
+        score_column (str): Column holding the scores
+        percentile_column (str): Name of the column to add
+        chunk_size (int): Number of rows computed in one vectorised pass
+
+    Returns:
+        int: Number of rows processed
+
+    Raises:
+        ValueError: If a column is missing or a value is not a number
+    """
+    import numpy as np
+
+    num_rows = 0
+    with open(in_path, newline="", encoding="utf-8") as in_file, \
+            open(out_path, "w", newline="", encoding="utf-8") as out_file:
+        reader = csv.reader(in_file)
+        writer = csv.writer(out_file)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"{in_path} is empty")
+        if score_column not in header:
+            raise ValueError(f"score column {score_column!r} not found in the CSV header")
+        score_idx = header.index(score_column)
+        writer.writerow(header + [percentile_column])
+
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                break
+            scores = np.array([row[score_idx] for row in chunk], dtype=float)
+            percentiles = truncated_normal_percentiles(
+                scores,
+                _csv_parameter(mean, header, chunk, "mean"),
+                _csv_parameter(std, header, chunk, "std"),
+                _csv_parameter(low, header, chunk, "low"),
+                _csv_parameter(high, header, chunk, "high"),
+            )
+            writer.writerows(row + [f"{percentile:.4f}"] for row, percentile in zip(chunk, percentiles.tolist()))
+            num_rows += len(chunk)
+    return num_rows
+
 def plot_truncated_normal(mean, std, x, low=0, high=100):
     """
     Plot the truncated normal distribution as a histogram with 5-point bins
     and mark the user's score position.
     """
+    import matplotlib.pyplot as plt
+    import numpy as np
+    from scipy.stats import norm
+
     # Generate bins with 5-point intervals
     bins = np.arange(low, high + 5, 5)
     
@@ -70,61 +219,66 @@ def plot_truncated_normal(mean, std, x, low=0, high=100):
     plt.tight_layout()
     plt.show()
 
-print("=== Grade Percentile Calculator ===")
-print("==== Author: Yimeng (Rosalind) ====")
-print("==== Github Profile: https://github.com/TeenSpirit1107 ====")
-print("==== Email: yimengteng@link.cuhk.edu.cn ====")
-
-# check whether it's floating point, if not, ask the user to input again.
-while True:
-    mean = input("Please enter the mean:\n> ")
-    if mean.replace('.', '', 1).isdigit():
-        mean = float(mean)
-        break
-    print("Invalid input. Please enter a valid number.")
-
-while True:
-    std = input("Please enter the STANDARD DEVIATION (default 15):\n> ")
-    if std.strip() == "":
-        std = 15
-        break
-    if std.replace('.', '', 1).isdigit():
-        std = float(std)
-        break
-    print("Invalid input. Please enter a valid number.")
-
-while True:
-    x = input("Please enter your score:\n> ")
-    if x.replace('.', '', 1).isdigit():
-        x = float(x)
-        break
-    print("Invalid input. Please enter a valid number.")
-
-while True:
-    low = input("Please enter the lower bound: (default 0)\n> ")
-    if low.strip() == "":
-        low = 0
-        break
-    if low.replace('.', '', 1).isdigit():
-        low = float(low)
-        break
-    print("Invalid input. Please enter a valid number.")
-
-while True:
-    high = input("Please enter the upper bound: (default 100)\n> ")
-    if high.strip() == "":
-        high = 100
-        break
-    if high.replace('.', '', 1).isdigit() and float(high) >=x and x >= float(low):
-        high = float(high)
-        break
-    print("Invalid input. Please enter a valid number.")
-
-p = truncated_normal_percentile(mean, std, x, low, high)
-plot_truncated_normal(mean, std, x, low, high)
-q = 100-p
-
-print(f"Truncated NORMAL distribution within [{low}, {high}]")
-print(f"with standard deviation {std} and mean {mean}")
-print(f"the score {x} is higher than {p:.2f}% of the students.")
-print(f"i.e. you are among the top {q:.2f}%.")
\ No newline at end of file
+def run_interactive_calculator():
+    """Ask for the distribution and a score at the prompt, then plot and print its percentile."""
+    print("=== Grade Percentile Calculator ===")
+    print("==== Author: Yimeng (Rosalind) ====")
+    print("==== Github Profile: https://github.com/TeenSpirit1107 ====")
+    print("==== Email: yimengteng@link.cuhk.edu.cn ====")
+
+    # check whether it's floating point, if not, ask the user to input again.
+    while True:
+        mean = input("Please enter the mean:\n> ")
+        if mean.replace('.', '', 1).isdigit():
+            mean = float(mean)
+            break
+        print("Invalid input. Please enter a valid number.")
+
+    while True:
+        std = input("Please enter the STANDARD DEVIATION (default 15):\n> ")
+        if std.strip() == "":
+            std = 15
+            break
+        if std.replace('.', '', 1).isdigit():
+            std = float(std)
+            break
+        print("Invalid input. Please enter a valid number.")
+
+    while True:
+        x = input("Please enter your score:\n> ")
+        if x.replace('.', '', 1).isdigit():
+            x = float(x)
+            break
+        print("Invalid input. Please enter a valid number.")
+
+    while True:
+        low = input("Please enter the lower bound: (default 0)\n> ")
+        if low.strip() == "":
+            low = 0
+            break
+        if low.replace('.', '', 1).isdigit():
+            low = float(low)
+            break
+        print("Invalid input. Please enter a valid number.")
+
+    while True:
+        high = input("Please enter the upper bound: (default 100)\n> ")
+        if high.strip() == "":
+            high = 100
+            break
+        if high.replace('.', '', 1).isdigit() and float(high) >=x and x >= float(low):
+            high = float(high)
+            break
+        print("Invalid input. Please enter a valid number.")
+
+    p = truncated_normal_percentile(mean, std, x, low, high)
+    plot_truncated_normal(mean, std, x, low, high)
+    q = 100-p
+
+    print(f"Truncated NORMAL distribution within [{low}, {high}]")
+    print(f"with standard deviation {std} and mean {mean}")
+    print(f"the score {x} is higher than {p:.2f}% of the students.")
+    print(f"i.e. you are among the top {q:.2f}%.")
+
+if __name__ == "__main__":
+    run_interactive_calculator()
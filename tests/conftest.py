@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# The tools in calc/ are run as scripts and import each other by module name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "calc"))
+
+
+@pytest.fixture(autouse=True)
+def _cold_caches():
+    # The planner keeps solved subproblems in module-level caches; start every test without them
+    import curriculum_planning
+
+    curriculum_planning.clear_caches()
+    yield
@@ -0,0 +1,62 @@
+import curriculum_benchmark as cb
+import curriculum_planning as cp
+
+
+def result(function, num_courses, schedules, wall_time, peak_bytes):
+    return {
+        "function": function, "num_courses": num_courses, "schedules": schedules,
+        "wall_time": wall_time, "peak_bytes": peak_bytes,
+    }
+
+
+def test_find_regressions_of_a_synthetic_report():
+    baseline = {"results": [
+        result("find_all_valid_schedules", 10, 40, 1.0, 1000),
+        result("find_all_valid_schedules", 20, 80, 2.0, 2000),
+        result("find_all_valid_schedules_with_optional", 10, 30, 0.5, 0),
+    ]}
+    report = {"results": [
+        # Within the tolerance
+        result("find_all_valid_schedules", 10, 40, 1.15, 1100),
+        # Slower and larger by more than the tolerance, and a different answer
+        result("find_all_valid_schedules", 20, 81, 2.5, 3000),
+        # No baseline memory to compare with
+        result("find_all_valid_schedules_with_optional", 10, 30, 0.5, 10 ** 6),
+        # Not in the baseline
+        result("find_all_valid_schedules", 40, 1, 100.0, 10 ** 9),
+    ]}
+
+    assert cb.find_regressions(baseline, report) == [
+        "find_all_valid_schedules(20 courses): 80 -> 81 schedules",
+        "find_all_valid_schedules(20 courses): wall_time 2s -> 2.5s",
+        "find_all_valid_schedules(20 courses): peak_bytes 2000 bytes -> 3000 bytes",
+    ]
+    assert cb.find_regressions(baseline, report, tolerance=0.1)[0] == \
+        "find_all_valid_schedules(10 courses): wall_time 1s -> 1.15s"
+    assert cb.find_regressions(report, report) == []
+    assert cb.find_regressions({}, report) == []
+
+
+def test_generate_catalog_is_deterministic():
+    first = cb.generate_catalog(8, seed=3)
+    second = cb.generate_catalog(8, seed=3)
+
+    def describe(catalog):
+        return [[(course.course_code, course.lectures, course.tutorials) for course in courses] for courses in catalog]
+
+    assert describe(first) == describe(second)
+    assert len(first[0]) + len(first[1]) == 8
+
+
+def test_clear_caches_starts_cold():
+    required, optional = cb.generate_catalog(6, seed=1)
+    schedules = cp.find_all_valid_schedules_with_optional(required, optional)
+    cp.count_valid_schedules(required, optional)
+    info = cp.cache_info()
+    assert info["search_spaces"] == 1 and info["subsolutions"]["misses"]
+
+    cp.clear_caches()
+    info = cp.cache_info()
+    assert info["search_spaces"] == 0
+    assert info["subsolutions"]["size"] == info["subsolutions"]["hits"] == info["subsolutions"]["misses"] == 0
+    assert cp.find_all_valid_schedules_with_optional(required, optional) == schedules
@@ -0,0 +1,636 @@
+import io
+import json
+import os
+import random
+import sqlite3
+from collections import Counter
+from itertools import product
+
+import pytest
+
+import curriculum_planning as cp
+
+# Few days and slots, so that random courses clash often
+DAYS = 2
+SLOTS = 4
+
+
+def random_time(rng):
+    day_idx = rng.randrange(DAYS)
+    if rng.random() < 0.2:
+        # A minute interval overlapping one or two slots of the default grid
+        _, start, _ = cp.DEFAULT_GRID.slots[rng.randrange(SLOTS - 1)]
+        return (day_idx, start + 30, start + rng.choice((60, 150)))
+    return (day_idx, rng.randrange(SLOTS))
+
+
+def random_plan(rng):
+    """Random required and optional courses, with repeated and self-clashing times."""
+    courses = []
+    for course_idx in range(rng.randint(1, 6)):
+        lectures = [random_time(rng) for _ in range(rng.randint(0, 2))]
+        tutorials = [random_time(rng) for _ in range(rng.randint(0, 3))]
+        courses.append(cp.Course(f"C{course_idx}", f"Course {course_idx}", lectures, tutorials))
+    rng.shuffle(courses)
+    num_required = rng.randint(0, len(courses))
+    return courses[:num_required], courses[num_required:]
+
+
+def schedule_key(schedule):
+    """Describe a schedule by its course codes and tutorial times, independent of its class."""
+    course_list, tutorial_selection = schedule
+    return frozenset(
+        (course.course_code, tuple(tutorial_selection[course]) if course in tutorial_selection else None)
+        for course in course_list
+    )
+
+
+def brute_force(required_courses, optional_courses):
+    """Try every combination of tutorials and skipped optional courses, keeping the clash-free ones."""
+    choices_per_course = []
+    for course, optional in [(course, False) for course in required_courses] + \
+            [(course, True) for course in optional_courses]:
+        # A tutorial time listed twice gives the same timetable, so it counts once
+        tutorial_times = list(dict.fromkeys(tuple(time) for time in course.tutorials))
+        choices = [(course, time) for time in tutorial_times] if tutorial_times else [(course, None)]
+        choices_per_course.append(choices + [None] if optional else choices)
+
+    keys = Counter()
+    for combination in product(*choices_per_course):
+        taken = [choice for choice in combination if choice is not None]
+        used = Counter()
+        for course, tutorial_time in taken:
+            for time in course.lectures + ([tutorial_time] if tutorial_time is not None else []):
+                used.update(cp.DEFAULT_GRID.slots_of(time))
+        if all(uses == 1 for uses in used.values()):
+            keys[frozenset((course.course_code, tutorial_time) for course, tutorial_time in taken)] += 1
+    return keys
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_solvers_match_brute_force(seed):
+    rng = random.Random(seed)
+    required, optional = random_plan(rng)
+    expected = brute_force(required, optional)
+
+    schedules = cp.find_all_valid_schedules_with_optional(required, optional)
+    assert Counter(map(schedule_key, schedules)) == expected
+
+    assert cp.find_all_valid_schedules_with_optional(required, optional, engine="dlx") == schedules
+    assert list(cp.iter_valid_schedules(required, optional)) == schedules
+
+    assert cp.count_valid_schedules(required, optional) == len(schedules)
+    for index, schedule in enumerate(schedules):
+        assert cp.unrank_schedule(required, optional, index) == schedule
+        assert cp.rank_schedule(required, optional, schedule) == index
+    with pytest.raises(IndexError):
+        cp.unrank_schedule(required, optional, len(schedules))
+
+    # Add the courses to the planner in a random order, optional ones first or not
+    planner = cp.SchedulePlanner()
+    additions = [(course, False) for course in required] + [(course, True) for course in optional]
+    rng.shuffle(additions)
+    for course, is_optional in additions:
+        planner.add_course(course, optional=is_optional)
+    assert Counter(map(schedule_key, planner)) == expected
+    assert len(planner) == len(schedules)
+
+    if additions:
+        course, _ = rng.choice(additions)
+        planner.remove_course(course)
+        remaining = [course_ for course_ in required if course_ is not course]
+        remaining_optional = [course_ for course_ in optional if course_ is not course]
+        assert Counter(map(schedule_key, planner)) == brute_force(remaining, remaining_optional)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_find_all_valid_schedules_matches_brute_force(seed):
+    rng = random.Random(seed)
+    required, optional = random_plan(rng)
+    courses = required + optional
+    # find_all_valid_schedules treats every course as optional and keeps the non-empty
+    # schedules whose set of courses is not part of a larger valid set
+    candidates = brute_force([], courses)
+    course_sets = {frozenset(code for code, _ in key) for key in candidates}
+    expected = Counter({
+        key: uses for key, uses in candidates.items()
+        if key and not any(frozenset(code for code, _ in key) < other for other in course_sets)
+    })
+    assert Counter(map(schedule_key, cp.find_all_valid_schedules(courses))) == expected
+
+
+def test_search_stats_of_a_small_plan():
+    # A and B clash only if both take their (1, 0) tutorial: of the 4 tutorial
+    # pairs, 3 are schedules. The search places A (2 options), then tries both
+    # options of B under each: 2 inner nodes + 3 leaves, and 1 conflict.
+    a = cp.Course("A", "A", lectures=[(0, 0)], tutorials=[(1, 0), (1, 1)])
+    b = cp.Course("B", "B", lectures=[(0, 1)], tutorials=[(1, 0), (1, 2)])
+    stats = cp.SearchStats()
+    schedules = list(cp.iter_valid_schedules([a, b], [], stats=stats))
+
+    assert len(schedules) == 3
+    assert stats.as_dict()["phase_times"].keys() >= {"setup", "search"}
+    counters = {name: value for name, value in stats.as_dict().items() if name != "phase_times"}
+    assert counters == {
+        "nodes": 5, "conflicts": 1, "leaves": 3, "combinations": 1, "maximality_checks": 0,
+        "cache_hits": 0, "cache_misses": 1, "schedules": 3,
+    }
+    # Statistics never change the result, and counts add up over searches
+    assert list(cp.iter_valid_schedules([a, b], [])) == schedules
+    cp.subsolution_cache.clear()
+    list(cp.iter_valid_schedules([a, b], [], stats=stats))
+    assert (stats.nodes, stats.leaves, stats.schedules) == (10, 6, 6)
+
+
+def test_courses_with_the_same_content_give_each_timetable_once():
+    lecture = cp.Course("B", "B", lectures=[(0, 1)])
+    course = cp.Course("A", "A", lectures=[(0, 0)], tutorials=[(1, 0), (1, 1)])
+    copy = cp.Course("A", "A copy", lectures=[(0, 0)], tutorials=[(1, 0), (1, 1)])
+    # Same code but other times: a different course
+    other = cp.Course("A", "A", lectures=[(0, 2)], tutorials=[(1, 0)])
+
+    schedules = cp.find_all_valid_schedules_with_optional([lecture], [course, copy])
+    assert Counter(map(schedule_key, schedules)) == brute_force([lecture], [course])
+    assert len(schedules) == len(set(map(cp.schedule_key, schedules))) == 3
+    assert cp.find_all_valid_schedules_with_optional([lecture], [course, copy], engine="dlx") == schedules
+    assert cp.count_valid_schedules([lecture], [course, copy]) == 3
+    for index, schedule in enumerate(schedules):
+        assert cp.unrank_schedule([lecture], [course, copy], index) == schedule
+        assert cp.rank_schedule([lecture], [course, copy], schedule) == index
+
+    assert len(cp.find_all_valid_schedules([course, copy, lecture])) == 2
+    assert cp.count_valid_schedules([lecture], [course, other]) == 5
+
+    planner = cp.SchedulePlanner([lecture], [course])
+    with pytest.raises(ValueError):
+        planner.add_course(copy, optional=True)
+    planner.add_course(other, optional=True)
+    assert len(planner) == 5
+
+
+def test_subsolution_cache_bounds_the_stored_choices():
+    cache = cp.SubsolutionCache(max_choices=5, max_entry_size=3)
+    cache.put("a", ((0,), (1,)))
+    cache.put("b", ((0,), (1,), (2,)))
+    assert cache.get("a") == ((0,), (1,))
+    assert cache.get("c") is None
+    assert (cache.hits, cache.misses, len(cache), cache.num_choices) == (1, 1, 2, 5)
+
+    # Over max_entry_size: never stored
+    cache.put("d", ((0,),) * 4)
+    assert cache.get("d") is None and cache.num_choices == 5
+    # "b" is the least recently used entry, so it makes room for "e"
+    cache.put("e", ((0,),))
+    assert cache.get("b") is None and cache.get("a") is not None and cache.get("e") is not None
+    assert cache.evictions == 1 and cache.num_choices == 3
+    # Replacing an entry does not count its old choices twice
+    cache.put("e", ((0,), (1,)))
+    assert cache.num_choices == 4
+
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "evictions": 0, "size": 0, "choices": 0, "max_choices": 5}
+
+
+def test_subsolution_cache_is_keyed_on_course_content():
+    def plan():
+        # Two components, so the smaller one is looked up in the cache
+        return (
+            [cp.Course("A", "A", lectures=[(0, 0)], tutorials=[(1, 0), (1, 1)]),
+             cp.Course("B", "B", lectures=[(0, 1)], tutorials=[(1, 0), (1, 2)])],
+            [cp.Course("C", "C", lectures=[(3, 0)], tutorials=[(4, 0), (4, 1)])],
+        )
+
+    schedules = cp.find_all_valid_schedules_with_optional(*plan())
+    misses, hits = cp.subsolution_cache.misses, cp.subsolution_cache.hits
+    assert misses
+    # Equal copies of the courses are answered from the cache
+    assert list(map(schedule_key, cp.find_all_valid_schedules_with_optional(*plan()))) == \
+        list(map(schedule_key, schedules))
+    assert cp.subsolution_cache.misses == misses and cp.subsolution_cache.hits > hits
+
+    def contains_course(value):
+        if isinstance(value, cp.Course):
+            return True
+        return isinstance(value, tuple) and any(contains_course(item) for item in value)
+
+    assert cp.subsolution_cache._entries
+    assert not any(contains_course(key) for key in cp.subsolution_cache._entries)
+
+
+def cache_plan():
+    a = cp.Course("A", "A", lectures=[(0, 0)], tutorials=[(1, 0), (1, 1)])
+    b = cp.Course("B", "B", lectures=[(0, 1)], tutorials=[(1, 0), (1, 2)])
+    c = cp.Course("C", "C", lectures=[(0, 2)])
+    return [a], [b, c]
+
+
+def test_schedule_cache_roundtrip(tmp_path):
+    required, optional = cache_plan()
+    schedules = cp.find_all_valid_schedules_with_optional(required, optional)
+    path = str(tmp_path / "schedules.sqlite")
+    with cp.ScheduleCache(path) as cache:
+        assert cache.get(required, optional) is None
+        assert cp.find_all_valid_schedules_with_optional(required, optional, cache=cache) == schedules
+    # Found again in a new session, built from equal copies of the courses
+    with cp.ScheduleCache(path) as cache:
+        copies = cache_plan()
+        cached = cache.get(*copies)
+        assert list(map(schedule_key, cached)) == list(map(schedule_key, schedules))
+        assert all(schedule.courses == tuple(copies[0] + copies[1]) for schedule in cached)
+        # Plain (course_list, tutorial_selection) tuples are stored the same way
+        cache.put(required, optional, [tuple(schedule) for schedule in schedules])
+        assert cache.get(required, optional) == schedules
+        assert cache.stats()["hits"] == 2 and len(cache) == 1
+
+
+def test_schedule_cache_roundtrip_of_many_courses():
+    # Over 64 courses, so the course masks do not fit a machine word
+    grid = cp.TimeGrid.uniform(days=[f"DAY {day_num}" for day_num in range(1, 8)], step=45)
+    courses = [cp.Course("C0", "", lectures=[(0, 0)], tutorials=[(6, 0), (6, 1)], grid=grid)]
+    courses += [cp.Course(f"C{idx}", "", lectures=[(idx % 6, idx // 6 + 1)], grid=grid) for idx in range(1, 70)]
+    schedules = cp.find_all_valid_schedules_with_optional(courses[:66], courses[66:])
+    cache = cp.ScheduleCache(":memory:")
+    cache.put(courses[:66], courses[66:], schedules)
+    assert cache.get(courses[:66], courses[66:]) == schedules
+    assert len(schedules) == 2 * 2 ** 4
+
+
+def test_schedule_cache_misses_when_the_catalog_changes():
+    required, optional = cache_plan()
+    cache = cp.ScheduleCache(":memory:")
+    cp.find_all_valid_schedules_with_optional(required, optional, cache=cache)
+
+    moved = cp.Course("C", "C", lectures=[(0, 3)])
+    renamed = cp.Course("C", "Another name", lectures=[(0, 2)])
+    assert cache.get(required, [optional[0], moved]) is None
+    assert cache.get(required, optional[:1]) is None
+    assert cache.get(required + optional[:1], optional[1:]) is None
+    assert cache.get(required, [optional[0], renamed]) is not None
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_schedule_cache_drops_unreadable_results(tmp_path):
+    required, optional = cache_plan()
+    path = str(tmp_path / "schedules.sqlite")
+    with cp.ScheduleCache(path) as cache:
+        cp.find_all_valid_schedules_with_optional(required, optional, cache=cache)
+
+    # A corrupt result is deleted and searched again
+    db = sqlite3.connect(path)
+    db.execute("UPDATE schedules SET data = ?", (b"not zlib",))
+    db.commit()
+    db.close()
+    with cp.ScheduleCache(path) as cache:
+        assert cache.get(required, optional) is None and len(cache) == 0
+        schedules = cp.find_all_valid_schedules_with_optional(required, optional, cache=cache)
+        assert cache.get(required, optional) == schedules
+
+    # A file of another format version is emptied
+    db = sqlite3.connect(path)
+    db.execute(f"PRAGMA user_version = {cp.ScheduleCache.FORMAT_VERSION + 1}")
+    db.commit()
+    db.close()
+    with cp.ScheduleCache(path) as cache:
+        assert len(cache) == 0 and cache.get(required, optional) is None
+
+    not_sqlite = tmp_path / "notes.txt"
+    not_sqlite.write_text("not a database\n" * 100)
+    with pytest.raises(ValueError):
+        cp.ScheduleCache(str(not_sqlite))
+
+
+def write_catalog(tmp_path, data):
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+def test_cli_writes_the_schedules_of_a_catalog(tmp_path, capsys):
+    catalog = write_catalog(tmp_path, {"courses": [
+        {"code": "A", "lectures": [[1, 0]], "tutorials": [[2, 0], [2, 1]]},
+        {"code": "B", "lectures": [[1, 1]], "optional": True},
+    ]})
+    assert cp.run_batch(cp.parse_args(["--catalog", catalog, "--limit", "3"])) == 0
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert records[0] == {"index": 1, "courses": ["A"], "tutorials": {"A": [2, 0]}}
+    assert len(records) == 3
+
+    assert cp.run_batch(cp.parse_args(["--catalog", catalog, "--count"])) == 0
+    assert json.loads(capsys.readouterr().out) == {"count": 4}
+
+
+@pytest.mark.parametrize("data, message", [
+    ([{"code": "A", "lectures": [1]}], "lectures must be a list"),
+    ([{"code": "A", "tutorials": [[1, 0], 5]}], "tutorials must be a list"),
+    ([{"code": "A", "lectures": [[9, 0]]}], "day must be 1-5"),
+    ({"code": "A", "lectures": [[1, 0]]}, "expected a list of courses"),
+    ({"courses": {"code": "A"}}, "expected a list of courses"),
+    (["A"], "expected a JSON object"),
+    ([{"name": "A"}], "missing code"),
+])
+def test_cli_rejects_malformed_catalogs(tmp_path, capsys, data, message):
+    catalog = write_catalog(tmp_path, data)
+    assert cp.run_batch(cp.parse_args(["--catalog", catalog])) == 1
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert captured.err.startswith("[ERROR]") and message in captured.err
+
+
+@pytest.mark.parametrize("line, message", [
+    ('{"id": "s1", "required": "A"}', "required must be a list"),
+    ('{"id": "s1", "optional": "B"}', "optional must be a list"),
+    ('["A"]', "expected a JSON object"),
+    ('{"id": "s1", "required": ["C"]}', "unknown course code(s): C"),
+])
+def test_cli_rejects_malformed_students(tmp_path, capsys, line, message):
+    catalog = write_catalog(tmp_path, [{"code": "A", "lectures": [[1, 0]]}, {"code": "B", "lectures": [[1, 1]]}])
+    students = tmp_path / "students.jsonl"
+    students.write_text(line + "\n", encoding="utf-8")
+    assert cp.run_cohort(cp.parse_args(["--catalog", catalog, "--students", str(students)])) == 1
+    captured = capsys.readouterr()
+    assert captured.err.startswith("[ERROR]") and message in captured.err
+
+
+@pytest.mark.parametrize("argv", [
+    ["--limit", "-1"],
+    ["--workers", "0"],
+    ["--time-budget", "-1"],
+    ["--grid-step", "0"],
+])
+def test_cli_rejects_out_of_range_options(capsys, argv):
+    with pytest.raises(SystemExit) as exc_info:
+        cp.parse_args(["--catalog", "catalog.json"] + argv)
+    assert exc_info.value.code == 2
+    assert argv[0] in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("option", [
+    ["--workers", "2"], ["--time-budget", "1"], ["--stats"], ["--limit", "1"], ["--cache", "plans.sqlite"],
+])
+def test_cli_rejects_options_ignored_by_count(tmp_path, capsys, monkeypatch, option):
+    monkeypatch.chdir(tmp_path)
+    catalog = write_catalog(tmp_path, [{"code": "A", "lectures": [[1, 0]]}])
+    assert cp.run_batch(cp.parse_args(["--catalog", catalog, "--count"] + option)) == 1
+    assert capsys.readouterr().err == f"[ERROR] {option[0]} cannot be used with --count\n"
+    assert not (tmp_path / "plans.sqlite").exists()
+
+
+def test_search_space_reuses_the_counts_of_shared_components():
+    a = cp.Course("A", "A", lectures=[(0, 0)], tutorials=[(1, 0), (1, 1)])
+    b = cp.Course("B", "B", lectures=[(0, 1)], tutorials=[(1, 0), (1, 2)])
+    c = cp.Course("C", "C", lectures=[(3, 0)], tutorials=[(4, 0), (4, 1)])
+    d = cp.Course("D", "D", lectures=[(4, 1)])
+    before = cp._SearchSpace([a, b], [])
+    assert before.counter.count() == 3
+
+    # C clashes with neither A nor B, so their component is not counted again
+    after = cp._SearchSpace([a, b], [c])
+    after.reuse_counts(before)
+    assert after.counter.count() == 9
+    assert any(memo is before.counter.memos[0] for memo in after.counter.memos)
+    # D joins C's component, which is counted from scratch
+    last = cp._SearchSpace([a, b], [c, d])
+    last.reuse_counts(after)
+    assert last.counter.count() == cp._SearchSpace([a, b], [c, d]).counter.count() == 3 * 5
+    for index in range(3 * 5):
+        assert last.counter.rank(last.counter.unrank(index)) == index
+
+
+def test_background_planner_publishes_the_count_of_the_latest_plan():
+    rng = random.Random(7)
+    with cp.BackgroundPlanner() as background:
+        assert background.wait() and background.num_schedules == 1
+        required, optional = [], []
+        for course_idx in range(8):
+            course = cp.Course(f"C{course_idx}", "", [random_time(rng)], [random_time(rng), random_time(rng)])
+            is_optional = course_idx % 2 == 1
+            (optional if is_optional else required).append(course)
+            background.add_course(course, optional=is_optional)
+            if course_idx % 3 == 0:
+                assert background.wait()
+                assert background.num_schedules == len(brute_force(required, optional))
+        assert background.wait(timeout=10) and background.done
+        assert background.num_schedules == cp.count_valid_schedules(required, optional)
+        assert (background.required_courses, background.optional_courses) == (required, optional)
+
+
+def test_background_planner_stops_on_close():
+    background = cp.BackgroundPlanner()
+    background.add_course(cp.Course("A", "A", lectures=[(0, 0)]))
+    assert background.close(timeout=10)
+    assert not background._thread.is_alive()
+    # Nothing is left to wait for, counted or not
+    background.wait(timeout=10)
+    with pytest.raises(ValueError):
+        background.add_course(cp.Course("B", "B", lectures=[(0, 1)]))
+
+
+SCORERS = {
+    "most_optional": cp.MostOptionalScorer(),
+    "fewest_days": cp.FewestDaysScorer(),
+    "avoid_slots": cp.AvoidSlotsScorer((0, 2)),
+    "no_gaps": cp.NoGapsScorer(),
+    "weighted": cp.WeightedScorer([(cp.MostOptionalScorer(), 3), (cp.FewestDaysScorer(), 1), (cp.NoGapsScorer(), 2)]),
+}
+
+
+@pytest.mark.parametrize("scorer_name", sorted(SCORERS))
+@pytest.mark.parametrize("seed", range(40))
+def test_best_schedules_match_brute_force(seed, scorer_name):
+    scorer = SCORERS[scorer_name]
+    rng = random.Random(seed)
+    required, optional = random_plan(rng)
+    optional_codes = {course.course_code for course in optional}
+
+    def score_of(schedule):
+        course_list, tutorial_selection = schedule
+        occupied_mask = 0
+        for course in course_list:
+            for time in course.lectures + ([tutorial_selection[course]] if course in tutorial_selection else []):
+                occupied_mask |= cp.DEFAULT_GRID.time_mask(time)
+        return scorer.score(occupied_mask, sum(course.course_code in optional_codes for course in course_list))
+
+    all_scores = sorted(map(score_of, cp.find_all_valid_schedules_with_optional(required, optional)), reverse=True)
+    for k in (1, 3, 10):
+        best = cp.best_schedules(required, optional, k=k, score=scorer)
+        assert [value for value, _ in best] == all_scores[:k]
+        assert all(value == score_of(schedule) for value, schedule in best)
+        assert len({schedule_key(schedule) for _, schedule in best}) == len(best)
+
+
+def test_schedule_scorer_is_abstract():
+    class NoBound(cp.ScheduleScorer):
+        def score(self, occupied_mask, num_optional):
+            return 0
+
+    with pytest.raises(TypeError):
+        NoBound()
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_parallel_search_matches_serial_search(monkeypatch, seed):
+    # Search even this small plan with workers, in chunks of a few schedules
+    monkeypatch.setattr(cp, "PARALLEL_MIN_COMBINATIONS", 1)
+    monkeypatch.setattr(cp, "PARALLEL_CHUNK_SIZE", 3)
+    pools = []
+
+    def worker_pool(*args):
+        pools.append(args)
+        return real_worker_pool(*args)
+
+    real_worker_pool = cp._worker_pool
+    monkeypatch.setattr(cp, "_worker_pool", worker_pool)
+    rng = random.Random(seed)
+    courses = [
+        cp.Course(f"C{course_idx}", "", [random_time(rng)], [random_time(rng) for _ in range(3)])
+        for course_idx in range(6)
+    ]
+    required, optional = courses[:2], courses[2:]
+
+    serial = cp.find_all_valid_schedules_with_optional(required, optional, workers=1)
+    assert len(serial) > cp.PARALLEL_CHUNK_SIZE
+    assert cp.find_all_valid_schedules_with_optional(required, optional, workers=2) == serial
+    assert list(cp.iter_valid_schedules(required, optional, workers=2)) == serial
+    assert len(pools) == 2
+
+
+def test_compiled_catalog_plans_match_separate_searches():
+    rng = random.Random(11)
+    courses = [
+        cp.Course(f"C{course_idx}", "", [random_time(rng)], [random_time(rng) for _ in range(rng.randint(0, 3))])
+        for course_idx in range(8)
+    ]
+    catalog = cp.CompiledCatalog(courses)
+    requests = []
+    for _ in range(12):
+        codes = rng.sample([course.course_code for course in courses], rng.randint(0, len(courses)))
+        num_required = rng.randint(0, len(codes))
+        requests.append((codes[:num_required], codes[num_required:]))
+
+    by_code = {course.course_code: course for course in courses}
+    expected = [
+        cp.find_all_valid_schedules_with_optional(
+            [by_code[code] for code in required_codes], [by_code[code] for code in optional_codes]
+        )
+        for required_codes, optional_codes in requests
+    ]
+    assert catalog.plan_many(requests) == expected
+    # Forked workers see the catalog without being sent it
+    assert catalog.plan_many(requests, workers=2) == expected
+    with pytest.raises(ValueError):
+        catalog.plan_many(requests + [(["C0"], ["NOPE"])], workers=2)
+
+
+@pytest.mark.parametrize("engine", ["backtracking", "dlx"])
+def test_search_limits_return_an_in_order_prefix(engine):
+    rng = random.Random(5)
+    courses = [
+        cp.Course(f"C{course_idx}", "", [random_time(rng)], [random_time(rng) for _ in range(3)])
+        for course_idx in range(7)
+    ]
+    required, optional = courses[:1], courses[1:]
+    full = cp.find_all_valid_schedules_with_optional(required, optional, engine=engine)
+    assert not full.partial and len(full) > 5
+
+    def search(**limits):
+        return cp.find_all_valid_schedules_with_optional(required, optional, engine=engine, **limits)
+
+    first = search(max_schedules=5)
+    assert first == full[:5]
+    assert first.partial and first.stop_reason == "max_schedules"
+    assert not search(max_schedules=len(full)).partial
+
+    expired = search(time_budget=0)
+    assert expired.partial and expired.stop_reason == "time_budget"
+    assert len(expired) < len(full) and expired == full[:len(expired)]
+
+    token = cp.CancellationToken()
+    token.cancel()
+    cancelled = search(cancel_token=token)
+    assert cancelled.partial and cancelled.stop_reason == "cancelled"
+    assert len(cancelled) < len(full) and cancelled == full[:len(cancelled)]
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def golden_schedule():
+    calculus = cp.Course("MAT1001", "Calculus", lectures=[(0, 0)], tutorials=[(1, 1), (2, 1)])
+    gender = cp.Course("GED2003", "Gender Matters", lectures=[(2, 540, 630)])
+    # MAT1001 with its second tutorial and GED2003, given as a minute interval
+    return cp.find_all_valid_schedules_with_optional([calculus], [gender])[-1:]
+
+
+@pytest.mark.parametrize("fmt, extension", [("text", "txt"), ("html", "html"), ("csv", "csv"), ("jsonl", "jsonl")])
+def test_export_formats_match_golden_files(tmp_path, fmt, extension):
+    with open(os.path.join(DATA_DIR, f"schedule.{extension}"), encoding="utf-8") as f:
+        expected = f.read()
+
+    path = str(tmp_path / f"schedule.{extension}")
+    assert cp.export_schedules(golden_schedule(), path) == 1
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == expected
+
+    out = io.StringIO()
+    assert cp.write_schedules(golden_schedule(), out, fmt=fmt) == 1
+    assert out.getvalue().replace("\r\n", "\n") == expected
+
+
+def test_cohort_records_carry_the_student(tmp_path, capsys):
+    catalog = write_catalog(tmp_path, [
+        {"code": "A", "lectures": [[1, 0]], "tutorials": [[2, 0], [2, 1]]},
+        {"code": "B", "lectures": [[2, 0]]},
+    ])
+    students = tmp_path / "students.jsonl"
+    students.write_text('{"id": "s1", "required": ["A"]}\n{"id": "s2", "required": ["A", "B"]}\n', encoding="utf-8")
+    assert cp.run_cohort(cp.parse_args(["--catalog", catalog, "--students", str(students)])) == 0
+    assert [json.loads(line) for line in capsys.readouterr().out.splitlines()] == [
+        {"student": "s1", "index": 1, "courses": ["A"], "tutorials": {"A": [2, 0]}},
+        {"student": "s1", "index": 2, "courses": ["A"], "tutorials": {"A": [2, 1]}},
+        {"student": "s2", "index": 1, "courses": ["A", "B"], "tutorials": {"A": [2, 1]}},
+    ]
+
+
+def test_dlx_engine_options():
+    a = cp.Course("A", "A", lectures=[(0, 0)], tutorials=[(1, 0), (1, 1)])
+    b = cp.Course("B", "B", lectures=[(0, 1)], tutorials=[(1, 0), (1, 2)])
+    stats = cp.SearchStats()
+    schedules = cp.find_all_valid_schedules_with_optional([a], [b], engine="dlx", stats=stats)
+    assert schedules == cp.find_all_valid_schedules_with_optional([a], [b])
+    assert stats.schedules == len(schedules) == 5
+    with pytest.raises(ValueError):
+        cp.find_all_valid_schedules_with_optional([a], [b], engine="dlx", workers=2)
+    with pytest.raises(ValueError):
+        cp.find_all_valid_schedules_with_optional([a], [b], engine="sat")
+
+
+def test_minute_intervals_clash_on_the_slots_they_share():
+    grid = cp.TimeGrid.uniform(step=15)
+
+    def course(code, start, end):
+        return cp.Course(code, code, lectures=[(0, cp.parse_minutes(start), cp.parse_minutes(end))], grid=grid)
+
+    nine, overlapping, ten = course("A", "9:00", "10:00"), course("B", "9:45", "10:30"), course("C", "10:00", "11:00")
+    assert cp.count_valid_schedules([], [nine, overlapping]) == 3
+    assert cp.count_valid_schedules([], [nine, ten]) == 4
+    # On the default grid, 9:00-10:00 and 10:00-11:00 both fall into Morning 1
+    on_default_grid = [cp.Course(c.course_code, "", c.lectures) for c in (nine, ten)]
+    assert cp.count_valid_schedules([], on_default_grid) == 3
+
+    with pytest.raises(ValueError):
+        grid.validate_time((0, 600, 540))
+    with pytest.raises(ValueError):
+        cp.DEFAULT_GRID.validate_time((0, 7))
+    with pytest.raises(ValueError):
+        cp.count_valid_schedules([nine], on_default_grid[1:])
+
+
+def test_courses_and_schedules_have_no_instance_dict():
+    course = cp.Course("A", "A", lectures=[(0, 0)], tutorials=[(1, 0)])
+    schedule, = cp.find_all_valid_schedules_with_optional([course], [])
+    for value in (course, schedule):
+        assert not hasattr(value, "__dict__")
+    course_list, tutorial_selection = schedule
+    assert (course_list, tutorial_selection) == ([course], {course: (1, 0)})
+    same = cp.unrank_schedule([course], [], 0)
+    assert schedule == same and hash(schedule) == hash(same)
@@ -0,0 +1,68 @@
+import csv
+import os
+import subprocess
+import sys
+
+import pytest
+
+import grade_percentile as gp
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+
+def test_percentiles_match_scalar_percentile():
+    scores = np.linspace(0, 100, 41)
+    expected = [gp.truncated_normal_percentile(60, 15, score) for score in scores]
+    np.testing.assert_allclose(gp.truncated_normal_percentiles(scores, 60, 15), expected, rtol=1e-9, atol=1e-9)
+
+
+def test_percentiles_broadcast_per_score_parameters():
+    scores = np.array([50.0, 70.0, 90.0])
+    means = np.array([60.0, 65.0, 70.0])
+    stds = np.array([10.0, 15.0, 20.0])
+    expected = [gp.truncated_normal_percentile(m, s, x) for x, m, s in zip(scores, means, stds)]
+    np.testing.assert_allclose(gp.truncated_normal_percentiles(scores, means, stds), expected, rtol=1e-9)
+
+
+def test_percentiles_far_in_the_upper_tail():
+    # low is 8 standard deviations above the mean; CDF values there round to 1
+    percentiles = gp.truncated_normal_percentiles([50.0, 55.0, 100.0], 10, 5, low=50)
+    assert percentiles[0] == 0
+    assert 0 < percentiles[1] < 100
+    assert percentiles[2] == pytest.approx(100)
+
+
+def test_scores_outside_the_bounds_are_clipped():
+    percentiles = gp.truncated_normal_percentiles([0.0, 40.0, 120.0], 10, 5, low=50, high=100)
+    np.testing.assert_allclose(percentiles, [0, 0, 100])
+    assert np.all((percentiles >= 0) & (percentiles <= 100))
+
+
+def test_percentiles_from_csv_in_chunks(tmp_path):
+    in_path = tmp_path / "grades.csv"
+    out_path = tmp_path / "ranked.csv"
+    scores = [35, 50, 62.5, 71, 88, 99, 120]
+    with open(in_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "score", "mean"])
+        for idx, score in enumerate(scores):
+            writer.writerow([idx, score, 55 + idx])
+
+    assert gp.percentiles_from_csv(str(in_path), str(out_path), mean="mean", chunk_size=3) == len(scores)
+    with open(out_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    expected = gp.truncated_normal_percentiles(scores, np.arange(55, 55 + len(scores)), 15)
+    np.testing.assert_allclose([float(row["percentile"]) for row in rows], expected, atol=5e-5)
+    assert [row["id"] for row in rows] == [str(idx) for idx in range(len(scores))]
+
+
+def test_import_does_not_load_numpy_or_scipy():
+    code = (
+        "import sys; import grade_percentile as gp; "
+        "assert 0 < gp.truncated_normal_percentile(60, 15, 70) < 100; "
+        "print(sorted(name for name in ('numpy', 'scipy', 'matplotlib') if name in sys.modules))"
+    )
+    calc_dir = os.path.dirname(os.path.abspath(gp.__file__))
+    result = subprocess.run([sys.executable, "-c", code], cwd=calc_dir, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"